@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
-import contextlib
 import logging
 import os
 import pathlib
 import gi
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gdk, GdkPixbuf, Gio, Gtk, Pango, GLib
+from ks_includes.config import xdg_config
+from ks_includes.icon_cache import IconCache
+from ks_includes.thumbnail_cache import ThumbnailCache
+from ks_includes.thumbnail_loader import ThumbnailLoader
 
 def find_widget(widget, wanted_type):
     # Returns a widget of wanted_type or None
@@ -109,6 +112,12 @@ class KlippyGtk:
         if (self.height / self.width) >= 3:  # Ultra-tall
             self.keyboard_height = self.keyboard_height * 0.5
 
+        self.thumbnails = ThumbnailLoader(screen, ThumbnailCache(os.path.join(xdg_config, "thumbnails")))
+        self.icons = IconCache(self.themedir, os.path.join(xdg_config, "icons"))
+        if screen._config.get_main_config().getboolean("prerender_icons", True):
+            scale = self.img_scale * self.button_image_scale
+            self.icons.prerender_async((scale, scale * 1.5, self.img_scale * self.bsidescale, self.img_width))
+
         self.color_list = {}  # This is set by screen.py init_style()
         for key in self.color_list:
             if "base" in self.color_list[key]:
@@ -155,24 +164,12 @@ class KlippyGtk:
     def PixbufFromIcon(self, filename, width=None, height=None):
         width = width if width is not None else self.img_width
         height = height if height is not None else self.img_height
-        filename = os.path.join(self.themedir, filename)
-        for ext in ["svg", "png"]:
-            pixbuf = self.PixbufFromFile(f"{filename}.{ext}", int(width), int(height))
-            if pixbuf is not None:
-                return pixbuf
-        return None
+        return self.icons.get(filename, width, height)
 
     def update_image(self, image_object, image_name, width=None, height=None):
-        filename = os.path.join(self.themedir, image_name)
-        width = width if width is not None else self.img_width
-        height = height if height is not None else self.img_height
-        for ext in ["svg", "png"]:
-            with contextlib.suppress(Exception):
-                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(f"{filename}.{ext}", int(width), int(height))
-                if pixbuf is not None:
-                      GLib.idle_add(image_object.set_from_pixbuf, pixbuf)
-                else:
-                    logging.warning(f"Unable to find image {filename}.{ext}")
+        pixbuf = self.PixbufFromIcon(image_name, width, height)
+        if pixbuf is not None:
+            GLib.idle_add(image_object.set_from_pixbuf, pixbuf)
 
     @staticmethod
     def PixbufFromFile(filename, width=-1, height=-1):
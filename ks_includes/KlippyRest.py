@@ -1,13 +1,53 @@
 import logging
 import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import gi
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+
+# Requests slower than this are logged as warnings
+SLOW_REQUEST = 1.0
+# Thumbnails kept to answer 304 Not Modified replies
+THUMBNAIL_VALIDATORS = 64
+
 
 class KlippyRest:
-    def __init__(self, ip, port=7125, api_key=False):
+    def __init__(self, ip, port=7125, api_key=False, pool_size=4, retries=2, backoff=.3):
         self.ip = ip
         self.port = port
         self.api_key = api_key
         self.status = ''
+        # Only idempotent requests are retried, on connection errors and gateway failures
+        retry = Retry(
+            total=retries, connect=retries, read=retries, backoff_factor=backoff,
+            status_forcelist=(502, 503, 504), allowed_methods=frozenset({"GET", "HEAD"}), raise_on_status=False
+        )
+        self.session = self._session(pool_size, retry)
+        # Requests made on the main loop fail fast, retrying them would freeze the UI
+        self.main_session = self._session(1, 0)
+        self._lock = threading.Lock()
+        self.stats = {}
+        self.thumbnails = OrderedDict()
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="rest")
+        # GET results by method: (time, result), and callbacks waiting for a request in flight
+        self.cache = {}
+        self.pending = {}
+        self.closed = False
+
+    def _session(self, pool_size, retry):
+        session = requests.Session()
+        if self.api_key:
+            session.headers["x-api-key"] = self.api_key
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
 
     @property
     def endpoint(self):
@@ -27,22 +67,135 @@ class KlippyRest:
         return self.send_request("printer/gcode/help")
     
     def get_thumbnail_stream(self, thumbnail):
-        return self.send_request(f"server/files/gcodes/{thumbnail}", json=False)
+        with self._lock:
+            cached = self.thumbnails.get(thumbnail)
+        headers = {}
+        if cached is not None:
+            if cached['etag']:
+                headers["If-None-Match"] = cached['etag']
+            if cached['last_modified']:
+                headers["If-Modified-Since"] = cached['last_modified']
+        response = self._do_request(f"server/files/gcodes/{thumbnail}", "get", json_response=None, headers=headers)
+        if response is False:
+            return False
+        with self._lock:
+            if response.status_code == 304 and cached is not None:
+                self.thumbnails.move_to_end(thumbnail)
+                return cached['content']
+            self.thumbnails[thumbnail] = {
+                'etag': response.headers.get("ETag"),
+                'last_modified': response.headers.get("Last-Modified"),
+                'content': response.content
+            }
+            if len(self.thumbnails) > THUMBNAIL_VALIDATORS:
+                self.thumbnails.popitem(last=False)
+        return response.content
 
-    def _do_request(self, method, request_method, data=None, json=None, json_response=True, timeout=3):
+    def _do_request(self, method, request_method, data=None, json=None, json_response=True, timeout=3, headers=None):
+        # json_response None returns the response object itself
         url = f"{self.endpoint}/{method}"
-        headers = {"x-api-key": self.api_key} if self.api_key else {}
         logging.debug(f"Sending {request_method} to {url}")
+        start = time.monotonic()
         try:
-            callee = getattr(requests, request_method)
-            response = callee(url, json=json, data=data, headers=headers, timeout=timeout)
+            if threading.current_thread() is threading.main_thread():
+                session = self.main_session
+            else:
+                session = self.session
+            response = session.request(request_method, url, json=json, data=data, headers=headers, timeout=timeout)
             response.raise_for_status()
             self.status = ''
+            if json_response is None:
+                return response
             return response.json() if json_response else response.content
         except Exception as e:
             self.status = self.format_status(e)
             logging.error(self.status.replace('\n', '>>'))
             return False
+        finally:
+            self._record(method, time.monotonic() - start)
+
+    def _record(self, method, elapsed):
+        # Group by endpoint, without the query string or the file path
+        endpoint = method.split("?")[0]
+        if endpoint.startswith("server/files/") and endpoint.count("/") > 2:
+            endpoint = "/".join(endpoint.split("/")[:3])
+        with self._lock:
+            if endpoint not in self.stats:
+                self.stats[endpoint] = {"count": 0, "total": 0, "max": 0}
+            stats = self.stats[endpoint]
+            stats["count"] += 1
+            stats["total"] += elapsed
+            stats["max"] = max(stats["max"], elapsed)
+        if elapsed > SLOW_REQUEST:
+            logging.warning(f"Slow request {method}: {elapsed:.2f}s")
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                endpoint: {**stats, "avg": stats["total"] / stats["count"]}
+                for endpoint, stats in self.stats.items()
+            }
+
+    def log_stats(self):
+        for endpoint, stats in sorted(self.get_stats().items(), key=lambda x: x[1]["total"], reverse=True):
+            logging.debug(f"{endpoint}: {stats['count']} requests, avg {stats['avg'] * 1000:.0f} ms, "
+                          f"max {stats['max'] * 1000:.0f} ms")
+
+    def send_request_async(self, method, callback, *args, ttl=0, timeout=4):
+        # callback(result, *args) runs on the main loop, a result younger than ttl seconds is reused
+        if self.closed:
+            return
+        with self._lock:
+            cached = self.cache.get(method)
+            if cached is not None and time.monotonic() - cached[0] < ttl:
+                result = cached[1]
+            else:
+                result = None
+                if method in self.pending:
+                    self.pending[method].append((callback, args))
+                    return
+                self.pending[method] = [(callback, args)]
+        if result is not None:
+            GLib.idle_add(self._deliver, result, [(callback, args)])
+            return
+        self.executor.submit(self._send_async, method, timeout)
+
+    def _send_async(self, method, timeout):
+        result = self.send_request(method, timeout=timeout)
+        with self._lock:
+            if result is not False:
+                self.cache[method] = (time.monotonic(), result)
+            callbacks = self.pending.pop(method, [])
+        GLib.idle_add(self._deliver, result, callbacks)
+
+    def post_request_async(self, method, callback, *args, json=None):
+        if self.closed:
+            return
+
+        def post():
+            GLib.idle_add(self._deliver, self.post_request(method, json=json), [(callback, args)])
+        self.executor.submit(post)
+
+    def invalidate(self, method):
+        with self._lock:
+            self.cache.pop(method, None)
+
+    def _deliver(self, result, callbacks):
+        if self.closed:
+            return False
+        for callback, args in callbacks:
+            try:
+                callback(result, *args)
+            except Exception as e:
+                logging.exception(f"Error processing response: {e}")
+        return False
+
+    def close(self):
+        self.closed = True
+        self.executor.shutdown(wait=False)
+        self.log_stats()
+        self.session.close()
+        self.main_session.close()
 
     def post_request(self, method, data=None, json=None, json_response=True):
         return self._do_request(method, "post", data, json, json_response)
@@ -1,13 +1,15 @@
 #!/usr/bin/python
 
 import threading
-import json
 import logging
 import gi
 import websocket
 gi.require_version("Gtk", "3.0")
 from gi.repository import GLib
+from ks_includes import json_codec
 from ks_includes.KlippyGcodes import KlippyGcodes
+from ks_includes.status_dispatcher import StatusDispatcher
+from ks_includes.gcode_channel import GcodeChannel
 
 class KlippyWebsocket(threading.Thread):
     _req_id = 0
@@ -28,6 +30,15 @@ class KlippyWebsocket(threading.Thread):
         self.closing = False
         self.host = host
         self.port = port
+        # Temperature reports are only shown by the console when it doesn't hide them
+        self.drop_temperature_responses = True
+        self.dropped = 0
+        self.dispatcher = None
+        if "on_message" in self._callback:
+            self.dispatcher = StatusDispatcher(
+                self._callback['on_message'],
+                self._screen._config.get_main_config().getfloat("update_rate", 30)
+            )
 
     @property
     def _url(self):
@@ -93,24 +104,38 @@ class KlippyWebsocket(threading.Thread):
     def close(self):
         self.closing = True
         self.connecting = False
+        if self.dispatcher is not None:
+            self.dispatcher.log_stats()
+            self.dispatcher.clear()
+        logging.debug(f"Temperature reports dropped: {self.dropped}")
+        GLib.idle_add(self.klippy.gcode.clear)
         if self.ws is not None:
             self.ws.close()
 
     def on_message(self, *args):
         message = args[1] if len(args) == 2 else args[0]
-        response = json.loads(message)
+        if self.drop_temperature_responses and json_codec.is_temperature_response(message):
+            self.dropped += 1
+            return
+        response = json_codec.loads(message)
         if "id" in response and response['id'] in self.callback_table:
             args = (response,
                     self.callback_table[response['id']][1],
                     self.callback_table[response['id']][2],
                     *self.callback_table[response['id']][3])
-            GLib.idle_add(self.callback_table[response['id']][0], *args, priority=GLib.PRIORITY_HIGH_IDLE)
+            if self.dispatcher is not None:
+                self.dispatcher.push_event(self.callback_table[response['id']][0], *args)
+            else:
+                GLib.idle_add(self.callback_table[response['id']][0], *args, priority=GLib.PRIORITY_HIGH_IDLE)
             self.callback_table.pop(response['id'])
             return
 
-        if "method" in response and "on_message" in self._callback:
-            args = (response['method'], response['params'][0] if "params" in response else {})
-            GLib.idle_add(self._callback['on_message'], *args, priority=GLib.PRIORITY_HIGH_IDLE)
+        if "method" in response and self.dispatcher is not None:
+            params = response['params'][0] if "params" in response else {}
+            if response['method'] == "notify_status_update":
+                self.dispatcher.push_status(params)
+            else:
+                self.dispatcher.push_event(self._callback['on_message'], response['method'], params)
         return
 
     def send_method(self, method, params=None, callback=None, *args):
@@ -139,7 +164,7 @@ class KlippyWebsocket(threading.Thread):
             "params": params,
             "id": self._req_id
         }
-        self.ws.send(json.dumps(data))
+        self.ws.send(json_codec.dumps(data))
         return True
 
     def on_open(self, *args):
@@ -172,6 +197,7 @@ class KlippyWebsocket(threading.Thread):
                           priority=GLib.PRIORITY_HIGH_IDLE)
         logging.info("Moonraker Websocket Closed")
         self.connected = False
+        GLib.idle_add(self.klippy.gcode.clear)
 
     @staticmethod
     def on_error(*args):
@@ -181,9 +207,11 @@ class KlippyWebsocket(threading.Thread):
 class MoonrakerApi:
     def __init__(self, ws):
         self._ws = ws
+        self.gcode = GcodeChannel(self)
 
     def emergency_stop(self):
         logging.info("Sending printer.emergency_stop")
+        self.gcode.clear()
         return self._ws.send_method(
             "printer.emergency_stop"
         )
@@ -232,11 +260,13 @@ class MoonrakerApi:
             *args
         )
 
-    def object_subscription(self, updates):
+    def object_subscription(self, updates, callback=None, *args):
         logging.debug("Sending printer.objects.subscribe")
         return self._ws.send_method(
             "printer.objects.subscribe",
-            updates
+            updates,
+            callback,
+            *args
         )
 
     def power_device_off(self, device, callback=None, *args):
@@ -658,4 +688,13 @@ class MoonrakerApi:
         )
     
     def get_history_totals(self, callback=None, *args):
-        return self._ws.send_method("server.history.totals", {}, callback, *args)
\ No newline at end of file
+        return self._ws.send_method("server.history.totals", {}, callback, *args)
+
+    def get_history_list(self, start=0, limit=50, callback=None, *args):
+        logging.debug(f"Sending server.history.list start={start} limit={limit}")
+        return self._ws.send_method(
+            "server.history.list",
+            {"start": start, "limit": limit, "order": "desc"},
+            callback,
+            *args
+        )
\ No newline at end of file
@@ -21,6 +21,9 @@
 #
 # (C)2011-2021 Dennis Kaarsemaker
 # License: zlib
+#
+# Altered for KlipperScreen: properties are read from a cache filled by GetAll
+# and kept current by PropertiesChanged signals when a mainloop is available.
 
 import contextlib
 import copy
@@ -115,6 +118,64 @@ class SignalDispatcher(object):
 
 SignalDispatcher = SignalDispatcher()
 
+
+class PropertyCache(object):
+    def __init__(self):
+        self.values = {}
+        self.setup = False
+
+    def enabled(self):
+        if not self.setup:
+            # Without a mainloop no signal would keep the cache current
+            if not dbus.get_default_main_loop():
+                return False
+            bus = dbus.SystemBus()
+            service = 'org.freedesktop.NetworkManager'
+            bus.add_signal_receiver(self.handle_properties_changed, 'PropertiesChanged',
+                                    'org.freedesktop.DBus.Properties', service, path_keyword='path')
+            bus.add_signal_receiver(self.handle_interfaces_removed, 'InterfacesRemoved',
+                                    'org.freedesktop.DBus.ObjectManager', service)
+            bus.add_signal_receiver(self.handle_restart, 'NameOwnerChanged', 'org.freedesktop.DBus')
+            self.setup = True
+        return True
+
+    def get(self, obj, interface, name):
+        proxy = obj.proxy
+        path = str(obj.object_path)
+        properties = self.values.get(path, {}).get(interface)
+        if properties is None:
+            properties = dict(proxy.GetAll(interface, dbus_interface='org.freedesktop.DBus.Properties'))
+            self.values.setdefault(path, {})[interface] = properties
+        if name not in properties:
+            properties[name] = proxy.Get(interface, name, dbus_interface='org.freedesktop.DBus.Properties')
+        return properties[name]
+
+    def forget(self, object_path, interface=None, name=None):
+        if interface is None:
+            self.values.pop(str(object_path), None)
+            return
+        properties = self.values.get(str(object_path), {}).get(interface)
+        if properties is not None:
+            properties.pop(name, None)
+
+    def handle_properties_changed(self, interface, changed, invalidated, path=None):
+        properties = self.values.get(str(path), {}).get(str(interface))
+        if properties is None:
+            return
+        properties.update(changed)
+        for name in invalidated:
+            properties.pop(name, None)
+
+    def handle_interfaces_removed(self, object_path, interfaces):
+        self.forget(object_path)
+
+    def handle_restart(self, name, old, new):
+        if str(name) == 'org.freedesktop.NetworkManager':
+            self.values.clear()
+
+
+PropertyCache = PropertyCache()
+
 # We completely dynamically generate all classes using introspection data. As
 # this is done at import time, use a special dbus connection that does not get
 # in the way of setting a mainloop and doing async stuff later.
@@ -191,7 +252,10 @@ class NMDbusInterfaceType(type):
 
         def get_func(self):
             try:
-                data = self.proxy.Get(interface, name, dbus_interface='org.freedesktop.DBus.Properties')
+                if PropertyCache.enabled():
+                    data = PropertyCache.get(self, interface, name)
+                else:
+                    data = self.proxy.Get(interface, name, dbus_interface='org.freedesktop.DBus.Properties')
             except dbus.exceptions.DBusException as e:
                 if e.get_dbus_name() == 'org.freedesktop.DBus.Error.UnknownMethod':
                     raise ObjectVanished(self)
@@ -204,11 +268,13 @@ class NMDbusInterfaceType(type):
         def set_func(self, value):
             value = fixups.to_dbus(cls, 'Set', name, value, attrib['type'])
             try:
-                return self.proxy.Set(interface, name, value, dbus_interface='org.freedesktop.DBus.Properties')
+                ret = self.proxy.Set(interface, name, value, dbus_interface='org.freedesktop.DBus.Properties')
             except dbus.exceptions.DBusException as e:
                 if e.get_dbus_name() == 'org.freedesktop.DBus.Error.UnknownMethod':
                     raise ObjectVanished(self)
                 raise
+            PropertyCache.forget(self.object_path, interface, name)
+            return ret
 
         return property(get_func, set_func)
 
@@ -7,7 +7,16 @@ import re
 import copy
 import pathlib
 import locale
+import atexit
+import shutil
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from io import StringIO
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+from ks_includes.templates import TemplateRegistry, MENU_TEMPLATE_OPTIONS
 
 SCREEN_BLANKING_OPTIONS = [
     60,     # 1 Minute
@@ -20,6 +29,9 @@ SCREEN_BLANKING_OPTIONS = [
     14400,  # 4 Hours
 ]
 
+# Settings are written once they stop changing for this long (ms)
+SAVE_DELAY = 1000
+
 klipperscreendir = pathlib.Path(__file__).parent.resolve().parent
 home = os.path.expanduser("~/")
 printer_data_config = os.path.join(home, "printer_data", "config")
@@ -63,6 +75,14 @@ class KlipperScreenConfig:
         self.defined_config = None
         self.lang = None
         self.langs = {}
+        self.save_timeout = None
+        self.saved_section = None
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="config")
+        self.write_lock = threading.Lock()
+        self.templates = TemplateRegistry()
+        atexit.register(self.flush_user_config)
+        # atexit handlers don't run when systemd stops the service
+        GLib.unix_signal_add(GLib.PRIORITY_HIGH, signal.SIGTERM, self._terminate)
 
         try:
             self.config.read(self.default_config_path)
@@ -127,6 +147,7 @@ class KlipperScreenConfig:
 
         self.create_translations()
         self._create_configurable_options(screen)
+        self.templates.compile_sections(self.config, "menu ", MENU_TEMPLATE_OPTIONS)
 
     def create_translations(self):
         lang_path = os.path.join(klipperscreendir, "ks_includes", "locales")
@@ -157,6 +178,7 @@ class KlipperScreenConfig:
         logging.info(f"Using lang {lang}")
         self.lang = self.langs[lang]
         self.lang.install(names=['gettext', 'ngettext'])
+        self.templates.install_translations(self.lang)
 
     def validate_config(self, config, string="", remove=False):
         valid = True
@@ -177,15 +199,16 @@ class KlipperScreenConfig:
                     'invert_x', 'invert_y', 'invert_z', 'quite_mode', 'autooff_enable', 'safety_printing', 'watch_bed_mesh', 'autoload_bed_mesh',
                     '24htime', 'only_heaters', 'show_cursor', 'confirm_estop',
                     'autoclose_popups', 'use_default_menu', 'side_macro_shortcut', 'use-matchbox-keyboard', #'use_dpms'
-                    'show_heater_power', "show_scroll_steppers", "auto_open_extrude"
+                    'show_heater_power', "show_scroll_steppers", "auto_open_extrude", 'prerender_icons'
                 )
                 strs = (
                     'default_printer', 'language', 'print_sort_dir', 'nozzle_diameter', 'screen_blanking', 'font_size', #'theme'
                     'print_estimate_method', 'screen_blanking', "screen_on_devices", "screen_off_devices", 'print_view',
+                    'prewarm_panels',
                 )
                 numbers = (
                     'job_complete_timeout', 'job_error_timeout', 'move_speed_xy', 'move_speed_z',
-                    'print_estimate_compensation', 'width', 'height'
+                    'print_estimate_compensation', 'width', 'height', 'update_rate', 'rest_pool_size', 'rest_retries'
                 )
             elif section.startswith('printer '):
                 bools = (
@@ -543,6 +566,38 @@ class KlipperScreenConfig:
         self.config.remove_section(section)
 
     def save_user_config_options(self):
+        # Changes made in a burst are written once, see flush_user_config
+        if self.save_timeout is not None:
+            GLib.source_remove(self.save_timeout)
+        self.save_timeout = GLib.timeout_add(SAVE_DELAY, self._save_timeout)
+
+    def _save_timeout(self):
+        self.save_timeout = None
+        self.flush_user_config(wait=False)
+        return False
+
+    def flush_user_config(self, wait=True):
+        if self.save_timeout is not None:
+            GLib.source_remove(self.save_timeout)
+            self.save_timeout = None
+        section = self._build_saved_section()
+        if section == self.saved_section:
+            return
+        self.saved_section = section
+        if wait:
+            # The executor refuses new work once the interpreter is exiting, before atexit handlers run
+            self._write_user_config(section)
+        else:
+            self.writer.submit(self._write_user_config, section)
+
+    def _terminate(self):
+        logging.info("Terminated, saving settings")
+        self.flush_user_config()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.kill(os.getpid(), signal.SIGTERM)
+        return False
+
+    def _build_saved_section(self):
         save_config = configparser.ConfigParser()
         for item in self.configurable_options:
             name = list(item)[0]
@@ -579,7 +634,14 @@ class KlipperScreenConfig:
         save_output = self._build_config_string(save_config).split("\n")
         for i in range(len(save_output)):
             save_output[i] = f"{self.do_not_edit_prefix} {save_output[i]}"
+        return save_output
+
+    def _write_user_config(self, save_output):
+        # A flush on the calling thread must not interleave with a write still running in the executor
+        with self.write_lock:
+            self._write_config_file(save_output)
 
+    def _write_config_file(self, save_output):
         if self.config_path == self.default_config_path:
             user_def = ""
         else:
@@ -606,10 +668,27 @@ class KlipperScreenConfig:
                     filepath = klipperscreendir
             logging.info(f'Creating a new config file in {filepath}')
         try:
-            with open(filepath, 'w') as file:
+            with open(filepath) as file:
+                if file.read() == contents:
+                    return
+        except OSError:
+            pass
+        # A power loss while writing leaves the previous file in place
+        # Write through symlinks, replacing the link would detach it from its target
+        filepath = os.path.realpath(filepath)
+        temp = f"{filepath}.tmp"
+        try:
+            with open(temp, 'w') as file:
                 file.write(contents)
+                file.flush()
+                os.fsync(file.fileno())
+            if os.path.exists(filepath):
+                shutil.copymode(filepath, temp)
+            os.replace(temp, filepath)
         except Exception as e:
             logging.error(f"Error writing configuration file in {filepath}:\n{e}")
+            # Try again on the next change
+            self.saved_section = None
 
     def set(self, section, option, value):
       if section not in self.config:
@@ -1,7 +1,18 @@
 import logging
 import os
+import re
+from collections import deque
 import gi
 gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+from ks_includes import json_codec
+from ks_includes.config import xdg_config
+
+HISTORY_PAGE_SIZE = 200
+# server.files.metadata requests in flight at once
+METADATA_CONCURRENCY = 4
+# Metadata replies are reported to the panels in batches
+NOTIFY_DELAY = 200
 
 
 class KlippyFiles:
@@ -11,12 +22,68 @@ class KlippyFiles:
         self.files = {}
         self.directories = []
         self.gcodes_path = None
+        self.history = {}
+        self.history_loaded = False
+        self.history_loading = False
+        self.metadata_queue = deque()
+        self.metadata_queued = set()
+        self.metadata_in_flight = 0
+        self.updated = {}
+        self.notify_timeout = None
+        self.save_timeout = None
+        printer = re.sub(r'[^\w.-]', '_', screen.connecting_to_printer or "default")
+        self.metadata_cache_path = os.path.join(xdg_config, f"metadata_{printer}.json")
+        self.metadata_cache = self.load_metadata_cache()
 
     def reinit(self):
         self.callbacks.clear()
         self.files.clear()
         self.directories.clear()
         self.gcodes_path = None
+        self.history.clear()
+        self.history_loaded = False
+        self.history_loading = False
+        self.metadata_queue.clear()
+        self.metadata_queued.clear()
+        self.metadata_in_flight = 0
+        self.updated.clear()
+
+    def close(self):
+        # Pending changes belong to this printer's cache file, the timers must not outlive it
+        if self.notify_timeout is not None:
+            GLib.source_remove(self.notify_timeout)
+            self.notify_timeout = None
+        if self.save_timeout is not None:
+            GLib.source_remove(self.save_timeout)
+            self.save_metadata_cache()
+
+    def load_metadata_cache(self):
+        try:
+            with open(self.metadata_cache_path, "rb") as f:
+                cache = json_codec.loads(f.read())
+            logging.info(f"Loaded cached metadata of {len(cache)} files")
+            return cache
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.error(f"Unable to read {self.metadata_cache_path}: {e}")
+            return {}
+
+    def schedule_metadata_cache_save(self):
+        if self.save_timeout is None:
+            self.save_timeout = GLib.timeout_add_seconds(5, self.save_metadata_cache)
+
+    def save_metadata_cache(self):
+        self.save_timeout = None
+        tmp = f"{self.metadata_cache_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.metadata_cache_path), exist_ok=True)
+            with open(tmp, "w") as f:
+                f.write(json_codec.dumps(self.metadata_cache))
+            os.replace(tmp, self.metadata_cache_path)
+        except Exception as e:
+            logging.error(f"Unable to write {self.metadata_cache_path}: {e}")
+        return False
 
     def set_gcodes_path(self):
         virtual_sdcard = self._screen.printer.get_config_section("virtual_sdcard")
@@ -25,41 +92,71 @@ class KlippyFiles:
         logging.info(f"Gcodes path: {self.gcodes_path}")
 
     def _callback(self, result, method, params):
+        if method == "server.files.metadata":
+            self.metadata_in_flight = max(0, self.metadata_in_flight - 1)
+            self.request_next_metadata()
         if "error" in result:
             logging.debug(result["error"])
             return
         if method == "server.files.list":
+            paths = set()
             for item in result["result"]:
+                paths.add(item["path"])
                 self.files[item["path"]] = item
-                self.request_metadata(item["path"])
+                cached = self.metadata_cache.get(item["path"])
+                if cached is not None and cached.get('modified') == item.get('modified'):
+                    self.set_metadata(item["path"], cached)
+                else:
+                    self.request_metadata(item["path"], priority=False)
+            for path in [path for path in self.metadata_cache if path not in paths]:
+                self.metadata_cache.pop(path)
+                self.schedule_metadata_cache_save()
         elif method == "server.files.metadata":
-            for x in result['result']:
-                if params['filename'] not in self.files:
-                    self.files[params['filename']] = {}
-                self.files[params['filename']][x] = result['result'][x]
-            if 'path' not in self.files[params['filename']]:
-                self.files[params['filename']]['path'] = params['filename']
-            if "thumbnails" in self.files[params['filename']]:
-                self.files[params['filename']]['thumbnails'].sort(key=lambda y: y['size'], reverse=True)
-                for thumbnail in self.files[params['filename']]['thumbnails']:
-                    thumbnail['local'] = False
-                    if self.gcodes_path is not None:
-                        path = os.path.join(
-                            os.path.dirname(os.path.join(self.gcodes_path, params['filename'])),
-                            thumbnail['relative_path']
-                        )
-                        if os.access(path, os.R_OK):
-                            thumbnail['local'] = True
-                            thumbnail['path'] = path
-                    if thumbnail['local'] is False:
-                        thumbnail['path'] = os.path.join(
-                            os.path.dirname(params['filename']),
-                            thumbnail['relative_path']
-                        )
-            self._screen.process_update("notify_metadata_update", params)
-            self.run_callbacks(
-                "modify_file", {'action': "modify_file", 'item': self.files[params['filename']]}
+            self.metadata_cache[params['filename']] = result['result']
+            self.schedule_metadata_cache_save()
+            self.set_metadata(params['filename'], result['result'])
+
+    def set_metadata(self, filename, metadata):
+        if filename not in self.files:
+            self.files[filename] = {}
+        self.files[filename].update(metadata)
+        if 'path' not in self.files[filename]:
+            self.files[filename]['path'] = filename
+        if "thumbnails" in self.files[filename]:
+            # Copies, the cached metadata is saved as received from moonraker
+            self.files[filename]['thumbnails'] = sorted(
+                (dict(thumbnail) for thumbnail in self.files[filename]['thumbnails']),
+                key=lambda y: y['size'], reverse=True
             )
+            for thumbnail in self.files[filename]['thumbnails']:
+                thumbnail['local'] = False
+                if self.gcodes_path is not None:
+                    path = os.path.join(
+                        os.path.dirname(os.path.join(self.gcodes_path, filename)),
+                        thumbnail['relative_path']
+                    )
+                    if os.access(path, os.R_OK):
+                        thumbnail['local'] = True
+                        thumbnail['path'] = path
+                if thumbnail['local'] is False:
+                    thumbnail['path'] = os.path.join(
+                        os.path.dirname(filename),
+                        thumbnail['relative_path']
+                    )
+        self.updated[filename] = True
+        if self.notify_timeout is None:
+            self.notify_timeout = GLib.timeout_add(NOTIFY_DELAY, self.notify_updated)
+
+    def notify_updated(self):
+        self.notify_timeout = None
+        filenames = [filename for filename in self.updated if filename in self.files]
+        self.updated.clear()
+        for filename in filenames:
+            self._screen.process_update("notify_metadata_update", {'filename': filename})
+        self.run_callbacks(
+            "modify_files", {'action': "modify_files", 'items': [self.files[filename] for filename in filenames]}
+        )
+        return False
 
     def add_file(self, item):
         if 'path' not in item:
@@ -87,6 +184,10 @@ class KlippyFiles:
             or data['action'].endswith("file") and not self.is_gcode(data['item']['path'])
         ):
             return
+        if data['action'] in {"modify_file", "delete_file"}:
+            self._screen.gtk.thumbnails.cache.invalidate(data['item']['path'])
+        elif data['action'] == "move_file":
+            self._screen.gtk.thumbnails.cache.invalidate(data['source_item']['path'])
         if data['action'] == "create_file":
             self.add_file(data['item'])
         elif data['action'] == "delete_file":
@@ -115,14 +216,34 @@ class KlippyFiles:
             thumb = self.files[filename]['thumbnails'][0]
         return ['file', thumb['path']] if thumb['local'] else ['http', thumb['path']]
 
+    def get_modified(self, filename):
+        return self.files[filename].get('modified', 0) if filename in self.files else 0
+
     def has_thumbnail(self, filename):
         return filename in self.files and "thumbnails" in self.files[filename]
 
-    def request_metadata(self, filename):
-        if self.is_gcode(filename):
-            self._screen._ws.klippy.get_file_metadata(filename, self._callback)
-        else:
+    def request_metadata(self, filename, priority=True):
+        # Requests for files on screen go first, the rest are only fetched when the cached copy is stale
+        if not self.is_gcode(filename):
             logging.info("Not a gcode")
+            return
+        if filename in self.metadata_queued:
+            if not priority:
+                return
+            self.metadata_queue.remove(filename)
+        self.metadata_queued.add(filename)
+        if priority:
+            self.metadata_queue.appendleft(filename)
+        else:
+            self.metadata_queue.append(filename)
+        self.request_next_metadata()
+
+    def request_next_metadata(self):
+        while self.metadata_queue and self.metadata_in_flight < METADATA_CONCURRENCY:
+            filename = self.metadata_queue.popleft()
+            self.metadata_queued.discard(filename)
+            self.metadata_in_flight += 1
+            self._screen._ws.klippy.get_file_metadata(filename, self._callback)
 
     def refresh_files(self):
         self._screen._ws.klippy.get_file_list(self._callback)
@@ -136,7 +257,59 @@ class KlippyFiles:
             logging.info(f"Metadata not found {path}")
             self.request_metadata(path)
             return {}
+        if path in self.metadata_queued:
+            self.request_metadata(path)
         return self.files[path]
 
+    def refresh_history(self):
+        if self.history_loading:
+            return
+        self.history_loading = True
+        self._screen._ws.klippy.get_history_list(0, HISTORY_PAGE_SIZE, self._history_callback)
+
+    def _history_callback(self, result, method, params):
+        if "error" in result or "result" not in result:
+            logging.debug(result.get("error", result))
+            self.history_loading = False
+            return
+        if params['start'] == 0:
+            self.history.clear()
+        jobs = result['result']['jobs']
+        for job in jobs:
+            # Newest first, keep the latest job of each id
+            self.history.setdefault(job['job_id'], job)
+        start = params['start'] + len(jobs)
+        if len(jobs) == params['limit'] and start < result['result']['count']:
+            self._screen._ws.klippy.get_history_list(start, params['limit'], self._history_callback)
+            return
+        logging.info(f"Loaded {len(self.history)} history jobs")
+        self.history_loading = False
+        self.history_loaded = True
+        self.run_callbacks("history_loaded", {'jobs': self.history})
+
+    def process_history_update(self, data):
+        if 'job' not in data:
+            return
+        job = data['job']
+        self.history[job['job_id']] = job
+        if job.get('filename') in self.files:
+            self.files[job['filename']]['job_id'] = job['job_id']
+        cached = self.metadata_cache.get(job.get('filename'))
+        if cached is not None and cached.get('job_id') != job['job_id']:
+            # The file is unchanged, so the cache would otherwise restore the previous job after a restart
+            cached['job_id'] = job['job_id']
+            if 'start_time' in job:
+                cached['print_start_time'] = job['start_time']
+            self.schedule_metadata_cache_save()
+        self.run_callbacks("history_changed", {'action': data.get('action'), 'job': job})
+
+    def get_job(self, job_id):
+        return self.history.get(job_id)
+
+    def get_last_job(self, path):
+        if path not in self.files or 'job_id' not in self.files[path]:
+            return None
+        return self.history.get(self.files[path]['job_id'])
+
     def get_dir_info(self, directory):
         self._screen._ws.klippy.get_dir_info(self._callback, directory=directory)
\ No newline at end of file
@@ -0,0 +1,103 @@
+import logging
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+
+# Commands issued within this window (ms) are merged into one printer.gcode.script
+DEBOUNCE = 150
+
+
+class GcodeChannel:
+    """ Coalesces commands from repeated taps and sliders into a single multi-line gcode script """
+    def __init__(self, api, delay=DEBOUNCE):
+        self._api = api
+        self.delay = delay
+        # key -> [absolute script or None, accumulated amount, render(amount) or None], in first-use order
+        self._entries = {}
+        self._timeout = None
+        self.in_flight = 0
+        self._listeners = []
+
+    @property
+    def depth(self):
+        return len(self._entries) + self.in_flight
+
+    def connect(self, callback):
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def disconnect(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self):
+        for callback in self._listeners:
+            callback(self.depth)
+
+    def set(self, key, script):
+        # Idempotent set-commands, only the last value within the window is sent
+        self._entries[key] = [script, 0, None]
+        self._schedule()
+
+    def adjust(self, key, amount, render):
+        # Relative moves and offsets are summed, render gets the total at flush time
+        entry = self._entries.setdefault(key, [None, 0, None])
+        entry[1] += amount
+        entry[2] = render
+        self._schedule()
+
+    def send(self, script, callback=None, *args):
+        # Commands that must not be merged still go out after the queued ones, in the same script
+        return self.flush(script, callback, *args)
+
+    def clear(self):
+        # Queued commands are dropped, replies to the ones in flight will not arrive
+        if self._timeout is not None:
+            GLib.source_remove(self._timeout)
+            self._timeout = None
+        self._entries.clear()
+        self.in_flight = 0
+        self._notify()
+
+    def _schedule(self):
+        if self._timeout is None:
+            self._timeout = GLib.timeout_add(self.delay, self._flush_timeout)
+        self._notify()
+
+    def _flush_timeout(self):
+        self._timeout = None
+        self.flush()
+        return False
+
+    def flush(self, script=None, callback=None, *args):
+        if self._timeout is not None:
+            GLib.source_remove(self._timeout)
+            self._timeout = None
+        lines = []
+        for absolute, amount, render in self._entries.values():
+            if absolute is not None:
+                lines.append(absolute)
+            if render is not None and round(amount, 6) != 0:
+                lines.append(render(amount))
+        merged = len(self._entries)
+        self._entries.clear()
+        if script:
+            lines.append(script)
+        if not lines:
+            self._notify()
+            return False
+        if merged > 1:
+            logging.debug(f"Merged {merged} queued commands")
+        self.in_flight += 1
+        sent = self._api.gcode_script("\n".join(lines), self._done, callback, *args)
+        if not sent:
+            self.in_flight -= 1
+        self._notify()
+        return sent
+
+    def _done(self, result, method, params, callback=None, *args):
+        self.in_flight = max(0, self.in_flight - 1)
+        self._notify()
+        if callback is not None:
+            callback(result, method, params, *args)
+        return False
@@ -0,0 +1,156 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import GdkPixbuf
+
+MEMORY_LIMIT = 16 * 1024 * 1024
+DISK_LIMIT = 32 * 1024 * 1024
+
+
+class IconCache:
+    """ Theme icons rasterized once per size, kept in memory and as PNG files on disk """
+    def __init__(self, themedir, directory, memory_limit=MEMORY_LIMIT, disk_limit=DISK_LIMIT):
+        self.themedir = themedir
+        self.directory = directory
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk = OrderedDict()
+        self._disk_size = 0
+        self._missing = set()
+        # Icon name to source file, svg preferred over png
+        self.sources = {}
+        for root, _, files in os.walk(themedir):
+            for file in sorted(files, key=lambda f: not f.endswith(".svg")):
+                name, ext = os.path.splitext(os.path.relpath(os.path.join(root, file), themedir))
+                if ext in (".svg", ".png") and name not in self.sources:
+                    self.sources[name] = os.path.join(root, file)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            entries = sorted(os.scandir(directory), key=lambda e: e.stat().st_mtime)
+        except OSError as e:
+            logging.error(f"Icon cache disabled: {e}")
+            self.directory = None
+            return
+        for entry in entries:
+            if entry.name.endswith(".png"):
+                self._disk[entry.name] = entry.stat().st_size
+                self._disk_size += self._disk[entry.name]
+
+    def _filename(self, name, width, height):
+        source = self.sources[name]
+        stamp = hashlib.sha1(f"{source}:{os.path.getmtime(source)}".encode()).hexdigest()[:12]
+        return f"{name.replace(os.sep, '_')}-{width}x{height}-{stamp}.png"
+
+    def get(self, name, width, height):
+        key = (name, int(width), int(height))
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        if name not in self.sources:
+            if name not in self._missing:
+                self._missing.add(name)
+                logging.error(f"Unable to find image {os.path.join(self.themedir, name)}")
+            return None
+        pixbuf = self.load(*key)
+        if pixbuf is not None:
+            self.remember(key, pixbuf)
+        return pixbuf
+
+    def load(self, name, width, height):
+        filename = None
+        if self.directory is not None:
+            filename = self._filename(name, width, height)
+            with self._lock:
+                cached = filename in self._disk
+                if cached:
+                    self._disk.move_to_end(filename)
+            if cached:
+                try:
+                    return GdkPixbuf.Pixbuf.new_from_file(os.path.join(self.directory, filename))
+                except Exception as e:
+                    logging.error(f"Dropping cached icon {filename}: {e}")
+                    self._remove(filename)
+        try:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(self.sources[name], width, height)
+        except Exception as e:
+            logging.error(f"Unable to load image {self.sources[name]}: {e}")
+            return None
+        # Raster sources are as fast to decode as the cached copy
+        if filename is not None and self.sources[name].endswith(".svg"):
+            self.save(filename, pixbuf)
+        return pixbuf
+
+    def save(self, filename, pixbuf):
+        path = os.path.join(self.directory, filename)
+        try:
+            pixbuf.savev(path, "png", [], [])
+            size = os.path.getsize(path)
+        except Exception as e:
+            logging.error(f"Unable to cache icon {filename}: {e}")
+            return
+        with self._lock:
+            self._disk_size += size - self._disk.pop(filename, 0)
+            self._disk[filename] = size
+            evicted = []
+            while self._disk_size > self.disk_limit and len(self._disk) > 1:
+                old, old_size = self._disk.popitem(last=False)
+                self._disk_size -= old_size
+                evicted.append(old)
+        for old in evicted:
+            self._delete(old)
+
+    def remember(self, key, pixbuf):
+        with self._lock:
+            if key in self._memory:
+                self._memory_size -= self._memory.pop(key).get_byte_length()
+            self._memory[key] = pixbuf
+            self._memory_size += pixbuf.get_byte_length()
+            while self._memory_size > self.memory_limit and len(self._memory) > 1:
+                self._memory_size -= self._memory.popitem(last=False)[1].get_byte_length()
+
+    def _remove(self, filename):
+        with self._lock:
+            self._disk_size -= self._disk.pop(filename, 0)
+        self._delete(filename)
+
+    def _delete(self, filename):
+        try:
+            os.remove(os.path.join(self.directory, filename))
+        except OSError as e:
+            logging.debug(f"Unable to remove cached icon {filename}: {e}")
+
+    def prerender(self, sizes):
+        # Fills the disk cache only, so the memory budget is left to the icons actually shown
+        if self.directory is None:
+            return
+        start = time.monotonic()
+        rendered = 0
+        for size in sorted({int(size) for size in sizes}):
+            for name, source in self.sources.items():
+                if not source.endswith(".svg"):
+                    continue
+                filename = self._filename(name, size, size)
+                with self._lock:
+                    if filename in self._disk:
+                        continue
+                try:
+                    pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(source, size, size)
+                except Exception as e:
+                    logging.error(f"Unable to load image {source}: {e}")
+                    continue
+                self.save(filename, pixbuf)
+                rendered += 1
+        if rendered:
+            logging.info(f"Rasterized {rendered} icons in {time.monotonic() - start:.1f}s")
+
+    def prerender_async(self, sizes):
+        threading.Thread(target=self.prerender, args=(sizes,), name="icons", daemon=True).start()
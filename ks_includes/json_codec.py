@@ -0,0 +1,51 @@
+import logging
+import re
+
+try:
+    import orjson
+
+    def loads(message):
+        return orjson.loads(message)
+
+    def dumps(data):
+        return orjson.dumps(data).decode()
+
+    decoder = "orjson"
+except ImportError:
+    try:
+        import ujson
+
+        def loads(message):
+            return ujson.loads(message)
+
+        def dumps(data):
+            return ujson.dumps(data, ensure_ascii=False, escape_forward_slashes=False)
+
+        decoder = "ujson"
+    except ImportError:
+        import json
+
+        def loads(message):
+            return json.loads(message)
+
+        def dumps(data):
+            return json.dumps(data)
+
+        decoder = "json"
+
+logging.info(f"Using {decoder} to decode Moonraker messages")
+
+# Temperature reports (M105 / auto-report) sent as gcode responses, e.g. "B:60.0 /60.0 T0:210.0 /210.0"
+# The two members are matched separately, so the keys may come in any order. Quotes inside JSON strings
+# are escaped, so neither pattern can match inside a string value.
+TEMPERATURE_METHOD = re.compile(r'"method"\s*:\s*"notify_gcode_response"')
+TEMPERATURE_PARAMS = re.compile(r'"params"\s*:\s*\[\s*"(?:ok\s+)?(?:B|C|T\d*):')
+
+
+def is_temperature_response(message):
+    # Peek at the start of the raw frame instead of decoding it
+    if isinstance(message, bytes):
+        message = message[:160].decode(errors="ignore")
+    else:
+        message = message[:160]
+    return TEMPERATURE_METHOD.search(message) is not None and TEMPERATURE_PARAMS.search(message) is not None
@@ -0,0 +1,116 @@
+from collections import deque
+from math import sqrt
+from statistics import median
+
+
+class WindowMedian:
+    """ Exact median of the samples pushed since the last reset, keeping at most the newest maxlen """
+    __slots__ = ("_samples",)
+
+    def __init__(self, maxlen=64):
+        self._samples = deque(maxlen=maxlen)
+
+    @property
+    def count(self):
+        return len(self._samples)
+
+    def reset(self):
+        self._samples.clear()
+
+    def push(self, value):
+        self._samples.append(value)
+
+    def value(self):
+        return median(self._samples) if self._samples else 0.0
+
+
+class Ewma:
+    """ Exponentially weighted moving average """
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, alpha, value=None):
+        self.alpha = alpha
+        self.value = value
+
+    def push(self, sample):
+        if self.value is None:
+            self.value = sample
+        else:
+            self.value += self.alpha * (sample - self.value)
+        return self.value
+
+
+class EtaModel:
+    """ Print time estimates from the slicer, file position and filament used, blended for the auto method """
+    # The blended total is only replaced when it moves by more than this fraction or these seconds
+    hysteresis = .01
+    min_change = 30
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.method = None
+        self.slicer_time = self.filament_time = self.file_time = 0
+        self.estimated = 0
+        self.print_duration = 0
+        self.progress = 0
+
+    def update(self, method, total_duration, print_duration, fila_used, progress, metadata, speed_factor):
+        if method != self.method:
+            self.method = method
+            self.estimated = 0
+        self.slicer_time = self.filament_time = self.file_time = 0
+
+        if 'estimated_time' in metadata and metadata['estimated_time'] > 1:
+            self.slicer_time = metadata['estimated_time'] / sqrt(speed_factor)
+            if print_duration < 1:
+                print_duration = self.slicer_time * progress
+        elif print_duration < 1:  # No-extrusion
+            print_duration = total_duration
+
+        if 'filament_total' in metadata and metadata['filament_total'] >= fila_used > 0:
+            self.filament_time = print_duration / (fila_used / metadata['filament_total'])
+        if progress > 0:
+            self.file_time = print_duration / progress
+
+        estimated = self._estimate(method, print_duration, progress)
+        if method != "auto" or abs(estimated - self.estimated) > max(self.min_change, estimated * self.hysteresis):
+            self.estimated = estimated
+        self.print_duration = print_duration
+        if self.estimated > 1:
+            progress = min(max(print_duration / self.estimated, 0), 1)
+        self.progress = progress
+        return self.estimated
+
+    def _estimate(self, method, print_duration, progress):
+        slicer_time, filament_time, file_time = self.slicer_time, self.filament_time, self.file_time
+        if method == "file":
+            return file_time
+        if method == "filament":
+            return filament_time
+        if method == "slicer":
+            return slicer_time
+        if print_duration < slicer_time > 1:
+            if progress < 0.15:
+                # At the begining file and filament are innacurate
+                return slicer_time
+            if filament_time > 1 and file_time > 1:
+                # Weighted arithmetic mean (Slicer is the most accurate)
+                return (slicer_time * 3 + filament_time + file_time) / 5
+            if file_time > 1:
+                # Weighted arithmetic mean (Slicer is the most accurate)
+                return (slicer_time * 2 + file_time) / 3
+        elif print_duration < filament_time > 1 and file_time > 1:
+            return (filament_time + file_time) / 2
+        elif file_time > 1:
+            return file_time
+        return 0
+
+
+def update_label(widget, text):
+    # set_label queues a resize even when the text is the same
+    if widget.get_label() == text:
+        return False
+    widget.set_label(text)
+    return True
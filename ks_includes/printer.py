@@ -4,10 +4,13 @@ import gi
 gi.require_version("Gtk", "3.0")
 from gi.repository import GLib
 from typing import Union
+from ks_includes.tempstore import TempSeries
+from ks_includes.printer_config import PrinterConfig, FAN_TYPES
 
 class Printer:
     def __init__(self, state_cb, state_callbacks) -> None:
         self.config = {}
+        self.index = PrinterConfig()
         self.data = {}
         self.state = "disconnected"
         self.state_cb = state_cb
@@ -23,81 +26,45 @@ class Printer:
         self.store_timeout = None
         self.tempstore = {}
         self.tempstore_size = 1200
+        # Number of samples stored since the tempstore was initialized, including the history from moonraker
+        self.tempstore_count = 0
         self.cameras = []
         self.available_commands = {}
         self.system_info = {}
         self.spoolman = False
-        self.temp_devices = self.sensors = None
 
     def reinit(self, printer_info, data) -> None:
         self.config = data['configfile']['config']
         self.data = data
         self.devices.clear()
-        self.tools.clear()
-        self.extrudercount = 0
-        self.tempdevcount = 0
-        self.fancount = 0
-        self.ledcount = 0
-        self.output_pin_count = 0
         self.tempstore.clear()
         self.tempstore_size = 1200
         self.available_commands.clear()
         self.system_info.clear()
-        self.temp_devices = self.sensors = None
         self.stop_tempstore_updates()
+        self.index_config()
 
-        for x in self.config.keys():
-            if x[:8] == "extruder":
-                self.tools.append(x)
-                self.tools = sorted(self.tools)
-                self.extrudercount += 1
-                if x.startswith('extruder_stepper'):
-                    continue
-                self.devices[x] = {
-                    "temperature": 0,
-                    "target": 0
-                }
-            if x == 'heater_bed' \
-                    or x.startswith('heater_generic ') \
-                    or x.startswith('temperature_sensor ') \
-                    or x.startswith('temperature_fan '):
-                self.devices[x] = {"temperature": 0}
-                if not x.startswith('temperature_sensor '):
-                    self.devices[x]["target"] = 0
-                # Support for hiding devices by name
-                name = x.split()[1] if len(x.split()) > 1 else x
-                if not name.startswith("_"):
-                    self.tempdevcount += 1
-            if x == 'fan' \
-                    or x.startswith('controller_fan ') \
-                    or x.startswith('heater_fan ') \
-                    or x.startswith('fan_generic '):
-                # Support for hiding devices by name
-                name = x.split()[1] if len(x.split()) > 1 else x
-                if not name.startswith("_"):
-                    self.fancount += 1
-            if x.startswith('output_pin ') and not x.split()[1].startswith("_"):
-                self.output_pin_count += 1
-            if x.startswith('bed_mesh '):
-                try:
-                    r = self.config[x]
-                    r['x_count'] = int(r['x_count'])
-                    r['y_count'] = int(r['y_count'])
-                    r['max_x'] = float(r['max_x'])
-                    r['min_x'] = float(r['min_x'])
-                    r['max_y'] = float(r['max_y'])
-                    r['min_y'] = float(r['min_y'])
-                    r['points'] = [[float(j.strip()) for j in i.split(",")] for i in r['points'].strip().split("\n")]
-                except KeyError:
-                    logging.debug(f"Couldn't load mesh {x}: {self.config[x]}")
-            if x.startswith('led') \
-                    or x.startswith('neopixel ') \
-                    or x.startswith('dotstar ') \
-                    or x.startswith('pca9533 ') \
-                    or x.startswith('pca9632 '):
-                name = x.split()[1] if len(x.split()) > 1 else x
-                if not name.startswith("_"):
-                    self.ledcount += 1
+        for x in self.index.extruders:
+            self.devices[x] = {
+                "temperature": 0,
+                "target": 0
+            }
+        for x in self.index.heaters + self.index.temp_sensors + self.index.temp_fans:
+            self.devices[x] = {"temperature": 0}
+            if not x.startswith('temperature_sensor '):
+                self.devices[x]["target"] = 0
+        for x in self.index.of_type("bed_mesh"):
+            try:
+                r = self.config[x]
+                r['x_count'] = int(r['x_count'])
+                r['y_count'] = int(r['y_count'])
+                r['max_x'] = float(r['max_x'])
+                r['min_x'] = float(r['min_x'])
+                r['max_y'] = float(r['max_y'])
+                r['min_y'] = float(r['min_y'])
+                r['points'] = [[float(j.strip()) for j in i.split(",")] for i in r['points'].strip().split("\n")]
+            except KeyError:
+                logging.debug(f"Couldn't load mesh {x}: {self.config[x]}")
         self.process_update(data)
 
         logging.info(f"Klipper version: {printer_info['software_version']}")
@@ -107,6 +74,15 @@ class Printer:
         logging.info(f"# Output pins: {self.output_pin_count}")
         logging.info(f"# Leds: {self.ledcount}")
 
+    def index_config(self) -> None:
+        self.index = PrinterConfig(self.config)
+        self.tools = self.index.tools
+        self.extrudercount = self.index.counts['extruders']
+        self.tempdevcount = self.index.counts['temperature_devices']
+        self.fancount = self.index.counts['fans']
+        self.ledcount = self.index.counts['leds']
+        self.output_pin_count = self.index.counts['output_pins']
+
     def stop_tempstore_updates(self) -> None:
         logging.info("Stopping tempstore")
         if self.store_timeout is not None:
@@ -116,12 +92,15 @@ class Printer:
     def process_update(self, data) -> None:
         if self.data is None:
             return
-        for x in (self.get_temp_devices() + self.get_filament_sensors()):
+        for x in self.index.status_devices:
             if x in data:
                 for i in data[x]:
                   self.set_dev_stat(x, i, data[x][i])
         for x in data:
             if x == "configfile":
+                if 'config' in data[x] and data[x]['config'] is not self.config:
+                    self.config = data[x]['config']
+                    self.index_config()
                 if not 'save_config_pending' in data[x] or not 'save_config_pending_items' in data[x]:
                     continue
             if x not in self.data:
@@ -185,14 +164,14 @@ class Printer:
         logging.debug(f"Cameras: {self.cameras}")
 
     def get_config_section_list(self, search="") -> list:
-        if self.config is not None:
-            return [i for i in list(self.config) if i.startswith(search)] if hasattr(self, "config") else []
-        return []
+        return self.index.search(search)
 
     def get_config_section(self, section) -> Union[dict, bool]:
         return self.config[section] if section in self.config else False
 
     def get_macro(self, macro) -> Union[dict, bool]:
+        if macro in self.index.macros:
+            return self.index.macros[macro]
         return next(
             (
                 self.config[key]
@@ -202,50 +181,31 @@ class Printer:
             False,
         )
 
-    def get_fans(self, fan_types = ["controller_fan", "fan_generic", "heater_fan"], append_fan = True) -> list:
-        fans = []
-        if append_fan and self.config_section_exists("fan"):
-            fans.append("fan")
-        for fan_type in fan_types:
-            fans.extend(iter(self.get_config_section_list(f"{fan_type} ")))
-        return fans
+    def get_fans(self, fan_types=FAN_TYPES, append_fan=True) -> list:
+        if tuple(fan_types) == FAN_TYPES and append_fan:
+            return self.index.fans
+        return self.index.get_fans(fan_types, append_fan)
 
     def get_output_pins(self) -> list:
-        return self.get_config_section_list("output_pin ")
+        return self.index.output_pins
 
     def get_gcode_macros(self) -> list:
-        macros = []
-        for macro in self.get_config_section_list("gcode_macro "):
-            macro = macro[12:].strip()
-            if macro.startswith("_") or macro.upper() in ('LOAD_FILAMENT', 'UNLOAD_FILAMENT'):
-                continue
-            if self.get_macro(macro) and "rename_existing" in self.get_macro(macro):
-                continue
-            macros.append(macro)
-        return macros
+        return self.index.gcode_macros
 
     def get_neopixels(self) -> list:
-        neopixels = []
-        neopixels.extend(iter(self.get_config_section_list("neopixel ")))
-        return neopixels
+        return self.index.of_type("neopixel")
     
     def get_heaters(self) -> list:
-        heaters = self.get_config_section_list("heater_generic ")
-        if "heater_bed" in self.devices:
-            heaters.insert(0, "heater_bed")
-        return heaters
+        return self.index.heaters
 
     def get_temp_fans(self) -> list:
-        return self.get_config_section_list("temperature_fan")
+        return self.index.temp_fans
 
     def get_temp_sensors(self) -> list:
-        return self.get_config_section_list("temperature_sensor")
+        return self.index.temp_sensors
     
     def get_filament_sensors(self) -> list:
-        if self.sensors is None:
-            self.sensors = list(self.get_config_section_list("filament_switch_sensor "))
-            self.sensors.extend(iter(self.get_config_section_list("filament_motion_sensor ")))
-        return self.sensors
+        return self.index.filament_sensors
 
     def get_probe(self) -> Union[dict, bool, None]:
         probe_types = ["probe", "bltouch", "smart_effector", "dockable_probe"]
@@ -267,38 +227,20 @@ class Printer:
                 "temperature_devices": {"count": self.tempdevcount},
                 "fans": {"count": self.fancount},
                 "output_pins": {"count": self.output_pin_count},
-                "gcode_macros": {"count": len(self.get_gcode_macros())},
+                "gcode_macros": {"count": len(self.index.gcode_macros)},
                 "leds": {"count": self.ledcount},
-                "config_sections": [section for section in self.config.keys()],
+                "config_sections": self.index.sections,
             }
         }
 
     def get_leds(self) -> list:
-        return [
-            led
-            for led_type in ["dotstar", "led", "neopixel", "pca9533", "pca9632"]
-            for led in self.get_config_section_list(f"{led_type} ")
-            if not led.split()[1].startswith("_")
-        ]
+        return self.index.leds
 
     def get_led_color_order(self, led) -> Union[str, None]:
-        if led not in self.config or led not in self.data:
+        if led not in self.index.led_color_orders or led not in self.data:
             logging.debug(f"Error getting {led} config")
             return None
-        elif "color_order" in self.config[led]:
-            return self.config[led]["color_order"]
-        colors = ''
-        for option in self.config[led]:
-            if option in ("red_pin", 'initial_RED') and 'R' not in colors:
-                colors += 'R'
-            elif option in ("green_pin", 'initial_GREEN') and 'G' not in colors:
-                colors += 'G'
-            elif option in ("blue_pin", 'initial_BLUE') and 'B' not in colors:
-                colors += 'B'
-            elif option in ("white_pin", 'initial_WHITE') and 'W' not in colors:
-                colors += 'W'
-        logging.debug(f"Colors in led: {colors}")
-        return colors
+        return self.index.led_color_orders[led]
     
     def get_power_devices(self) -> list:
         return list(self.power_devices)
@@ -327,14 +269,11 @@ class Printer:
             return speed
         if "speed" in self.data[fan]:
             speed = self.data[fan]["speed"]
-        if 'max_power' in self.config[fan]:
-            max_power = float(self.config[fan]['max_power'])
-            if max_power > 0:
-                speed = speed / max_power
-        if 'off_below' in self.config[fan]:
-            off_below = float(self.config[fan]['off_below'])
-            if speed < off_below:
-                speed = 0
+        max_power, off_below = self.index.fan_limits(fan)
+        if max_power > 0:
+            speed = speed / max_power
+        if speed < off_below:
+            speed = 0
         return speed
 
     def get(self, section, option=None, default=None):
@@ -368,55 +307,53 @@ class Printer:
         if section is not False:
             if section not in self.tempstore[device]:
                 return False
-            if results == 0 or results >= len(self.tempstore[device][section]):
-                return self.tempstore[device][section]
-            return self.tempstore[device][section][-results:]
+            return self.tempstore[device][section].window(results)
 
-        temp = {}
-        for section in self.tempstore[device]:
-            if results == 0 or results >= len(self.tempstore[device][section]):
-                temp[section] = self.tempstore[device][section]
-            temp[section] = self.tempstore[device][section][-results:]
-        return temp
+        return {section: self.tempstore[device][section].window(results) for section in self.tempstore[device]}
+
+    def get_temp_series(self, device, section) -> Union[TempSeries, None]:
+        if device not in self.tempstore or section not in self.tempstore[device]:
+            return None
+        return self.tempstore[device][section]
+
+    def get_temp_store_max(self, device, section, results=0) -> Union[float, None]:
+        if device not in self.tempstore or section not in self.tempstore[device]:
+            return None
+        return self.tempstore[device][section].max(results)
 
     def get_tempstore_size(self) -> int:
         return self.tempstore_size
     
     def get_temp_devices(self) -> list:
-        if self.temp_devices is None:
-            devices = [
-                device
-                for device in self.tools
-                if not device.startswith('extruder_stepper')
-            ]
-            self.temp_devices = devices + self.get_heaters() + self.get_temp_sensors() + self.get_temp_fans()
-        return self.temp_devices
+        return self.index.temp_devices
     
     def get_tools(self) -> list:
         return self.tools
 
     def get_tool_number(self, tool) -> int:
-        return self.tools.index(tool)
+        return self.index.tool_numbers[tool]
 
     def init_temp_store(self, tempstore) -> None:
-        if self.tempstore and set(self.tempstore) != set(tempstore):
+        changed = self.tempstore and set(self.tempstore) != set(tempstore)
+        self.tempstore = {
+            device: {
+                x: TempSeries(max(self.tempstore_size, len(values)), values)
+                for x, values in tempstore[device].items()
+            }
+            for device in tempstore
+        }
+        self.tempstore_count = max(
+            (series.capacity for device in self.tempstore.values() for series in device.values()), default=0
+        )
+        if changed:
             logging.debug("Tempstore has changed")
-            self.tempstore = tempstore
             self.change_state(self.state)
-        else:
-            self.tempstore = tempstore
-        for device in self.tempstore:
-            for x in self.tempstore[device]:
-                length = len(self.tempstore[device][x])
-                if length < self.tempstore_size:
-                    for _ in range(1, self.tempstore_size - length):
-                        self.tempstore[device][x].insert(0, 0)
         logging.info(f"Temp store: {list(self.tempstore)}")
         if not self.store_timeout:
             self.store_timeout = GLib.timeout_add_seconds(1, self._update_temp_store)
 
     def config_section_exists(self, section) -> bool:
-        return section in self.get_config_section_list()
+        return section in self.config
 
     def set_dev_stat(self, dev, stat, value) -> None:
         if dev not in self.devices:
@@ -428,11 +365,9 @@ class Printer:
             return False
         for device in self.tempstore:
             for x in self.tempstore[device]:
-                self.tempstore[device][x].pop(0)
                 temp = self.get_dev_stat(device, x[:-1])
-                if temp is None:
-                    temp = 0
-                self.tempstore[device][x].append(temp)
+                self.tempstore[device][x].push(temp or 0)
+        self.tempstore_count += 1
         return True
     
     def enable_spoolman(self) -> None:
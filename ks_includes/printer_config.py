@@ -0,0 +1,107 @@
+import logging
+
+FAN_TYPES = ("controller_fan", "fan_generic", "heater_fan")
+LED_TYPES = ("dotstar", "led", "neopixel", "pca9533", "pca9632")
+LED_COLOR_OPTIONS = (
+    ("R", ("red_pin", "initial_RED")),
+    ("G", ("green_pin", "initial_GREEN")),
+    ("B", ("blue_pin", "initial_BLUE")),
+    ("W", ("white_pin", "initial_WHITE")),
+)
+
+
+def is_hidden(section):
+    # Support for hiding devices by name
+    split = section.split()
+    return len(split) > 1 and split[1].startswith("_")
+
+
+class PrinterConfig:
+    """ Index of the klipper configfile built once, so section lookups don't scan the whole config """
+    def __init__(self, config=None):
+        self.config = config or {}
+        self.sections = list(self.config)
+        self.by_type = {}
+        for section in self.sections:
+            split = section.split(maxsplit=1)
+            if len(split) > 1:
+                self.by_type.setdefault(split[0], []).append(section)
+        self._searches = {}
+
+        self.tools = sorted(section for section in self.sections if section.startswith("extruder"))
+        self.tool_numbers = {tool: i for i, tool in enumerate(self.tools)}
+        self.extruders = [tool for tool in self.tools if not tool.startswith("extruder_stepper")]
+        self.heaters = (["heater_bed"] if "heater_bed" in self.config else []) + self.of_type("heater_generic")
+        self.temp_sensors = self.of_type("temperature_sensor")
+        self.temp_fans = self.of_type("temperature_fan")
+        self.temp_devices = self.extruders + self.heaters + self.temp_sensors + self.temp_fans
+        self.filament_sensors = self.of_type("filament_switch_sensor") + self.of_type("filament_motion_sensor")
+        self.status_devices = self.temp_devices + self.filament_sensors
+        self.fans = self.get_fans(FAN_TYPES, True)
+        self.output_pins = self.of_type("output_pin")
+        self.leds = [led for led_type in LED_TYPES for led in self.of_type(led_type) if not is_hidden(led)]
+
+        self.macros = {section[12:].strip(): self.config[section] for section in self.of_type("gcode_macro")}
+        self.gcode_macros = [
+            macro for macro, section in self.macros.items()
+            if not macro.startswith("_")
+            and macro.upper() not in ("LOAD_FILAMENT", "UNLOAD_FILAMENT")
+            and "rename_existing" not in section
+        ]
+
+        self._fan_limits = {}
+        self.led_color_orders = {
+            led: self._led_color_order(led) for led_type in LED_TYPES for led in self.of_type(led_type)
+        }
+
+        self.counts = {
+            "extruders": len(self.tools),
+            "temperature_devices": sum(not is_hidden(dev) for dev in self.heaters + self.temp_sensors + self.temp_fans),
+            "fans": sum(not is_hidden(fan) for fan in self.fans),
+            "output_pins": sum(not is_hidden(pin) for pin in self.output_pins),
+            "leds": sum(
+                not is_hidden(section) for section in self.sections
+                if section.startswith("led") or section.split()[0] in LED_TYPES
+            ),
+        }
+
+    def of_type(self, section_type):
+        return self.by_type.get(section_type, [])
+
+    def search(self, prefix):
+        if not prefix:
+            return self.sections
+        if prefix[-1] == " " and " " not in prefix[:-1]:
+            return self.of_type(prefix[:-1])
+        if prefix not in self._searches:
+            self._searches[prefix] = [section for section in self.sections if section.startswith(prefix)]
+        return self._searches[prefix]
+
+    def get_fans(self, fan_types, append_fan):
+        fans = ["fan"] if append_fan and "fan" in self.config else []
+        for fan_type in fan_types:
+            fans.extend(self.of_type(fan_type))
+        return fans
+
+    def fan_limits(self, fan):
+        if fan not in self._fan_limits:
+            try:
+                self._fan_limits[fan] = (
+                    float(self.config[fan].get("max_power", 1)),
+                    float(self.config[fan].get("off_below", 0)),
+                )
+            except ValueError as e:
+                logging.debug(f"Error parsing {fan} config: {e}")
+                self._fan_limits[fan] = (1, 0)
+        return self._fan_limits[fan]
+
+    def _led_color_order(self, led):
+        if "color_order" in self.config[led]:
+            return self.config[led]["color_order"]
+        colors = ''
+        for option in self.config[led]:
+            for color, options in LED_COLOR_OPTIONS:
+                if option in options and color not in colors:
+                    colors += color
+                    break
+        return colors
@@ -12,6 +12,10 @@ class ScreenPanel:
     _gtk = None
     _apiclient = None
     ks_printer_cfg = None
+    # Printer objects and fields used by the panel, on top of the ones always subscribed by the screen
+    # Keys can also be a group of devices: tools, heaters, temp_sensors, temp_fans, fans,
+    # filament_sensors, output_pins or leds. None subscribes to everything
+    subscriptions = None
 
     def __init__(self, screen, title, **kwargs):
         self.menu = None
@@ -52,11 +56,21 @@ class ScreenPanel:
             return None
         width = width if width is not None else self._gtk.img_width
         height = height if height is not None else self._gtk.img_height
-        if loc[0] == "file":
-            return self._gtk.PixbufFromFile(loc[1], width, height)
-        if loc[0] == "http":
-            return self._gtk.PixbufFromHttp(loc[1], width, height)
-        return None
+        return self._gtk.thumbnails.get(filename, self._files.get_modified(filename), loc, width, height)
+
+    def get_file_image_async(self, filename, width, height, small, callback, *args):
+        # Returns False when there is no thumbnail, otherwise the callback receives the pixbuf or None
+        if not self._files.has_thumbnail(filename):
+            return False
+        loc = self._files.get_thumbnail_location(filename, small)
+        if loc is None:
+            return False
+        self._gtk.thumbnails.load(filename, self._files.get_modified(filename), loc, width, height, callback, *args)
+        return True
+
+    def request_async(self, method, callback, *args, ttl=0):
+        # The panel is shown at once and filled in when moonraker answers
+        self._screen.apiclient.send_request_async(method, callback, *args, ttl=ttl)
 
     def menu_item_clicked(self, widget, item):
         if 'extra' in item:
@@ -0,0 +1,78 @@
+import logging
+import threading
+import time
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+
+
+class StatusDispatcher:
+    """ Coalesces notify_status_update frames between the websocket thread and the GTK main loop """
+    def __init__(self, callback, rate=30):
+        self._callback = callback
+        self._lock = threading.Lock()
+        self._pending = None
+        self._timeout = None
+        self._last_delivery = 0
+        self.interval = 1 / rate if rate > 0 else 0
+        self.received = 0
+        self.merged = 0
+        self.delivered = 0
+
+    def push_status(self, status):
+        # Runs on the websocket thread
+        with self._lock:
+            self.received += 1
+            if self._pending is None:
+                self._pending = status
+            else:
+                # Moonraker sends whole field values, only objects need to be merged
+                for obj, fields in status.items():
+                    if obj in self._pending:
+                        self._pending[obj].update(fields)
+                    else:
+                        self._pending[obj] = fields
+                self.merged += 1
+            if self._timeout is None:
+                delay = max(0, self._last_delivery + self.interval - time.monotonic())
+                self._timeout = GLib.timeout_add(int(delay * 1000), self._flush, priority=GLib.PRIORITY_HIGH_IDLE)
+
+    def push_event(self, callback, *args):
+        # Ordered events must not overtake a status update that arrived before them
+        with self._lock:
+            if self._pending is not None:
+                GLib.idle_add(self._deliver, self._take_pending(), priority=GLib.PRIORITY_HIGH_IDLE)
+            GLib.idle_add(callback, *args, priority=GLib.PRIORITY_HIGH_IDLE)
+
+    def _take_pending(self):
+        status = self._pending
+        self._pending = None
+        return status
+
+    def _flush(self):
+        with self._lock:
+            self._timeout = None
+            if self._pending is None:
+                return False
+            status = self._take_pending()
+        self._deliver(status)
+        return False
+
+    def _deliver(self, status):
+        self._last_delivery = time.monotonic()
+        self.delivered += 1
+        self._callback("notify_status_update", status)
+        return False
+
+    def clear(self):
+        with self._lock:
+            if self._timeout is not None:
+                GLib.source_remove(self._timeout)
+                self._timeout = None
+            self._pending = None
+
+    def get_stats(self):
+        return {"received": self.received, "merged": self.merged, "delivered": self.delivered}
+
+    def log_stats(self):
+        logging.debug(f"Status updates: {self.get_stats()}")
@@ -0,0 +1,104 @@
+import logging
+from collections.abc import Mapping
+from jinja2 import Environment, meta, nodes
+
+MENU_TEMPLATE_OPTIONS = ("name", "icon", "style", "params", "confirm", "enable", "sensitive")
+_MISSING = object()
+
+
+class CompiledTemplate:
+    """ A parsed expression, the status fields it reads and its last rendered value """
+    __slots__ = ("template", "paths", "error", "key", "value")
+
+    def __init__(self, template=None, paths=(), error=None):
+        self.template = template
+        self.paths = paths
+        self.error = error
+        self.key = None
+        self.value = None
+
+
+class TemplateRegistry:
+    """ Compiles each menu expression once and renders it again only when the fields it reads change """
+    def __init__(self):
+        self.env = Environment(extensions=["jinja2.ext.i18n"], autoescape=True)
+        self._templates = {}
+
+    def install_translations(self, lang):
+        self.env.install_gettext_translations(lang)
+        # Expressions without status fields were folded in the previous language
+        self.reset()
+
+    def reset(self):
+        for compiled in self._templates.values():
+            compiled.key = None
+            compiled.value = None
+
+    def get(self, source):
+        compiled = self._templates.get(source)
+        if compiled is None:
+            compiled = self._templates[source] = self.compile(source)
+        return compiled
+
+    def compile(self, source):
+        try:
+            ast = self.env.parse(source)
+            names = meta.find_undeclared_variables(ast) - set(self.env.globals)
+            paths = tuple(sorted(path for path in self._find_paths(ast) if path[0] in names))
+            return CompiledTemplate(self.env.from_string(ast), paths)
+        except Exception as e:
+            logging.debug(f"Error compiling template: {source}\n{e}")
+            return CompiledTemplate(error=e)
+
+    def _find_paths(self, node):
+        path = self._path(node)
+        if path is not None:
+            yield path
+            return
+        for child in node.iter_child_nodes():
+            yield from self._find_paths(child)
+
+    def _path(self, node):
+        # printer.fans.count and printer['fans'].count both read ('printer', 'fans', 'count')
+        if isinstance(node, nodes.Name) and node.ctx == "load":
+            return (node.name,)
+        if isinstance(node, nodes.Getattr):
+            base = self._path(node.node)
+            return None if base is None else base + (node.attr,)
+        if isinstance(node, nodes.Getitem) and isinstance(node.arg, nodes.Const):
+            base = self._path(node.node)
+            return None if base is None else base + (node.arg.value,)
+        return None
+
+    @staticmethod
+    def _lookup(data, path):
+        value = data
+        for part in path:
+            if isinstance(value, Mapping):
+                value = value.get(part, _MISSING)
+            else:
+                value = getattr(value, str(part), _MISSING)
+            if value is _MISSING:
+                return None
+        return value
+
+    def render(self, source, data=None):
+        compiled = self.get(source)
+        if compiled.error is not None:
+            raise compiled.error
+        data = data or {}
+        key = tuple(repr(self._lookup(data, path)) for path in compiled.paths)
+        if key != compiled.key:
+            compiled.value = compiled.template.render(data)
+            compiled.key = key
+        return compiled.value
+
+    def compile_sections(self, config, prefix, options):
+        start = len(self._templates)
+        for section in config.sections():
+            if section.startswith(prefix):
+                for option in options:
+                    source = config[section].get(option, None)
+                    if source:
+                        self.get(source)
+        logging.debug(f"Compiled {len(self._templates) - start} templates")
@@ -0,0 +1,84 @@
+from array import array
+from itertools import chain
+
+
+class TempSeries:
+    """ Fixed capacity ring buffer of samples, the oldest sample is overwritten on push """
+    __slots__ = ("capacity", "_data", "_head", "_max")
+
+    def __init__(self, capacity, values=()):
+        values = [float(v or 0) for v in values[-capacity:]]
+        self.capacity = capacity
+        # Pad the beginning with zeros so the series is always full
+        self._data = array('f', [0.0] * (capacity - len(values)) + values)
+        self._head = 0
+        self._max = {}
+
+    def __len__(self):
+        return self.capacity
+
+    def push(self, value):
+        overwritten = self._data[self._head]
+        self._data[self._head] = float(value)
+        # Read back the stored single precision value so it compares equal to the buffer contents
+        value = self._data[self._head]
+        self._head = (self._head + 1) % self.capacity
+        for size in list(self._max):
+            # The sample leaving a window of this size, the whole buffer loses the overwritten one
+            if size < self.capacity:
+                outgoing = self._data[(self._head - size - 1) % self.capacity]
+            else:
+                outgoing = overwritten
+            if value >= self._max[size]:
+                self._max[size] = value
+            elif outgoing >= self._max[size]:
+                del self._max[size]
+
+    def window(self, size=0):
+        if size <= 0 or size > self.capacity:
+            size = self.capacity
+        return SeriesWindow(self, size)
+
+    def max(self, size=0):
+        if size <= 0 or size > self.capacity:
+            size = self.capacity
+        if size not in self._max:
+            self._max[size] = max(self.window(size))
+        return self._max[size]
+
+    def last(self):
+        return self._data[self._head - 1]
+
+    def get(self, age):
+        # Sample pushed `age` updates ago, 0 is the latest one
+        if age >= self.capacity:
+            return 0.0
+        return self._data[(self._head - 1 - age) % self.capacity]
+
+
+class SeriesWindow:
+    """ View of the last samples of a TempSeries, iterates the ring buffer without copying it """
+    __slots__ = ("_series", "_size")
+
+    def __init__(self, series, size):
+        self._series = series
+        self._size = size
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def __iter__(self):
+        data = memoryview(self._series._data)
+        start = (self._series._head - self._size) % self._series.capacity
+        if start + self._size <= self._series.capacity:
+            return iter(data[start:start + self._size])
+        return chain(data[start:], data[:self._series._head])
+
+    def __getitem__(self, index):
+        if not -self._size <= index < self._size:
+            raise IndexError("window index out of range")
+        index %= self._size
+        return self._series._data[(self._series._head - self._size + index) % self._series.capacity]
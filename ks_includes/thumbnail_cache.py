@@ -0,0 +1,147 @@
+import hashlib
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import GdkPixbuf
+
+BUCKET_STEP = 64
+MEMORY_LIMIT = 32 * 1024 * 1024
+DISK_LIMIT = 64 * 1024 * 1024
+
+
+class ThumbnailCache:
+    """ Pre-scaled thumbnails keyed by gcode path, modification time and size, in memory and on disk """
+    def __init__(self, directory, memory_limit=MEMORY_LIMIT, disk_limit=DISK_LIMIT):
+        self.directory = directory
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk = OrderedDict()
+        self._disk_size = 0
+        try:
+            os.makedirs(directory, exist_ok=True)
+            entries = sorted(os.scandir(directory), key=lambda e: e.stat().st_mtime)
+        except OSError as e:
+            logging.error(f"Thumbnail cache disabled: {e}")
+            self.directory = None
+            return
+        for entry in entries:
+            if entry.name.endswith(".png"):
+                self._disk[entry.name] = entry.stat().st_size
+                self._disk_size += self._disk[entry.name]
+        logging.info(f"Thumbnail cache: {len(self._disk)} files, {self._disk_size / 1024:.0f} KiB in {directory}")
+
+    @staticmethod
+    def bucket(width, height):
+        return BUCKET_STEP * math.ceil(max(width, height, 1) / BUCKET_STEP)
+
+    @staticmethod
+    def _prefix(path):
+        return hashlib.sha1(path.encode()).hexdigest()[:20]
+
+    def _filename(self, path, source, modified, bucket):
+        source = hashlib.sha1(f"{source}:{modified}".encode()).hexdigest()[:12]
+        return f"{self._prefix(path)}-{source}-{bucket}.png"
+
+    def get_memory(self, path, source, modified, width, height):
+        key = (path, source, modified, int(width), int(height))
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        return None
+
+    def get(self, path, source, modified, width, height):
+        pixbuf = self.get_memory(path, source, modified, width, height)
+        if pixbuf is not None:
+            return pixbuf
+        key = (path, source, modified, int(width), int(height))
+        with self._lock:
+            if self.directory is None:
+                return None
+            name = self._filename(path, source, modified, self.bucket(width, height))
+            if name not in self._disk:
+                return None
+            self._disk.move_to_end(name)
+        filename = os.path.join(self.directory, name)
+        try:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(filename, int(width), int(height))
+            os.utime(filename)
+        except Exception as e:
+            logging.error(f"Dropping cached thumbnail {name}: {e}")
+            self._remove_files([name])
+            return None
+        self.remember(key, pixbuf)
+        return pixbuf
+
+    def put(self, path, source, modified, width, height, pixbuf):
+        # pixbuf is scaled to the size bucket, the returned one fits the requested size
+        if self.directory is not None:
+            name = self._filename(path, source, modified, self.bucket(width, height))
+            filename = os.path.join(self.directory, name)
+            try:
+                pixbuf.savev(filename, "png", [], [])
+                size = os.path.getsize(filename)
+            except Exception as e:
+                logging.error(f"Unable to cache thumbnail {path}: {e}")
+            else:
+                with self._lock:
+                    self._disk_size += size - self._disk.pop(name, 0)
+                    self._disk[name] = size
+                    evicted = []
+                    while self._disk_size > self.disk_limit and len(self._disk) > 1:
+                        old, old_size = self._disk.popitem(last=False)
+                        self._disk_size -= old_size
+                        evicted.append(old)
+                self._delete(evicted)
+        pixbuf = self.scale(pixbuf, width, height)
+        self.remember((path, source, modified, int(width), int(height)), pixbuf)
+        return pixbuf
+
+    @staticmethod
+    def scale(pixbuf, width, height):
+        ratio = min(width / pixbuf.get_width(), height / pixbuf.get_height())
+        if ratio >= 1:
+            return pixbuf
+        return pixbuf.scale_simple(
+            max(1, round(pixbuf.get_width() * ratio)), max(1, round(pixbuf.get_height() * ratio)),
+            GdkPixbuf.InterpType.BILINEAR
+        )
+
+    def remember(self, key, pixbuf):
+        size = pixbuf.get_byte_length()
+        with self._lock:
+            if key in self._memory:
+                self._memory_size -= self._memory.pop(key).get_byte_length()
+            self._memory[key] = pixbuf
+            self._memory_size += size
+            while self._memory_size > self.memory_limit and len(self._memory) > 1:
+                self._memory_size -= self._memory.popitem(last=False)[1].get_byte_length()
+
+    def invalidate(self, path):
+        prefix = self._prefix(path)
+        with self._lock:
+            for key in [key for key in self._memory if key[0] == path]:
+                self._memory_size -= self._memory.pop(key).get_byte_length()
+            names = [name for name in self._disk if name.startswith(prefix)]
+        if names:
+            self._remove_files(names)
+
+    def _remove_files(self, names):
+        with self._lock:
+            for name in names:
+                self._disk_size -= self._disk.pop(name, 0)
+        self._delete(names)
+
+    def _delete(self, names):
+        for name in names:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError as e:
+                logging.debug(f"Unable to remove cached thumbnail {name}: {e}")
@@ -0,0 +1,90 @@
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import GdkPixbuf, Gio, GLib
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+class ThumbnailLoader:
+    """ Decodes gcode thumbnails on a worker pool and hands the pixbufs back to the GTK main loop """
+    def __init__(self, screen, cache, workers=2):
+        self._screen = screen
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnails")
+        self._lock = threading.Lock()
+        # Requests for the same image and size share one decode
+        self._pending = {}
+
+    def load(self, filename, modified, location, width, height, callback, *args):
+        pixbuf = self.cache.get_memory(filename, location[1], modified, width, height)
+        if pixbuf is not None:
+            callback(pixbuf, *args)
+            return
+        key = (filename, modified, tuple(location), int(width), int(height))
+        with self._lock:
+            if key in self._pending:
+                self._pending[key].append((callback, args))
+                return
+            self._pending[key] = [(callback, args)]
+        self._executor.submit(self._load, key)
+
+    def _load(self, key):
+        pixbuf = self.get(*key)
+        with self._lock:
+            callbacks = self._pending.pop(key, [])
+        GLib.idle_add(self._deliver, pixbuf, callbacks)
+
+    def get(self, filename, modified, location, width, height):
+        source, path = location
+        pixbuf = self.cache.get(filename, path, modified, width, height)
+        if pixbuf is not None:
+            return pixbuf
+        try:
+            data = self.read(source, path)
+            if not data:
+                return None
+            # Decoded at the size bucket so other callers with a similar size can reuse the cached file
+            bucket = self.cache.bucket(width, height)
+            return self.cache.put(filename, path, modified, width, height, self.decode(data, bucket, bucket))
+        except Exception as e:
+            logging.error(f"Unable to load thumbnail {path}: {e}")
+            return None
+
+    def read(self, source, path):
+        if source == "file":
+            with open(path, "rb") as f:
+                return f.read()
+        if source == "http":
+            return self._screen.apiclient.get_thumbnail_stream(path)
+        return None
+
+    @staticmethod
+    def decode(data, width, height):
+        try:
+            stream = Gio.MemoryInputStream.new_from_bytes(GLib.Bytes.new(data))
+            pixbuf = GdkPixbuf.Pixbuf.new_from_stream_at_scale(stream, width, height, True, None)
+            stream.close(None)
+            return pixbuf
+        except GLib.Error:
+            if Image is None:
+                raise
+        # Formats without a gdk-pixbuf loader on this system
+        image = Image.open(io.BytesIO(data)).convert("RGBA")
+        image.thumbnail((width, height))
+        return GdkPixbuf.Pixbuf.new_from_bytes(
+            GLib.Bytes.new(image.tobytes()), GdkPixbuf.Colorspace.RGB, True, 8,
+            image.width, image.height, image.width * 4
+        )
+
+    @staticmethod
+    def _deliver(pixbuf, callbacks):
+        for callback, args in callbacks:
+            callback(pixbuf, *args)
+        return False
@@ -1,596 +1,287 @@
 import traceback
+import threading
 import gi
 gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, Gdk
+from gi.repository import Gtk, Gdk, GLib
 import cairo
 import numpy as np
 import math
 import time
 import logging
 
-class FastBedMap(Gtk.DrawingArea):
+# Максимум квадратов по стороне в превью во время жестов
+PREVIEW_QUADS = 12
+
+class BedMapScene:
     """
-    Ультра-быстрый bed map рендерер
-    Фиксированная сетка, простейшая проекция, минимум вычислений
+    Состояние вида и отрисовка bed mesh через cairo, без GTK:
+    копию можно отрисовать в фоновом потоке
     """
-    
-    def __init__(self, width=400, height=400):
-        super().__init__()
-        
-        # Размеры
-        self.width = width
-        self.height = height
-        self.set_size_request(width, height)
-        self.z_min = -0.25
-        self.z_max = 0.25
-        # Центр виджета (центр экрана)
-        self.widget_center_x = width // 2
-        self.widget_center_y = height // 2
 
-        # Вид (фиксированная изометрия для скорости)
-        self.angle = 45
-        self.elevation = 30
-        self.scale = 80
+    def projection_matrix(self):
+        """Матрица 3x2 изометрической проекции (уже с масштабом) для координат относительно центра вращения"""
+        angle_rad = math.radians(self.angle)
+        sin_e = math.sin(math.radians(self.elevation))
+        cos_a = math.cos(angle_rad)
+        sin_a = math.sin(angle_rad)
+        return np.array([
+            [cos_a, sin_a * sin_e],
+            [-sin_a, cos_a * sin_e],
+            [0, -0.3]
+        ], dtype=np.float64) * self.scale
 
-        # Центр вращения (будет установлен в auto_center_view)
-        self.rotation_center = (0, 0, 0)
+    def project_3d_to_2d(self, x, y, z):
+        """Проекция 3D точки в 2D (изометрическая) с центром вращения в середине плоскости"""
+        point = np.array([x, y, z], dtype=np.float64) - self.rotation_center
+        screen_x, screen_y = point @ self.projection_matrix()
+        # И центрируем в середине виджета
+        return float(screen_x + self.widget_center_x), float(screen_y + self.widget_center_y)
 
-        # Параметры для скорости
-        self.GRID_SIZE = 16  # Фиксированный размер! 16x16 = 144 вершины
-        self.QUALITY = 1     # 1=треугольники, 2=с подразделением (используем 1)
-        
-        # Данные
-        self.heights = np.zeros((self.GRID_SIZE, self.GRID_SIZE), dtype=np.float32)
-        self.colors = np.zeros((self.GRID_SIZE, self.GRID_SIZE, 3), dtype=np.float32)
-        self.visible = False
-        
-        # Кэш проекций (ОЧЕНЬ важно!)
-        self.proj_cache = None
-        self.cache_valid = False
-        
-        # FPS контроль
-        self.last_draw = 0
-        self.fps = 0
-        self.frame_count = 0
-        self.target_fps = 15
-        
-        # Состояние
-        self.dragging = False
-        self.last_x = 0
-        self.last_y = 0
+    def draw_coordinate_grids(self, cr):
+        """Рисование координатных сеток на всех плоскостях"""
+        if not self.show_grid:
+            return
         
-        # Цвета (как в Pseudo3D)
-        self.bg_color = (0.41, 0.41, 0.41)  # Серый фон как в Pseudo3D
-        self.text_color = (0.9, 0.9, 0.9)   # Светлый текст
-        self.grid_color = (0.7, 0.7, 0.7, 0.6)  # Полупрозрачная сетка
-        self.axes_colors = [
-            (1.0, 0.0, 0.0),  # X - красный
-            (0.0, 1.0, 0.0),  # Y - зеленый
-            (0.0, 0.0, 1.0)   # Z - синий
-        ]
-        self.plane_color = (0.5, 0.5, 0.5, 0.3)  # Полупрозрачная плоскость
+        cr.set_line_width(0.5)
         
-        # Флаги отображения
-        self.show_grid = True
-        self.show_axes = True
-        self.show_info = True
-        self.show_plane = True  # Показать плоскость
+        # Сетка на плоскости XY (Z=0)
+        if len(self.grid_color) == 4:
+            cr.set_source_rgba(*self.grid_color)
+        else:
+            cr.set_source_rgb(*self.grid_color)
         
-        # Параметры системы координат
-        self.bed_size = 1.0
-        self.axis_length = self.bed_size  # Длина осей X и Y
-        self.z_height = 4.0     # УВЕЛИЧЕНА высота оси Z (было 1.0)
+        # Сетка XY (горизонтальная плоскость на Z=0)
+        grid_steps = 8
+        step_size = self.bed_size / (grid_steps - 1)
         
-        # Начало координат (левый нижний угол)
-        self.origin = (-self.z_height / 2, -self.z_height / 2, self.z_height / 2)
+        for i in range(grid_steps):
+            # Линии параллельные X (горизонтальные)
+            y = self.origin[1] + i * step_size
+            x_start = self.origin[0]
+            x_end = self.origin[0] + self.bed_size
+            z_level = 0  # Z=0
+            
+            sx, sy = self.project_3d_to_2d(x_start, y, z_level)
+            ex, ey = self.project_3d_to_2d(x_end, y, z_level)
+            
+            cr.move_to(sx, sy)
+            cr.line_to(ex, ey)
+            cr.stroke()
+            
+            # Линии параллельные Y (вертикальные на плоскости XY)
+            x = self.origin[0] + i * step_size
+            y_start = self.origin[1]
+            y_end = self.origin[1] + self.bed_size
+            
+            sx, sy = self.project_3d_to_2d(x, y_start, z_level)
+            ex, ey = self.project_3d_to_2d(x, y_end, z_level)
+            
+            cr.move_to(sx, sy)
+            cr.line_to(ex, ey)
+            cr.stroke()
         
-        # Мультитач состояние
-        self.touch_state = {
-            'active': False,
-            'start_distance': 0,
-            'start_scale': self.scale,
-            'touch1': None,
-            'touch2': None
-        }
+        # Более светлый цвет для вертикальных плоскостей
+        cr.set_source_rgba(0.6, 0.6, 0.6, 0.4)
         
-        # Словарь для отслеживания точек касания
-        self._touch_points = {}
-
-        # Подключение
-        self.connect("draw", self.on_draw)
-        # Подключаем обработчик изменения размера
-        self.connect("size-allocate", self.on_size_allocate)
+        # Сетка на плоскости XZ (вертикальная плоскость по X, на Y = origin[1])
+        y_fixed = self.origin[1]  # Фиксированная Y для плоскости XZ
+        z_steps = 8  # Увеличили количество шагов по Z
         
-        # Настраиваем события
-        self.set_events(
-            Gdk.EventMask.BUTTON_PRESS_MASK |
-            Gdk.EventMask.BUTTON_RELEASE_MASK |
-            Gdk.EventMask.POINTER_MOTION_MASK |
-            Gdk.EventMask.SCROLL_MASK |
-            Gdk.EventMask.SMOOTH_SCROLL_MASK |  # Для плавной прокрутки
-            Gdk.EventMask.TOUCH_MASK            # Для touch событий
-        )
+        for i in range(z_steps):
+            # Горизонтальные линии на разных уровнях Z
+            z = (i / (z_steps - 1)) * self.z_height
+            x_start = self.origin[0]
+            x_end = self.origin[0] + self.bed_size
+            
+            sx, sy = self.project_3d_to_2d(x_start, y_fixed, z)
+            ex, ey = self.project_3d_to_2d(x_end, y_fixed, z)
+            
+            cr.move_to(sx, sy)
+            cr.line_to(ex, ey)
+            cr.stroke()
         
-        # Подключаем обработчики
-        self.connect("button-press-event", self.on_button_press)
-        self.connect("button-release-event", self.on_button_release)
-        self.connect("motion-notify-event", self.on_motion_notify)
-        self.connect("scroll-event", self.on_scroll)
-        self.connect("touch-event", self.on_touch_event)
+        for i in range(grid_steps):
+            # Вертикальные линии на разных позициях X
+            x = self.origin[0] + i * step_size
+            z_start = 0
+            z_end = self.z_height
+            
+            sx, sy = self.project_3d_to_2d(x, y_fixed, z_start)
+            ex, ey = self.project_3d_to_2d(x, y_fixed, z_end)
+            
+            cr.move_to(sx, sy)
+            cr.line_to(ex, ey)
+            cr.stroke()
         
-        # Предварительные вычисления для скорости
-        self.precompute_grid_coords()
+        # Сетка на плоскости YZ (вертикальная плоскость по Y, на X = origin[0])
+        x_fixed = self.origin[0]  # Фиксированная X для плоскости YZ
         
-        # Инициализация осей
-        self.init_axes()
+        for i in range(z_steps):
+            # Горизонтальные линии на разных уровнях Z
+            z = (i / (z_steps - 1)) * self.z_height
+            y_start = self.origin[1]
+            y_end = self.origin[1] + self.bed_size
+            
+            sx, sy = self.project_3d_to_2d(x_fixed, y_start, z)
+            ex, ey = self.project_3d_to_2d(x_fixed, y_end, z)
+            
+            cr.move_to(sx, sy)
+            cr.line_to(ex, ey)
+            cr.stroke()
         
-        logging.info(f"FastBedMap initialized: {self.GRID_SIZE}x{self.GRID_SIZE}")
+        for i in range(grid_steps):
+            # Вертикальные линии на разных позициях Y
+            y = self.origin[1] + i * step_size
+            z_start = 0
+            z_end = self.z_height
+            
+            sx, sy = self.project_3d_to_2d(x_fixed, y, z_start)
+            ex, ey = self.project_3d_to_2d(x_fixed, y, z_end)
+            
+            cr.move_to(sx, sy)
+            cr.line_to(ex, ey)
+            cr.stroke()
 
-    def on_size_allocate(self, widget, allocation):
-        """Обработчик изменения размера виджета"""
-        new_width = allocation.width
-        new_height = allocation.height
+    def draw_axes(self, cr):
+        """Рисование осей координат"""
+        if not self.show_axes:
+            return
         
-        if new_width != self.width or new_height != self.height:
-            self.width = new_width
-            self.height = new_height
-            self.widget_center_x = new_width // 2
-            self.widget_center_y = new_height // 2
-            self.cache_valid = False
-            self.queue_draw()
-
-    def init_axes(self):
-        """Инициализация данных осей координат"""
-        # Оси координат (начинаются от начала координат)
-        self.axes = [
-            # X ось (красная) - вдоль нижнего края
-            # {
-            #     'start': (self.origin[0], self.origin[1], 0),
-            #     'end': (self.origin[0] + self.axis_length, self.origin[1], 0),#self.origin[2]),
-            #     'color': self.axes_colors[0],
-            #     'label': 'X'
-            # },
-            # # Y ось (зеленая) - вдоль левого края
-            # {
-            #     'start': (self.origin[0], self.origin[1] + self.axis_length, 0),
-            #     'end': (self.origin[0], self.origin[1], 0),#self.origin[2]),
-            #     'color': self.axes_colors[1],
-            #     'label': 'Y',
-            #     'arrow_direction': 'down'
-            # },
-            # Z ось (синяя) - вертикально от начала координат ВВЕРХ
-            {
-                'start': self.origin,
-                'end': (self.origin[0], self.origin[1], self.z_height),  # Используем увеличенную высоту
-                'color': self.axes_colors[2],
-                'label': 'Z',
-                'arrow_direction': 'up'  # Направление стрелки вверх
-            },
-            # Z ось (синяя) - вертикально от начала координат ВНИЗ
-            {
-                'start': self.origin,
-                'end': (self.origin[0], self.origin[1], 0),  # Ось Z вниз (до полупрозрачной сетки)
-                'color': self.axes_colors[2],
-                'label': '-Z',
-                'arrow_direction': 'down'  # Направление стрелки вниз
-            }
-        ]
-    
-    def on_touch_event(self, widget, event):
-        """Обработка мультитач жестов (pinch-to-zoom и pan)"""
-        event_type = event.type
+        cr.set_line_width(2.0)
         
-        if event_type == Gdk.EventType.TOUCH_BEGIN:
-            # Начало касания
-            sequence = event.sequence
+        for axis in self.axes:
+            # Проекция точек оси
+            start_x, start_y = self.project_3d_to_2d(*axis['start'])
+            end_x, end_y = self.project_3d_to_2d(*axis['end'])
             
-            # Сохраняем точку касания
-            self._touch_points[sequence] = (event.x, event.y, time.time())
+            # Рисуем линию оси
+            cr.set_source_rgb(*axis['color'])
+            cr.move_to(start_x, start_y)
+            cr.line_to(end_x, end_y)
+            cr.stroke()
             
-            # Проверяем количество активных касаний
-            active_touches = len(self._touch_points)
+            # Рисуем стрелку только если ось достаточно длинная
+            arrow_length = math.sqrt((end_x - start_x)**2 + (end_y - start_y)**2)
+            if arrow_length > 5:
+                self.draw_arrow(cr, (end_x, end_y), (start_x, start_y), axis['color'])
             
-            if active_touches == 1:
-                # Одно касание - начало pan жеста (перетаскивание)
-                self.dragging = True
-                self.last_x = event.x
-                self.last_y = event.y
-                return True
-                
-            elif active_touches == 2:
-                # Два касания - начало pinch жеста (масштабирование)
-                self.touch_state['active'] = True
-                
-                # Получаем координаты двух точек
-                points = list(self._touch_points.values())
-                self.touch_state['touch1'] = (points[0][0], points[0][1])
-                self.touch_state['touch2'] = (points[1][0], points[1][1])
-                
-                # Вычисляем начальное расстояние между пальцами
-                dx = self.touch_state['touch2'][0] - self.touch_state['touch1'][0]
-                dy = self.touch_state['touch2'][1] - self.touch_state['touch1'][1]
-                self.touch_state['start_distance'] = math.sqrt(dx*dx + dy*dy)
-                self.touch_state['start_scale'] = self.scale
-                
-                # Отключаем dragging при pinch жесте
-                self.dragging = False
-                return True
+            # Подпись оси - по центру оси со смещением
+            cr.set_source_rgb(*axis['color'])
+            cr.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, 
+                              cairo.FONT_WEIGHT_BOLD)
+            cr.set_font_size(12)
             
-            return True
-                
-        elif event_type == Gdk.EventType.TOUCH_UPDATE:
-            sequence = event.sequence
+            # Вычисляем середину оси
+            mid_x = (start_x + end_x) / 2
+            mid_y = (start_y + end_y) / 2
             
-            if sequence in self._touch_points:
-                # Обновляем позицию точки
-                self._touch_points[sequence] = (event.x, event.y, time.time())
-                
-                # Проверяем количество активных касаний
-                active_touches = len(self._touch_points)
+            # Смещение для подписи
+            label_offset = 20
+            
+            # Для каждой оси своя логика смещения относительно направления
+            # if axis['label'] == 'X':
+            #     # Для оси X - смещение перпендикулярно вниз
+            #     dx = end_x - start_x
+            #     dy = end_y - start_y
+            #     length = math.sqrt(dx*dx + dy*dy)
                 
-                if active_touches == 2 and self.touch_state['active']:
-                    # Pinch жест (масштабирование двумя пальцами)
-                    points = list(self._touch_points.values())
-                    touch1 = (points[0][0], points[0][1])
-                    touch2 = (points[1][0], points[1][1])
-                    
-                    # Вычисляем текущее расстояние между пальцами
-                    dx = touch2[0] - touch1[0]
-                    dy = touch2[1] - touch1[1]
-                    current_distance = math.sqrt(dx*dx + dy*dy)
-                    
-                    if self.touch_state['start_distance'] > 0 and current_distance > 0:
-                        # Вычисляем коэффициент масштабирования
-                        scale_factor = current_distance / self.touch_state['start_distance']
-                        
-                        # Применяем масштабирование с плавностью
-                        new_scale = self.touch_state['start_scale'] * scale_factor
-                        
-                        # Ограничиваем масштаб
-                        self.scale = max(30, min(300, new_scale))
-                        
-                        # Инвалидируем кэш
-                        self.cache_valid = False
-                        self.queue_draw()
+            #     if length > 0:
+            #         # Перпендикулярный вектор (повернутый на 90 градусов)
+            #         perp_dx = -dy / length
+            #         perp_dy = dx / length
                     
-                    return True
+            #         # Смещаем перпендикулярно вниз от центра
+            #         label_x = mid_x - perp_dx * label_offset
+            #         label_y = mid_y - perp_dy * label_offset
                     
-                elif active_touches == 1 and self.dragging:
-                    # Pan жест (перетаскивание одним пальцем)
-                    dx = event.x - self.last_x
-                    dy = event.y - self.last_y
+            #         # Выравниваем текст
+            #         extents = cr.text_extents('X')
+            #         cr.move_to(label_x - extents.width/2, label_y + extents.height/2)
+            #         cr.show_text('X')
+            
+            # elif axis['label'] == 'Y':
+            #     # Для оси Y - смещение перпендикулярно влево
+            #     dx = end_x - start_x
+            #     dy = end_y - start_y
+            #     length = math.sqrt(dx*dx + dy*dy)
+                
+            #     if length > 0:
+            #         # Перпендикулярный вектор (повернутый на 90 градусов)
+            #         perp_dx = -dy / length
+            #         perp_dy = dx / length
                     
-                    # Вращение - инвертируем горизонталь
-                    self.angle -= dx * 0.5
-                    self.elevation += dy * 0.5
+            #         # Смещаем перпендикулярно влево от центра
+            #         label_x = mid_x - perp_dx * label_offset
+            #         label_y = mid_y - perp_dy * label_offset
                     
-                    # Ограничения углов
-                    self.angle = self.angle % 360
-                    self.elevation = max(10, min(80, self.elevation))
+            #         # Выравниваем текст
+            #         extents = cr.text_extents('Y')
+            #         cr.move_to(label_x - extents.width/2, label_y + extents.height/2)
+            #         cr.show_text('Y')
+            
+            if axis['label'] == 'Z':
+                # Для оси Z вверх - смещение вправо и вверх от центра
+                dx = end_x - start_x
+                dy = end_y - start_y
+                length = math.sqrt(dx*dx + dy*dy)
+                
+                if length > 0:
+                    # Направляющий вектор оси
+                    dir_dx = dx / length
+                    dir_dy = dy / length
                     
-                    # Инвалидируем кэш
-                    self.cache_valid = False
+                    # Перпендикулярный вектор
+                    perp_dx = -dir_dy
+                    perp_dy = dir_dx
                     
-                    self.last_x = event.x
-                    self.last_y = event.y
+                    # Смещаем перпендикулярно и немного вдоль оси
+                    label_x = mid_x + perp_dx * label_offset - dir_dx * 5
+                    label_y = mid_y + perp_dy * label_offset - dir_dy * 5
                     
-                    self.queue_draw()
-                    return True
-            
-            return True
-                
-        elif event_type == Gdk.EventType.TOUCH_END or event_type == Gdk.EventType.TOUCH_CANCEL:
-            sequence = event.sequence
+                    # Выравниваем текст
+                    extents = cr.text_extents('Z')
+                    cr.move_to(label_x - extents.width/2, label_y + extents.height/2)
+                    cr.show_text('Z')
             
-            if sequence in self._touch_points:
-                # Удаляем точку касания
-                del self._touch_points[sequence]
-                
-                # Проверяем количество оставшихся касаний
-                remaining_touches = len(self._touch_points)
+            # elif axis['label'] == '-Z':
+            #     # Для оси Z вниз - смещение влево и вниз от центра
+            #     dx = end_x - start_x
+            #     dy = end_y - start_y
+            #     length = math.sqrt(dx*dx + dy*dy)
                 
-                if remaining_touches == 0:
-                    # Все касания завершены - сбрасываем состояние
-                    self.dragging = False
-                    self.touch_state['active'] = False
-                    self.touch_state['touch1'] = None
-                    self.touch_state['touch2'] = None
-                    self.touch_state['start_distance'] = 0
+            #     if length > 0:
+            #         # Направляющий вектор оси
+            #         dir_dx = dx / length
+            #         dir_dy = dy / length
                     
-                elif remaining_touches == 1 and self.touch_state['active']:
-                    # Был pinch жест, осталось одно касание - переключаемся на pan
-                    self.touch_state['active'] = False
-                    self.touch_state['touch1'] = None
-                    self.touch_state['touch2'] = None
-                    self.touch_state['start_distance'] = 0
+            #         # Перпендикулярный вектор
+            #         perp_dx = -dir_dy
+            #         perp_dy = dir_dx
                     
-                    # Активируем dragging для оставшегося касания
-                    self.dragging = True
-                    points = list(self._touch_points.values())
-                    self.last_x = points[0][0]
-                    self.last_y = points[0][1]
-                
-                return True
-        
-        return False
+            #         # Смещаем перпендикулярно и немного вдоль оси
+            #         label_x = mid_x + perp_dx * label_offset + dir_dx * 5
+            #         label_y = mid_y + perp_dy * label_offset + dir_dy * 5
+                    
+                    # Выравниваем текст
+                    # extents = cr.text_extents('-Z')
+                    # cr.move_to(label_x - extents.width/2, label_y + extents.height/2)
+                    # cr.show_text('-Z')
 
-    def precompute_grid_coords(self):
-        """Предварительное вычисление координат сетки (делается 1 раз!)"""
-        self.grid_x = np.zeros((self.GRID_SIZE, self.GRID_SIZE), dtype=np.float32)
-        self.grid_y = np.zeros((self.GRID_SIZE, self.GRID_SIZE), dtype=np.float32)
-        
-        for i in range(self.GRID_SIZE):
-            for j in range(self.GRID_SIZE):
-                # Координаты относительно начала координат
-                self.grid_x[i, j] = self.origin[0] + (j / (self.GRID_SIZE - 1)) * self.bed_size
-                self.grid_y[i, j] = self.origin[1] + (i / (self.GRID_SIZE - 1)) * self.bed_size
-    
-    def project_3d_to_2d(self, x, y, z):
-        """Проекция 3D точки в 2D (изометрическая) с центром вращения в середине плоскости"""
-        # Смещаем координаты относительно центра вращения
-        x_centered = x - self.rotation_center[0]
-        y_centered = y - self.rotation_center[1]
-        z_centered = z - self.rotation_center[2]
-        
-        angle_rad = math.radians(self.angle)
-        elev_rad = math.radians(self.elevation)
-        cos_a = math.cos(angle_rad)
-        sin_a = math.sin(angle_rad)
-        sin_e = math.sin(elev_rad)
-        
-        # Изометрическая проекция смещенных координат
-        # И центрируем в середине виджета
-        screen_x = (x_centered * cos_a - y_centered * sin_a) * self.scale + self.widget_center_x
-        screen_y = (x_centered * sin_a + y_centered * cos_a) * sin_e * self.scale - z_centered * self.scale * 0.3 + self.widget_center_y
-        
-        return screen_x, screen_y
-    
-    def draw_coordinate_grids(self, cr):
-        """Рисование координатных сеток на всех плоскостях"""
-        if not self.show_grid:
+    def draw_origin_label(self, cr):
+        """Рисование подписи (0, 0) в точке начала сетки с высотой bed mesh"""
+        if not self.show_axes:
             return
         
-        cr.set_line_width(0.5)
-        
-        # Сетка на плоскости XY (Z=0)
-        if len(self.grid_color) == 4:
-            cr.set_source_rgba(*self.grid_color)
+        # Проверяем, есть ли данные bed mesh
+        if not self.visible or np.all(self.heights == 0):
+            # Если нет данных, используем Z=0
+            origin_z = 0
         else:
-            cr.set_source_rgb(*self.grid_color)
+            # Используем высоту первой точки bed mesh
+            origin_z = self.heights[self.GRID_SIZE - 1, 0] + self.z_height / 2
         
-        # Сетка XY (горизонтальная плоскость на Z=0)
-        grid_steps = 8
-        step_size = self.bed_size / (grid_steps - 1)
-        
-        for i in range(grid_steps):
-            # Линии параллельные X (горизонтальные)
-            y = self.origin[1] + i * step_size
-            x_start = self.origin[0]
-            x_end = self.origin[0] + self.bed_size
-            z_level = 0  # Z=0
-            
-            sx, sy = self.project_3d_to_2d(x_start, y, z_level)
-            ex, ey = self.project_3d_to_2d(x_end, y, z_level)
-            
-            cr.move_to(sx, sy)
-            cr.line_to(ex, ey)
-            cr.stroke()
-            
-            # Линии параллельные Y (вертикальные на плоскости XY)
-            x = self.origin[0] + i * step_size
-            y_start = self.origin[1]
-            y_end = self.origin[1] + self.bed_size
-            
-            sx, sy = self.project_3d_to_2d(x, y_start, z_level)
-            ex, ey = self.project_3d_to_2d(x, y_end, z_level)
-            
-            cr.move_to(sx, sy)
-            cr.line_to(ex, ey)
-            cr.stroke()
-        
-        # Более светлый цвет для вертикальных плоскостей
-        cr.set_source_rgba(0.6, 0.6, 0.6, 0.4)
-        
-        # Сетка на плоскости XZ (вертикальная плоскость по X, на Y = origin[1])
-        y_fixed = self.origin[1]  # Фиксированная Y для плоскости XZ
-        z_steps = 8  # Увеличили количество шагов по Z
-        
-        for i in range(z_steps):
-            # Горизонтальные линии на разных уровнях Z
-            z = (i / (z_steps - 1)) * self.z_height
-            x_start = self.origin[0]
-            x_end = self.origin[0] + self.bed_size
-            
-            sx, sy = self.project_3d_to_2d(x_start, y_fixed, z)
-            ex, ey = self.project_3d_to_2d(x_end, y_fixed, z)
-            
-            cr.move_to(sx, sy)
-            cr.line_to(ex, ey)
-            cr.stroke()
-        
-        for i in range(grid_steps):
-            # Вертикальные линии на разных позициях X
-            x = self.origin[0] + i * step_size
-            z_start = 0
-            z_end = self.z_height
-            
-            sx, sy = self.project_3d_to_2d(x, y_fixed, z_start)
-            ex, ey = self.project_3d_to_2d(x, y_fixed, z_end)
-            
-            cr.move_to(sx, sy)
-            cr.line_to(ex, ey)
-            cr.stroke()
-        
-        # Сетка на плоскости YZ (вертикальная плоскость по Y, на X = origin[0])
-        x_fixed = self.origin[0]  # Фиксированная X для плоскости YZ
-        
-        for i in range(z_steps):
-            # Горизонтальные линии на разных уровнях Z
-            z = (i / (z_steps - 1)) * self.z_height
-            y_start = self.origin[1]
-            y_end = self.origin[1] + self.bed_size
-            
-            sx, sy = self.project_3d_to_2d(x_fixed, y_start, z)
-            ex, ey = self.project_3d_to_2d(x_fixed, y_end, z)
-            
-            cr.move_to(sx, sy)
-            cr.line_to(ex, ey)
-            cr.stroke()
-        
-        for i in range(grid_steps):
-            # Вертикальные линии на разных позициях Y
-            y = self.origin[1] + i * step_size
-            z_start = 0
-            z_end = self.z_height
-            
-            sx, sy = self.project_3d_to_2d(x_fixed, y, z_start)
-            ex, ey = self.project_3d_to_2d(x_fixed, y, z_end)
-            
-            cr.move_to(sx, sy)
-            cr.line_to(ex, ey)
-            cr.stroke()
-    
-    def draw_axes(self, cr):
-        """Рисование осей координат"""
-        if not self.show_axes:
-            return
-        
-        cr.set_line_width(2.0)
-        
-        for axis in self.axes:
-            # Проекция точек оси
-            start_x, start_y = self.project_3d_to_2d(*axis['start'])
-            end_x, end_y = self.project_3d_to_2d(*axis['end'])
-            
-            # Рисуем линию оси
-            cr.set_source_rgb(*axis['color'])
-            cr.move_to(start_x, start_y)
-            cr.line_to(end_x, end_y)
-            cr.stroke()
-            
-            # Рисуем стрелку только если ось достаточно длинная
-            arrow_length = math.sqrt((end_x - start_x)**2 + (end_y - start_y)**2)
-            if arrow_length > 5:
-                self.draw_arrow(cr, (end_x, end_y), (start_x, start_y), axis['color'])
-            
-            # Подпись оси - по центру оси со смещением
-            cr.set_source_rgb(*axis['color'])
-            cr.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, 
-                              cairo.FONT_WEIGHT_BOLD)
-            cr.set_font_size(12)
-            
-            # Вычисляем середину оси
-            mid_x = (start_x + end_x) / 2
-            mid_y = (start_y + end_y) / 2
-            
-            # Смещение для подписи
-            label_offset = 20
-            
-            # Для каждой оси своя логика смещения относительно направления
-            # if axis['label'] == 'X':
-            #     # Для оси X - смещение перпендикулярно вниз
-            #     dx = end_x - start_x
-            #     dy = end_y - start_y
-            #     length = math.sqrt(dx*dx + dy*dy)
-                
-            #     if length > 0:
-            #         # Перпендикулярный вектор (повернутый на 90 градусов)
-            #         perp_dx = -dy / length
-            #         perp_dy = dx / length
-                    
-            #         # Смещаем перпендикулярно вниз от центра
-            #         label_x = mid_x - perp_dx * label_offset
-            #         label_y = mid_y - perp_dy * label_offset
-                    
-            #         # Выравниваем текст
-            #         extents = cr.text_extents('X')
-            #         cr.move_to(label_x - extents.width/2, label_y + extents.height/2)
-            #         cr.show_text('X')
-            
-            # elif axis['label'] == 'Y':
-            #     # Для оси Y - смещение перпендикулярно влево
-            #     dx = end_x - start_x
-            #     dy = end_y - start_y
-            #     length = math.sqrt(dx*dx + dy*dy)
-                
-            #     if length > 0:
-            #         # Перпендикулярный вектор (повернутый на 90 градусов)
-            #         perp_dx = -dy / length
-            #         perp_dy = dx / length
-                    
-            #         # Смещаем перпендикулярно влево от центра
-            #         label_x = mid_x - perp_dx * label_offset
-            #         label_y = mid_y - perp_dy * label_offset
-                    
-            #         # Выравниваем текст
-            #         extents = cr.text_extents('Y')
-            #         cr.move_to(label_x - extents.width/2, label_y + extents.height/2)
-            #         cr.show_text('Y')
-            
-            if axis['label'] == 'Z':
-                # Для оси Z вверх - смещение вправо и вверх от центра
-                dx = end_x - start_x
-                dy = end_y - start_y
-                length = math.sqrt(dx*dx + dy*dy)
-                
-                if length > 0:
-                    # Направляющий вектор оси
-                    dir_dx = dx / length
-                    dir_dy = dy / length
-                    
-                    # Перпендикулярный вектор
-                    perp_dx = -dir_dy
-                    perp_dy = dir_dx
-                    
-                    # Смещаем перпендикулярно и немного вдоль оси
-                    label_x = mid_x + perp_dx * label_offset - dir_dx * 5
-                    label_y = mid_y + perp_dy * label_offset - dir_dy * 5
-                    
-                    # Выравниваем текст
-                    extents = cr.text_extents('Z')
-                    cr.move_to(label_x - extents.width/2, label_y + extents.height/2)
-                    cr.show_text('Z')
-            
-            # elif axis['label'] == '-Z':
-            #     # Для оси Z вниз - смещение влево и вниз от центра
-            #     dx = end_x - start_x
-            #     dy = end_y - start_y
-            #     length = math.sqrt(dx*dx + dy*dy)
-                
-            #     if length > 0:
-            #         # Направляющий вектор оси
-            #         dir_dx = dx / length
-            #         dir_dy = dy / length
-                    
-            #         # Перпендикулярный вектор
-            #         perp_dx = -dir_dy
-            #         perp_dy = dir_dx
-                    
-            #         # Смещаем перпендикулярно и немного вдоль оси
-            #         label_x = mid_x + perp_dx * label_offset + dir_dx * 5
-            #         label_y = mid_y + perp_dy * label_offset + dir_dy * 5
-                    
-                    # Выравниваем текст
-                    # extents = cr.text_extents('-Z')
-                    # cr.move_to(label_x - extents.width/2, label_y + extents.height/2)
-                    # cr.show_text('-Z')
-            self.draw_origin_label(cr)
-    
-    def draw_origin_label(self, cr):
-        """Рисование подписи (0, 0) в точке начала сетки с высотой bed mesh"""
-        if not self.show_axes:
-            return
-        
-        # Проверяем, есть ли данные bed mesh
-        if not self.visible or np.all(self.heights == 0):
-            # Если нет данных, используем Z=0
-            origin_z = 0
-        else:
-            # Используем высоту первой точки bed mesh
-            origin_z = self.heights[self.GRID_SIZE - 1, 0] + self.z_height / 2
-        
-        # Левая нижняя точка сетки стола с высотой bed mesh
-        origin_point = (self.grid_x[self.GRID_SIZE - 1, 0], self.grid_y[self.GRID_SIZE - 1, 0], origin_z)
+        # Левая нижняя точка сетки стола с высотой bed mesh
+        origin_point = (self.grid_x[self.GRID_SIZE - 1, 0], self.grid_y[self.GRID_SIZE - 1, 0], origin_z)
         
         # Проекция точки
         x, y = self.project_3d_to_2d(*origin_point)
@@ -635,55 +326,607 @@ class FastBedMap(Gtk.DrawingArea):
             avg_dx /= avg_length
             avg_dy /= avg_length
             
-            # Смещаем подпись в противоположную сторону от направления осей
-            offset_distance = 25
-            label_x = x - avg_dx * offset_distance - extents.width / 2
-            label_y = y - avg_dy * offset_distance + extents.height / 2
-        else:
-            # Дефолтное смещение: влево и вниз
-            label_x = x - extents.width - 8
-            label_y = y + 15
-        
-        cr.move_to(label_x, label_y)
-        cr.show_text("(0, 0)")
-        
-        # Рисуем маленькую точку в этой позиции
-        cr.set_source_rgb(1.0, 1.0, 0.9)  # Светло-желтый
-        cr.arc(x, y, 2.5, 0, 2 * math.pi)
-        cr.fill()
-    
-    def draw_arrow(self, cr, tip, base, color):
-        """Рисование стрелки"""
-        dx = tip[0] - base[0]
-        dy = tip[1] - base[1]
-        length = math.sqrt(dx*dx + dy*dy)
-        
-        if length < 5:
-            return
-        
-        dx /= length
-        dy /= length
-        
-        arrow_size = max(8, min(15, length * 0.2))
-        perp_dx = -dy
-        perp_dy = dx
-        
-        left = (
-            tip[0] - dx * arrow_size + perp_dx * arrow_size * 0.4,
-            tip[1] - dy * arrow_size + perp_dy * arrow_size * 0.4
-        )
-        
-        right = (
-            tip[0] - dx * arrow_size - perp_dx * arrow_size * 0.4,
-            tip[1] - dy * arrow_size - perp_dy * arrow_size * 0.4
-        )
+            # Смещаем подпись в противоположную сторону от направления осей
+            offset_distance = 25
+            label_x = x - avg_dx * offset_distance - extents.width / 2
+            label_y = y - avg_dy * offset_distance + extents.height / 2
+        else:
+            # Дефолтное смещение: влево и вниз
+            label_x = x - extents.width - 8
+            label_y = y + 15
+        
+        cr.move_to(label_x, label_y)
+        cr.show_text("(0, 0)")
+        
+        # Рисуем маленькую точку в этой позиции
+        cr.set_source_rgb(1.0, 1.0, 0.9)  # Светло-желтый
+        cr.arc(x, y, 2.5, 0, 2 * math.pi)
+        cr.fill()
+
+    def draw_arrow(self, cr, tip, base, color):
+        """Рисование стрелки"""
+        dx = tip[0] - base[0]
+        dy = tip[1] - base[1]
+        length = math.sqrt(dx*dx + dy*dy)
+        
+        if length < 5:
+            return
+        
+        dx /= length
+        dy /= length
+        
+        arrow_size = max(8, min(15, length * 0.2))
+        perp_dx = -dy
+        perp_dy = dx
+        
+        left = (
+            tip[0] - dx * arrow_size + perp_dx * arrow_size * 0.4,
+            tip[1] - dy * arrow_size + perp_dy * arrow_size * 0.4
+        )
+        
+        right = (
+            tip[0] - dx * arrow_size - perp_dx * arrow_size * 0.4,
+            tip[1] - dy * arrow_size - perp_dy * arrow_size * 0.4
+        )
+        
+        cr.set_source_rgb(*color)
+        cr.move_to(left[0], left[1])
+        cr.line_to(tip[0], tip[1])
+        cr.line_to(right[0], right[1])
+        cr.fill()
+
+    def snapshot(self):
+        """Копия состояния вида для отрисовки в фоновом потоке"""
+        scene = BedMapScene.__new__(BedMapScene)
+        scene.__dict__.update({k: v for k, v in self.__dict__.items() if not k.startswith('_')})
+        for name in ('heights', 'colors', 'quad_colors'):
+            setattr(scene, name, getattr(self, name).copy())
+        scene.axes = [dict(axis) for axis in self.axes]
+        return scene
+
+    def view_key(self):
+        """Параметры, от которых зависят сетки и оси"""
+        return (self.angle, self.elevation, self.scale, int(self.width), int(self.height), self.z_height,
+                self.show_grid, self.show_axes, tuple(self.rotation_center))
+
+    def has_data(self):
+        return self.visible and not np.all(self.heights == 0)
+
+    def draw_static(self, cr, preview=False):
+        """Фон, координатные сетки и оси: не зависят от данных bed mesh"""
+        # Фон (как в Pseudo3D)
+        cr.set_source_rgb(*self.bg_color)
+        cr.paint()
+        # ВСЕГДА рисуем координатные сетки (даже если нет данных), кроме превью при смене вида
+        if not preview:
+            self.draw_coordinate_grids(cr)
+        self.draw_axes(cr)
+
+    def render(self, cr, static=None, preview=False):
+        """Полный кадр; static - готовая поверхность с draw_static для этого вида"""
+        if static is None:
+            self.draw_static(cr, preview)
+        else:
+            cr.set_source_surface(static, 0, 0)
+            cr.paint()
+        self.draw_origin_label(cr)
+        
+        # Полигоны поверхности (bed mesh) - если есть (они над плоскостью)
+        if self.has_data():
+            if preview:
+                self.draw_polygons_preview(cr)
+            else:
+                self.draw_polygons_fast(cr)
+        
+        # Информация поверх всего
+        # if self.show_info:
+        #     self.draw_info(cr)
+        #     if self.visible and hasattr(self, 'z_min') and hasattr(self, 'z_max'):
+        #         self.draw_legend(cr)
+        
+        # Если нет данных - рисуем сообщение
+        if not self.has_data():
+            cr.set_source_rgb(*self.text_color)
+            cr.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, 
+                              cairo.FONT_WEIGHT_NORMAL)
+            cr.set_font_size(16)
+            text = "Нет данных bed mesh"
+            extents = cr.text_extents(text)
+            cr.move_to(self.width/2 - extents.width/2, self.height/2)
+            cr.show_text(text)
+
+    def draw_polygons_fast(self, cr):
+        """Быстрая отрисовка полигонов плоским цветом"""
+        # Проекции, порядок и цвета пересчитываются только при смене вида или данных
+        if self.quad_cache is None or not self.cache_valid:
+            self.quad_cache = self.build_quads()
+            self.cache_valid = True
+        self.fill_quads(cr, self.quad_cache)
+
+    def draw_polygons_preview(self, cr):
+        """Прореженная сетка для превью во время жестов"""
+        stride = max(1, math.ceil((self.GRID_SIZE - 1) / PREVIEW_QUADS))
+        self.fill_quads(cr, self.build_quads(stride))
+
+    @staticmethod
+    def fill_quads(cr, quads):
+        # Рисуем квадраты сзади наперед, каждый одним многоугольником
+        for x1, y1, x2, y2, x3, y3, x4, y4, r, g, b in quads:
+            cr.set_source_rgb(r, g, b)
+            cr.move_to(x1, y1)
+            cr.line_to(x2, y2)
+            cr.line_to(x3, y3)
+            cr.line_to(x4, y4)
+            cr.close_path()
+            cr.fill()
+
+    def build_quads(self, stride=1):
+        """Вершины и цвета квадратов в порядке отрисовки, списком для быстрого обхода"""
+        proj = self.precompute_projections()
+        if stride == 1:
+            self.proj_cache = proj
+            if self.draw_order is None or self.draw_order_angle != self.angle:
+                self.draw_order = self.sort_quads(self.grid_x, self.grid_y)
+                self.draw_order_angle = self.angle
+            order = self.draw_order
+            quad_colors = self.quad_colors
+        else:
+            # Каждый stride-й узел, последний узел всегда входит
+            idx = np.unique(np.r_[0:self.GRID_SIZE:stride, self.GRID_SIZE - 1])
+            grid = np.ix_(idx, idx)
+            proj = proj[grid]
+            colors = self.colors[grid]
+            quad_colors = (colors[:-1, :-1] + colors[:-1, 1:] + colors[1:, :-1] + colors[1:, 1:]) / 4 / 255.0
+            order = self.sort_quads(self.grid_x[grid], self.grid_y[grid])
+        quads = np.concatenate(
+            (proj[:-1, :-1], proj[:-1, 1:], proj[1:, 1:], proj[1:, :-1], quad_colors), axis=2
+        ).reshape(-1, 11)
+        return quads[order].tolist()
+
+    def sort_quads(self, grid_x, grid_y):
+        """Сортировка квадратов по глубине: дальние (выше на экране) рисуются первыми"""
+        angle_rad = math.radians(self.angle)
+        center_x = (grid_x[:-1, :-1] + grid_x[1:, 1:]) / 2 - self.rotation_center[0]
+        center_y = (grid_y[:-1, :-1] + grid_y[1:, 1:]) / 2 - self.rotation_center[1]
+        depth = center_x * math.sin(angle_rad) + center_y * math.cos(angle_rad)
+        return np.argsort(depth.ravel(), kind='stable')
+
+    def precompute_projections(self):
+        """Проекции всех вершин одним матричным умножением"""
+        vertices = np.stack(
+            (self.grid_x, self.grid_y, self.heights + self.z_height / 2),  # ПОДНИМАЕМ НА self.z_height / 2
+            axis=-1
+        ) - np.asarray(self.rotation_center, dtype=np.float32)
+        proj = vertices @ self.projection_matrix().astype(np.float32)
+        proj += np.array([self.widget_center_x, self.widget_center_y], dtype=np.float32)
+        return proj
+
+    def draw_info(self, cr):
+        """Рисование информации"""
+        cr.set_source_rgb(*self.text_color)
+        cr.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, 
+                          cairo.FONT_WEIGHT_NORMAL)
+        cr.set_font_size(10)
+        
+        # FPS
+        fps_text = f"FPS: {self.fps:.1f}"
+        cr.move_to(10, 20)
+        cr.show_text(fps_text)
+        
+        # Информация о сетке
+        grid_text = f"Grid: {self.GRID_SIZE}x{self.GRID_SIZE}"
+        cr.move_to(10, 40)
+        cr.show_text(grid_text)
+        
+        # Информация о высотах
+        if hasattr(self, 'z_min') and hasattr(self, 'z_max'):
+            delta = self.z_max - self.z_min
+            avg_z = (self.z_min + self.z_max) / 2
+            plane_level = max(0, self.z_max / 2) if self.z_max > 0 else 0
+            z_text = f"Min: {self.z_min:.3f}  Max: {self.z_max:.3f}  Plane: {plane_level:.3f}"
+            cr.move_to(10, 60)
+            cr.show_text(z_text)
+        
+        # Углы камеры
+        angle_text = f"Angle: {self.angle:.0f}°  Elev: {self.elevation:.0f}°  Scale: {self.scale:.0f}"
+        cr.move_to(10, 80)
+        cr.show_text(angle_text)
+        
+        # Подсказки управления
+        hint_text = "ЛКМ: вращать | Колесо: масштаб | Двойной клик: сброс | Touch: панорамирование и масштабирование"
+        cr.move_to(self.width - 450, self.height - 10)
+        cr.show_text(hint_text)
+
+    def draw_legend(self, cr):
+        """Рисует легенду цветов"""
+        if not hasattr(self, 'z_min') or not hasattr(self, 'z_max'):
+            return
+        
+        legend_width = 15
+        legend_height = 120
+        legend_x = self.width - legend_width - 20
+        legend_y = 20
+        
+        # Градиентная полоса
+        gradient = cairo.LinearGradient(legend_x, legend_y, 
+                                       legend_x, legend_y + legend_height)
+        # Градиент от синего к красному через белый
+        gradient.add_color_stop_rgb(0.0, 0.0, 0.0, 1.0)    # Синий
+        gradient.add_color_stop_rgb(0.25, 0.0, 0.5, 0.5)   # Бирюзовый
+        gradient.add_color_stop_rgb(0.5, 1.0, 1.0, 1.0)    # Белый
+        gradient.add_color_stop_rgb(0.75, 1.0, 0.5, 0.0)   # Оранжевый
+        gradient.add_color_stop_rgb(1.0, 1.0, 0.0, 0.0)    # Красный
+        
+        cr.set_source(gradient)
+        cr.rectangle(legend_x, legend_y, legend_width, legend_height)
+        cr.fill()
+        
+        # Рамка
+        cr.set_source_rgb(0.7, 0.7, 0.7)
+        cr.set_line_width(0.5)
+        cr.rectangle(legend_x, legend_y, legend_width, legend_height)
+        cr.stroke()
+        
+        # Подписи
+        cr.set_source_rgb(*self.text_color)
+        cr.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, 
+                          cairo.FONT_WEIGHT_NORMAL)
+        cr.set_font_size(9)
+        
+        # Верхняя подпись (макс)
+        cr.move_to(legend_x - 65, legend_y + 10)
+        cr.show_text(f"Max: {self.z_max:+.3f}")
+        
+        # Нижняя подпись (мин)
+        cr.move_to(legend_x - 65, legend_y + legend_height - 3)
+        cr.show_text(f"Min: {self.z_min:+.3f}")
+        
+        # Разница
+        delta = self.z_max - self.z_min
+        cr.move_to(legend_x - 60, legend_y + legend_height/2 + 4)
+        cr.show_text(f"Δ: {delta:.3f}")
+        
+        # Уровень плоскости
+        plane_level = max(0, self.z_max / 2) if self.z_max > 0 else 0
+        cr.move_to(legend_x - 60, legend_y + legend_height/2 + 16)
+        cr.show_text(f"Plane: {plane_level:+.3f}")
+
+
+class FastBedMap(Gtk.DrawingArea, BedMapScene):
+    """
+    Ультра-быстрый bed map рендерер
+    Фиксированная сетка, простейшая проекция, минимум вычислений
+    """
+    
+    def __init__(self, width=400, height=400, threaded=True):
+        super().__init__()
+        
+        # Размеры
+        self.width = width
+        self.height = height
+        self.set_size_request(width, height)
+        self.z_min = -0.25
+        self.z_max = 0.25
+        # Центр виджета (центр экрана)
+        self.widget_center_x = width // 2
+        self.widget_center_y = height // 2
+
+        # Вид (фиксированная изометрия для скорости)
+        self.angle = 45
+        self.elevation = 30
+        self.scale = 80
+
+        # Центр вращения (будет установлен в auto_center_view)
+        self.rotation_center = (0, 0, 0)
+
+        # Параметры для скорости
+        self.GRID_SIZE = 16  # Фиксированный размер! 16x16 = 144 вершины
+        self.QUALITY = 1     # 1=треугольники, 2=с подразделением (используем 1)
+        
+        # Данные
+        self.heights = np.zeros((self.GRID_SIZE, self.GRID_SIZE), dtype=np.float32)
+        self.colors = np.zeros((self.GRID_SIZE, self.GRID_SIZE, 3), dtype=np.float32)
+        # Средний цвет каждого квадрата (0..1), пересчитывается только при смене данных
+        self.quad_colors = np.zeros((self.GRID_SIZE - 1, self.GRID_SIZE - 1, 3), dtype=np.float32)
+        self.color_lut = self.build_color_lut()
+        self.visible = False
+        
+        # Кэш проекций (ОЧЕНЬ важно!)
+        self.proj_cache = None
+        self.quad_cache = None
+        self.cache_valid = False
+        # Порядок отрисовки квадратов (сзади наперед), зависит только от угла поворота
+        self.draw_order = None
+        self.draw_order_angle = None
+        
+        # FPS контроль
+        self.last_draw = 0
+        self.fps = 0
+        self.frame_count = 0
+        self.target_fps = 15
+        
+        # Отрисовка в фоновом потоке: GTK поток только копирует готовую поверхность
+        self.threaded = threaded
+        self.data_version = 0
+        self._render_cond = threading.Condition()
+        self._render_request = None
+        self._render_key = None
+        self._render_thread = None
+        self._surface = None
+        self._surface_key = None
+        # Статический слой последнего кадра из фонового потока
+        self._static = None
+        self._static_key = None
+        
+        # Состояние
+        self.dragging = False
+        self.last_x = 0
+        self.last_y = 0
+        
+        # Цвета (как в Pseudo3D)
+        self.bg_color = (0.41, 0.41, 0.41)  # Серый фон как в Pseudo3D
+        self.text_color = (0.9, 0.9, 0.9)   # Светлый текст
+        self.grid_color = (0.7, 0.7, 0.7, 0.6)  # Полупрозрачная сетка
+        self.axes_colors = [
+            (1.0, 0.0, 0.0),  # X - красный
+            (0.0, 1.0, 0.0),  # Y - зеленый
+            (0.0, 0.0, 1.0)   # Z - синий
+        ]
+        self.plane_color = (0.5, 0.5, 0.5, 0.3)  # Полупрозрачная плоскость
+        
+        # Флаги отображения
+        self.show_grid = True
+        self.show_axes = True
+        self.show_info = True
+        self.show_plane = True  # Показать плоскость
+        
+        # Параметры системы координат
+        self.bed_size = 1.0
+        self.axis_length = self.bed_size  # Длина осей X и Y
+        self.z_height = 4.0     # УВЕЛИЧЕНА высота оси Z (было 1.0)
+        
+        # Начало координат (левый нижний угол)
+        self.origin = (-self.z_height / 2, -self.z_height / 2, self.z_height / 2)
+        
+        # Мультитач состояние
+        self.touch_state = {
+            'active': False,
+            'start_distance': 0,
+            'start_scale': self.scale,
+            'touch1': None,
+            'touch2': None
+        }
+        
+        # Словарь для отслеживания точек касания
+        self._touch_points = {}
+
+        # Подключение
+        self.connect("draw", self.on_draw)
+        self.connect("destroy", self.stop_render_worker)
+        # Подключаем обработчик изменения размера
+        self.connect("size-allocate", self.on_size_allocate)
+        
+        # Настраиваем события
+        self.set_events(
+            Gdk.EventMask.BUTTON_PRESS_MASK |
+            Gdk.EventMask.BUTTON_RELEASE_MASK |
+            Gdk.EventMask.POINTER_MOTION_MASK |
+            Gdk.EventMask.SCROLL_MASK |
+            Gdk.EventMask.SMOOTH_SCROLL_MASK |  # Для плавной прокрутки
+            Gdk.EventMask.TOUCH_MASK            # Для touch событий
+        )
+        
+        # Подключаем обработчики
+        self.connect("button-press-event", self.on_button_press)
+        self.connect("button-release-event", self.on_button_release)
+        self.connect("motion-notify-event", self.on_motion_notify)
+        self.connect("scroll-event", self.on_scroll)
+        self.connect("touch-event", self.on_touch_event)
+        
+        # Предварительные вычисления для скорости
+        self.precompute_grid_coords()
+        
+        # Инициализация осей
+        self.init_axes()
+        
+        logging.info(f"FastBedMap initialized: {self.GRID_SIZE}x{self.GRID_SIZE}")
+
+    def on_size_allocate(self, widget, allocation):
+        """Обработчик изменения размера виджета"""
+        new_width = allocation.width
+        new_height = allocation.height
+        
+        if new_width != self.width or new_height != self.height:
+            self.width = new_width
+            self.height = new_height
+            self.widget_center_x = new_width // 2
+            self.widget_center_y = new_height // 2
+            self.cache_valid = False
+            self.queue_draw()
+
+    def init_axes(self):
+        """Инициализация данных осей координат"""
+        # Оси координат (начинаются от начала координат)
+        self.axes = [
+            # X ось (красная) - вдоль нижнего края
+            # {
+            #     'start': (self.origin[0], self.origin[1], 0),
+            #     'end': (self.origin[0] + self.axis_length, self.origin[1], 0),#self.origin[2]),
+            #     'color': self.axes_colors[0],
+            #     'label': 'X'
+            # },
+            # # Y ось (зеленая) - вдоль левого края
+            # {
+            #     'start': (self.origin[0], self.origin[1] + self.axis_length, 0),
+            #     'end': (self.origin[0], self.origin[1], 0),#self.origin[2]),
+            #     'color': self.axes_colors[1],
+            #     'label': 'Y',
+            #     'arrow_direction': 'down'
+            # },
+            # Z ось (синяя) - вертикально от начала координат ВВЕРХ
+            {
+                'start': self.origin,
+                'end': (self.origin[0], self.origin[1], self.z_height),  # Используем увеличенную высоту
+                'color': self.axes_colors[2],
+                'label': 'Z',
+                'arrow_direction': 'up'  # Направление стрелки вверх
+            },
+            # Z ось (синяя) - вертикально от начала координат ВНИЗ
+            {
+                'start': self.origin,
+                'end': (self.origin[0], self.origin[1], 0),  # Ось Z вниз (до полупрозрачной сетки)
+                'color': self.axes_colors[2],
+                'label': '-Z',
+                'arrow_direction': 'down'  # Направление стрелки вниз
+            }
+        ]
+    
+    def on_touch_event(self, widget, event):
+        """Обработка мультитач жестов (pinch-to-zoom и pan)"""
+        event_type = event.type
+        
+        if event_type == Gdk.EventType.TOUCH_BEGIN:
+            # Начало касания
+            sequence = event.sequence
+            
+            # Сохраняем точку касания
+            self._touch_points[sequence] = (event.x, event.y, time.time())
+            
+            # Проверяем количество активных касаний
+            active_touches = len(self._touch_points)
+            
+            if active_touches == 1:
+                # Одно касание - начало pan жеста (перетаскивание)
+                self.dragging = True
+                self.last_x = event.x
+                self.last_y = event.y
+                return True
+                
+            elif active_touches == 2:
+                # Два касания - начало pinch жеста (масштабирование)
+                self.touch_state['active'] = True
+                
+                # Получаем координаты двух точек
+                points = list(self._touch_points.values())
+                self.touch_state['touch1'] = (points[0][0], points[0][1])
+                self.touch_state['touch2'] = (points[1][0], points[1][1])
+                
+                # Вычисляем начальное расстояние между пальцами
+                dx = self.touch_state['touch2'][0] - self.touch_state['touch1'][0]
+                dy = self.touch_state['touch2'][1] - self.touch_state['touch1'][1]
+                self.touch_state['start_distance'] = math.sqrt(dx*dx + dy*dy)
+                self.touch_state['start_scale'] = self.scale
+                
+                # Отключаем dragging при pinch жесте
+                self.dragging = False
+                return True
+            
+            return True
+                
+        elif event_type == Gdk.EventType.TOUCH_UPDATE:
+            sequence = event.sequence
+            
+            if sequence in self._touch_points:
+                # Обновляем позицию точки
+                self._touch_points[sequence] = (event.x, event.y, time.time())
+                
+                # Проверяем количество активных касаний
+                active_touches = len(self._touch_points)
+                
+                if active_touches == 2 and self.touch_state['active']:
+                    # Pinch жест (масштабирование двумя пальцами)
+                    points = list(self._touch_points.values())
+                    touch1 = (points[0][0], points[0][1])
+                    touch2 = (points[1][0], points[1][1])
+                    
+                    # Вычисляем текущее расстояние между пальцами
+                    dx = touch2[0] - touch1[0]
+                    dy = touch2[1] - touch1[1]
+                    current_distance = math.sqrt(dx*dx + dy*dy)
+                    
+                    if self.touch_state['start_distance'] > 0 and current_distance > 0:
+                        # Вычисляем коэффициент масштабирования
+                        scale_factor = current_distance / self.touch_state['start_distance']
+                        
+                        # Применяем масштабирование с плавностью
+                        new_scale = self.touch_state['start_scale'] * scale_factor
+                        
+                        # Ограничиваем масштаб
+                        self.scale = max(30, min(300, new_scale))
+                        
+                        # Инвалидируем кэш
+                        self.cache_valid = False
+                        self.queue_draw()
+                    
+                    return True
+                    
+                elif active_touches == 1 and self.dragging:
+                    # Pan жест (перетаскивание одним пальцем)
+                    dx = event.x - self.last_x
+                    dy = event.y - self.last_y
+                    
+                    # Вращение - инвертируем горизонталь
+                    self.angle -= dx * 0.5
+                    self.elevation += dy * 0.5
+                    
+                    # Ограничения углов
+                    self.angle = self.angle % 360
+                    self.elevation = max(10, min(80, self.elevation))
+                    
+                    # Инвалидируем кэш
+                    self.cache_valid = False
+                    
+                    self.last_x = event.x
+                    self.last_y = event.y
+                    
+                    self.queue_draw()
+                    return True
+            
+            return True
+                
+        elif event_type == Gdk.EventType.TOUCH_END or event_type == Gdk.EventType.TOUCH_CANCEL:
+            sequence = event.sequence
+            
+            if sequence in self._touch_points:
+                # Удаляем точку касания
+                del self._touch_points[sequence]
+                
+                # Проверяем количество оставшихся касаний
+                remaining_touches = len(self._touch_points)
+                
+                if remaining_touches == 0:
+                    # Все касания завершены - сбрасываем состояние
+                    self.dragging = False
+                    self.touch_state['active'] = False
+                    self.touch_state['touch1'] = None
+                    self.touch_state['touch2'] = None
+                    self.touch_state['start_distance'] = 0
+                    
+                elif remaining_touches == 1 and self.touch_state['active']:
+                    # Был pinch жест, осталось одно касание - переключаемся на pan
+                    self.touch_state['active'] = False
+                    self.touch_state['touch1'] = None
+                    self.touch_state['touch2'] = None
+                    self.touch_state['start_distance'] = 0
+                    
+                    # Активируем dragging для оставшегося касания
+                    self.dragging = True
+                    points = list(self._touch_points.values())
+                    self.last_x = points[0][0]
+                    self.last_y = points[0][1]
+                
+                return True
         
-        cr.set_source_rgb(*color)
-        cr.move_to(left[0], left[1])
-        cr.line_to(tip[0], tip[1])
-        cr.line_to(right[0], right[1])
-        cr.fill()
-    
+        return False
+
+    def precompute_grid_coords(self):
+        """Предварительное вычисление координат сетки (делается 1 раз!)"""
+        # Координаты относительно начала координат
+        steps = self.origin[0] + np.linspace(0, self.bed_size, self.GRID_SIZE, dtype=np.float32)
+        self.grid_x, _ = np.meshgrid(steps, steps)
+        steps = self.origin[1] + np.linspace(0, self.bed_size, self.GRID_SIZE, dtype=np.float32)
+        _, self.grid_y = np.meshgrid(steps, steps)
+
     def on_draw(self, widget, cr):
         """Отрисовка"""
         current_time = time.time()
@@ -697,46 +940,82 @@ class FastBedMap(Gtk.DrawingArea):
         self.last_draw = current_time
         self.frame_count += 1
         
-        # Фон (как в Pseudo3D)
-        cr.set_source_rgb(*self.bg_color)
-        cr.paint()
-        
         # Автоматическое центрирование при первом отображении
         if not hasattr(self, '_centered'):
             self.auto_center_view()
             self._centered = True
         
-        # ВСЕГДА рисуем координатные сетки (даже если нет данных)
-        # 1. Координатные сетки на всех плоскостях
-        self.draw_coordinate_grids(cr)
-        
-        # Рисуем в правильном порядке (сзади наперед):
-        
-        # 2. Оси координат
-        self.draw_axes(cr)
-        
-        # 3. Полигоны поверхности (bed mesh) - если есть (они над плоскостью)
-        if self.visible and not np.all(self.heights == 0):
-            self.draw_polygons_fast(cr)
-        
-        # 4. Информация поверх всего
-        # if self.show_info:
-        #     self.draw_info(cr)
-        #     if self.visible and hasattr(self, 'z_min') and hasattr(self, 'z_max'):
-        #         self.draw_legend(cr)
-        
-        # Если нет данных - рисуем сообщение
-        if not self.visible or np.all(self.heights == 0):
-            cr.set_source_rgb(*self.text_color)
-            cr.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, 
-                              cairo.FONT_WEIGHT_NORMAL)
-            cr.set_font_size(16)
-            text = "Нет данных bed mesh"
-            extents = cr.text_extents(text)
-            cr.move_to(self.width/2 - extents.width/2, self.height/2)
-            cr.show_text(text)
-        
+        if not self.threaded:
+            self.render(cr)
+            return False
+        
+        # Готовый кадр из фонового потока для текущего вида - просто копируем
+        key = self.frame_key()
+        if self._surface is not None and self._surface_key == key:
+            cr.set_source_surface(self._surface, 0, 0)
+            cr.paint()
+            return False
+        
+        # Иначе заказываем кадр и пока рисуем упрощенное превью
+        self.request_render(key)
+        static = self._static if self._static_key == self.view_key() else None
+        self.render(cr, static, preview=True)
+        return False
+
+    def frame_key(self):
+        return self.view_key() + (self.data_version, self.visible, self.show_plane)
+
+    def request_render(self, key):
+        with self._render_cond:
+            if self._render_key == key:
+                return
+            self._render_key = key
+            self._render_request = (key, self.snapshot())
+            if self._render_thread is None:
+                self._render_thread = threading.Thread(target=self._render_loop, name="bed_map_render", daemon=True)
+                self._render_thread.start()
+            self._render_cond.notify()
+
+    def _render_loop(self):
+        # Кэш статического слоя живет только в этом потоке
+        static_key = static = None
+        while True:
+            with self._render_cond:
+                while self._render_request is None:
+                    self._render_cond.wait()
+                key, scene = self._render_request
+                self._render_request = None
+            if scene is None:
+                return
+            try:
+                width, height = max(1, int(scene.width)), max(1, int(scene.height))
+                if static_key != scene.view_key():
+                    static = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+                    scene.draw_static(cairo.Context(static))
+                    static_key = scene.view_key()
+                surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+                scene.render(cairo.Context(surface), static)
+                surface.flush()
+            except Exception as e:
+                logging.error(f"Error rendering bed mesh: {e}\n{traceback.format_exc()}")
+                continue
+            GLib.idle_add(self._render_done, key, surface, static_key, static)
+
+    def _render_done(self, key, surface, static_key, static):
+        self._surface_key = key
+        self._surface = surface
+        # Поток больше не рисует в эту поверхность, он создает новую при смене вида
+        self._static_key = static_key
+        self._static = static
+        self.queue_draw()
         return False
+
+    def stop_render_worker(self, *args):
+        with self._render_cond:
+            if self._render_thread is not None:
+                self._render_request = (None, None)
+                self._render_cond.notify()
+                self._render_thread = None
     
     def auto_center_view(self):
         """Автоматически центрирует вид"""
@@ -756,167 +1035,6 @@ class FastBedMap(Gtk.DrawingArea):
             1.5  # плоскость на высоте 1.5
         )
     
-    def draw_polygons_fast(self, cr):
-        """Быстрая отрисовка полигонов плоским цветом"""
-        # Кэшируем синусы и косинусы для скорости
-        angle_rad = math.radians(self.angle)
-        elev_rad = math.radians(self.elevation)
-        cos_a = math.cos(angle_rad)
-        sin_a = math.sin(angle_rad)
-        sin_e = math.sin(elev_rad)
-        
-        # Предварительно вычисляем проекции всех вершин
-        if self.proj_cache is None or not self.cache_valid:
-            self.proj_cache = self.precompute_projections(cos_a, sin_a, sin_e)
-            self.cache_valid = True
-        
-        # Рисуем полигоны
-        for i in range(self.GRID_SIZE - 1):
-            for j in range(self.GRID_SIZE - 1):
-                # Получаем проекции 4 вершин квадрата
-                proj1 = self.proj_cache[i, j]
-                proj2 = self.proj_cache[i, j+1]
-                proj3 = self.proj_cache[i+1, j]
-                proj4 = self.proj_cache[i+1, j+1]
-                
-                # Средний цвет для квадрата
-                color = (
-                    (self.colors[i, j, 0] + self.colors[i, j+1, 0] + 
-                    self.colors[i+1, j, 0] + self.colors[i+1, j+1, 0]) / 4 / 255.0,
-                    (self.colors[i, j, 1] + self.colors[i, j+1, 1] + 
-                    self.colors[i+1, j, 1] + self.colors[i+1, j+1, 1]) / 4 / 255.0,
-                    (self.colors[i, j, 2] + self.colors[i, j+1, 2] + 
-                    self.colors[i+1, j, 2] + self.colors[i+1, j+1, 2]) / 4 / 255.0
-                )
-                
-                # Рисуем 2 треугольника
-                cr.set_source_rgb(*color)
-                
-                # Треугольник 1
-                cr.move_to(proj1[0], proj1[1])
-                cr.line_to(proj2[0], proj2[1])
-                cr.line_to(proj4[0], proj4[1])
-                cr.fill()
-                
-                # Треугольник 2
-                cr.move_to(proj1[0], proj1[1])
-                cr.line_to(proj4[0], proj4[1])
-                cr.line_to(proj3[0], proj3[1])
-                cr.fill()
-    
-    def precompute_projections(self, cos_a, sin_a, sin_e):
-        """Предварительное вычисление проекций всех вершин"""
-        cache = np.zeros((self.GRID_SIZE, self.GRID_SIZE, 2), dtype=np.float32)
-        
-        for i in range(self.GRID_SIZE):
-            for j in range(self.GRID_SIZE):
-                x = self.grid_x[i, j]
-                y = self.grid_y[i, j]
-                z = self.heights[i, j] + self.z_height / 2  # ПОДНИМАЕМ НА self.z_height / 2
-                
-                # Смещаем координаты относительно центра вращения
-                x_centered = x - self.rotation_center[0]
-                y_centered = y - self.rotation_center[1]
-                z_centered = z - self.rotation_center[2]
-                
-                # Изометрическая проекция
-                screen_x = (x_centered * cos_a - y_centered * sin_a) * self.scale + self.widget_center_x
-                screen_y = (x_centered * sin_a + y_centered * cos_a) * sin_e * self.scale - z_centered * self.scale * 0.3 + self.widget_center_y
-                
-                cache[i, j] = [screen_x, screen_y]
-        
-        return cache
-    
-    def draw_info(self, cr):
-        """Рисование информации"""
-        cr.set_source_rgb(*self.text_color)
-        cr.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, 
-                          cairo.FONT_WEIGHT_NORMAL)
-        cr.set_font_size(10)
-        
-        # FPS
-        fps_text = f"FPS: {self.fps:.1f}"
-        cr.move_to(10, 20)
-        cr.show_text(fps_text)
-        
-        # Информация о сетке
-        grid_text = f"Grid: {self.GRID_SIZE}x{self.GRID_SIZE}"
-        cr.move_to(10, 40)
-        cr.show_text(grid_text)
-        
-        # Информация о высотах
-        if hasattr(self, 'z_min') and hasattr(self, 'z_max'):
-            delta = self.z_max - self.z_min
-            avg_z = (self.z_min + self.z_max) / 2
-            plane_level = max(0, self.z_max / 2) if self.z_max > 0 else 0
-            z_text = f"Min: {self.z_min:.3f}  Max: {self.z_max:.3f}  Plane: {plane_level:.3f}"
-            cr.move_to(10, 60)
-            cr.show_text(z_text)
-        
-        # Углы камеры
-        angle_text = f"Angle: {self.angle:.0f}°  Elev: {self.elevation:.0f}°  Scale: {self.scale:.0f}"
-        cr.move_to(10, 80)
-        cr.show_text(angle_text)
-        
-        # Подсказки управления
-        hint_text = "ЛКМ: вращать | Колесо: масштаб | Двойной клик: сброс | Touch: панорамирование и масштабирование"
-        cr.move_to(self.width - 450, self.height - 10)
-        cr.show_text(hint_text)
-    
-    def draw_legend(self, cr):
-        """Рисует легенду цветов"""
-        if not hasattr(self, 'z_min') or not hasattr(self, 'z_max'):
-            return
-        
-        legend_width = 15
-        legend_height = 120
-        legend_x = self.width - legend_width - 20
-        legend_y = 20
-        
-        # Градиентная полоса
-        gradient = cairo.LinearGradient(legend_x, legend_y, 
-                                       legend_x, legend_y + legend_height)
-        # Градиент от синего к красному через белый
-        gradient.add_color_stop_rgb(0.0, 0.0, 0.0, 1.0)    # Синий
-        gradient.add_color_stop_rgb(0.25, 0.0, 0.5, 0.5)   # Бирюзовый
-        gradient.add_color_stop_rgb(0.5, 1.0, 1.0, 1.0)    # Белый
-        gradient.add_color_stop_rgb(0.75, 1.0, 0.5, 0.0)   # Оранжевый
-        gradient.add_color_stop_rgb(1.0, 1.0, 0.0, 0.0)    # Красный
-        
-        cr.set_source(gradient)
-        cr.rectangle(legend_x, legend_y, legend_width, legend_height)
-        cr.fill()
-        
-        # Рамка
-        cr.set_source_rgb(0.7, 0.7, 0.7)
-        cr.set_line_width(0.5)
-        cr.rectangle(legend_x, legend_y, legend_width, legend_height)
-        cr.stroke()
-        
-        # Подписи
-        cr.set_source_rgb(*self.text_color)
-        cr.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, 
-                          cairo.FONT_WEIGHT_NORMAL)
-        cr.set_font_size(9)
-        
-        # Верхняя подпись (макс)
-        cr.move_to(legend_x - 65, legend_y + 10)
-        cr.show_text(f"Max: {self.z_max:+.3f}")
-        
-        # Нижняя подпись (мин)
-        cr.move_to(legend_x - 65, legend_y + legend_height - 3)
-        cr.show_text(f"Min: {self.z_min:+.3f}")
-        
-        # Разница
-        delta = self.z_max - self.z_min
-        cr.move_to(legend_x - 60, legend_y + legend_height/2 + 4)
-        cr.show_text(f"Δ: {delta:.3f}")
-        
-        # Уровень плоскости
-        plane_level = max(0, self.z_max / 2) if self.z_max > 0 else 0
-        cr.move_to(legend_x - 60, legend_y + legend_height/2 + 16)
-        cr.show_text(f"Plane: {plane_level:+.3f}")
-    
     def set_bed_mesh_data(self, bm_matrix):
         """Установка данных bed mesh"""
         if not bm_matrix:
@@ -947,6 +1065,7 @@ class FastBedMap(Gtk.DrawingArea):
             
             # Инвалидируем кэш
             self.cache_valid = False
+            self.data_version += 1
             
             self.visible = True
             self.queue_draw()
@@ -958,69 +1077,61 @@ class FastBedMap(Gtk.DrawingArea):
             logging.error(f"Error setting data: {e}\nTraceback:\n{error_traceback}")
     
     def simple_interpolation(self, bm_matrix, rows, cols):
-        """Простейшая интерполяция (масштабирование)"""
-        # Очищаем высоты
-        self.heights.fill(0)
-        
-        # Простое масштабирование
-        for i in range(self.GRID_SIZE):
-            for j in range(self.GRID_SIZE):
-                # Находим ближайшую точку в исходной матрице
-                src_i = min(int(i * rows / self.GRID_SIZE), rows - 1)
-                src_j = min(int(j * cols / self.GRID_SIZE), cols - 1)
-                
-                # Берем значение
-                if src_i < rows and src_j < cols:
-                    self.heights[i, j] = float(bm_matrix[src_i][src_j])
+        """Билинейная интерполяция матрицы bed mesh на нашу сетку"""
+        matrix = np.asarray(bm_matrix, dtype=np.float32)
+        
+        # Позиции узлов нашей сетки в индексах исходной матрицы
+        src_i = np.linspace(0, rows - 1, self.GRID_SIZE)
+        src_j = np.linspace(0, cols - 1, self.GRID_SIZE)
+        i0 = np.minimum(src_i.astype(int), rows - 2)
+        j0 = np.minimum(src_j.astype(int), cols - 2)
+        fi = (src_i - i0)[:, None]
+        fj = (src_j - j0)[None, :]
+        
+        top = matrix[np.ix_(i0, j0)] * (1 - fj) + matrix[np.ix_(i0, j0 + 1)] * fj
+        bottom = matrix[np.ix_(i0 + 1, j0)] * (1 - fj) + matrix[np.ix_(i0 + 1, j0 + 1)] * fj
+        self.heights[:] = top * (1 - fi) + bottom * fi
+
+    @staticmethod
+    def build_color_lut():
+        """Таблица 256 цветов синий -> белый -> красный (0..255)"""
+        n = np.arange(256) / 255
+        t = np.where(n < 0.5, n * 2, (n - 0.5) * 2)
+        lut = np.empty((256, 3), dtype=np.float32)
+        # 0.0-0.5: Синий -> Белый, 0.5-1.0: Белый -> Красный
+        lut[:, 0] = np.where(n < 0.5, (t * 255).astype(int), 255)
+        lut[:, 1] = np.where(n < 0.5, (t * 255).astype(int), ((1 - t) * 255).astype(int))
+        lut[:, 2] = np.where(n < 0.5, 255, ((1 - t) * 255).astype(int))
+        return lut
     
     def update_colors_simple(self):
         """Простейшее обновление цветов - синий -> белый -> красный"""
-        # Находим min/max Z (без смещения)
-        raw_heights = self.heights
-        # self.z_min = np.min(raw_heights)
-        # self.z_max = np.max(raw_heights)
-        
         # Если все значения одинаковые, добавляем небольшой диапазон
         if self.z_max == self.z_min:
             self.z_max += 0.001
             self.z_min -= 0.001
         
-        # Нормализуем высоты (для цветов) от 0 до 1
-        normalized = (raw_heights - self.z_min) / (self.z_max - self.z_min)
+        # Нормализуем высоты (для цветов) от 0 до 1 и берем цвет из таблицы
+        normalized = (self.heights - self.z_min) / (self.z_max - self.z_min)
+        self.colors[:] = self.color_lut[np.clip(normalized * 255, 0, 255).astype(int)]
         
-        for i in range(self.GRID_SIZE):
-            for j in range(self.GRID_SIZE):
-                n = normalized[i, j]  # от 0 до 1
-                
-                if n < 0.5:
-                    # 0.0-0.5: Синий -> Белый
-                    t = n * 2  # масштабируем до 0-1
-                    # От синего (0, 0, 255) к белому (255, 255, 255)
-                    self.colors[i, j] = [
-                        int(t * 255),    # R увеличивается
-                        int(t * 255),    # G увеличивается
-                        255              # B остается 255
-                    ]
-                else:
-                    # 0.5-1.0: Белый -> Красный
-                    t = (n - 0.5) * 2  # масштабируем до 0-1
-                    # От белого (255, 255, 255) к красному (255, 0, 0)
-                    self.colors[i, j] = [
-                        255,              # R остается 255
-                        int((1 - t) * 255),  # G уменьшается
-                        int((1 - t) * 255)   # B уменьшается
-                    ]
+        # Средний цвет для квадрата
+        self.quad_colors[:] = (
+            self.colors[:-1, :-1] + self.colors[:-1, 1:] + self.colors[1:, :-1] + self.colors[1:, 1:]
+        ) / 4 / 255.0
     
     def reset_data(self):
         """Сброс данных"""
         self.heights.fill(0)
         self.colors.fill(0)
+        self.quad_colors.fill(0)
         self.visible = False
         if hasattr(self, 'z_min'):
             self.z_min = -0.25
         if hasattr(self, 'z_max'):
             self.z_max = 0.25
         self.cache_valid = False
+        self.data_version += 1
         self.queue_draw()
     
     # Обработчики событий мыши
@@ -10,6 +10,11 @@ class PrintListItem(Gtk.FlowBoxChild):
         self.dir = 0
         self.path = None
         self.print_start_time = .0
+        # Widgets are only built while the item is near the visible part of the list
+        self.item = None
+        self.parent_path = ''
+        self.fullpath = None
+        self.populated = False
 
     def set_date(self, date):
         self.date = date
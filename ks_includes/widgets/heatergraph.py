@@ -6,6 +6,7 @@ import gi
 
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gdk, Gtk, GLib
+import cairo
 from cairo import Context as cairoContext
 
 
@@ -27,6 +28,9 @@ class HeaterGraph(Gtk.DrawingArea):
         self.connect('button_press_event', self.event_cb)
         self.font_size = round(font_size * 0.75)
         self.fullscreen = fullscreen
+        self.background = self.background_key = None
+        self.plot = self.plot_key = None
+        self.plot_last = self.plot_column = 0
         if fullscreen:
             GLib.timeout_add_seconds(1, self.update_graph)
 
@@ -70,12 +74,10 @@ class HeaterGraph(Gtk.DrawingArea):
         mnum = [0]
         for device in self.store:
             if self.store[device]['show']:
-                temp = self.printer.get_temp_store(device, "temperatures", data_points)
-                if temp:
-                    mnum.append(max(temp))
-                target = self.printer.get_temp_store(device, "targets", data_points)
-                if target:
-                    mnum.append(max(target))
+                for section in ("temperatures", "targets"):
+                    value = self.printer.get_temp_store_max(device, section, data_points)
+                    if value is not None:
+                        mnum.append(value)
         return max(mnum)
 
     def draw_graph(self, da: Gtk.DrawingArea, ctx: cairoContext):
@@ -89,37 +91,118 @@ class HeaterGraph(Gtk.DrawingArea):
         height = da.get_allocated_height() - self.font_size * 2
         gsize = [[x, y], [width, height]]
 
-        ctx.set_source_rgb(.5, .5, .5)
-        ctx.set_line_width(1)
-        ctx.set_tolerance(1)
-
-        ctx.rectangle(x, y, width - x, height - y)
-
         graph_width = gsize[1][0] - gsize[0][0]
-        points_per_pixel = self.printer.get_tempstore_size() / graph_width
-        data_points = int(round(graph_width * points_per_pixel, 0))
-        max_num = math.ceil(self.get_max_num(data_points) * 1.1 / 10) * 10
+        if graph_width <= 0 or gsize[1][1] <= gsize[0][1]:
+            return
+        data_points = self.printer.get_tempstore_size()
+        points_per_pixel = data_points / graph_width
         if points_per_pixel == 0:
             logging.info(f"Data points: {data_points}")
             return
-        d_width = 1 / points_per_pixel
+        max_num = math.ceil(self.get_max_num(data_points) * 1.1 / 10) * 10
+        scale = da.get_scale_factor()
 
-        d_height_scale = self.graph_lines(ctx, gsize, max_num)
+        ctx.set_source_surface(self.get_background(da, gsize, max_num, scale), 0, 0)
+        ctx.paint()
         self.graph_time(ctx, gsize, points_per_pixel)
+        ctx.set_source_surface(self.get_plot(da, gsize, max_num, points_per_pixel, scale), 0, 0)
+        ctx.paint()
+
+    def new_surface(self, da: Gtk.DrawingArea, scale):
+        surface = cairo.ImageSurface(
+            cairo.FORMAT_ARGB32, da.get_allocated_width() * scale, da.get_allocated_height() * scale
+        )
+        surface.set_device_scale(scale, scale)
+        return surface
+
+    def get_background(self, da: Gtk.DrawingArea, gsize, max_num, scale):
+        # Frame, horizontal grid and temperature labels only change on resize or when the scale changes
+        key = (da.get_allocated_width(), da.get_allocated_height(), scale, max_num, self.font_size)
+        if self.background is None or self.background_key != key:
+            self.background = self.new_surface(da, scale)
+            self.background_key = key
+            ctx = cairoContext(self.background)
+            ctx.set_source_rgb(.5, .5, .5)
+            ctx.set_line_width(1)
+            ctx.set_tolerance(1)
+            ctx.rectangle(gsize[0][0], gsize[0][1], gsize[1][0] - gsize[0][0], gsize[1][1] - gsize[0][1])
+            self.graph_lines(ctx, gsize, max_num)
+        return self.background
+
+    def get_plot(self, da: Gtk.DrawingArea, gsize, max_num, points_per_pixel, scale):
+        last = self.printer.tempstore_count - 1
+        key = (
+            da.get_allocated_width(), da.get_allocated_height(), scale, max_num, points_per_pixel,
+            id(self.printer.tempstore),
+            tuple((name, tuple(self.store[name])) for name in self.store if self.store[name]['show']),
+        )
+        graph_width = gsize[1][0] - gsize[0][0]
+        column = self.column(last, points_per_pixel)
+        shift = column - self.plot_column
+        if self.plot is None or self.plot_key != key or last < self.plot_last or shift >= graph_width:
+            # Full redraw of the visible samples
+            self.plot = self.new_surface(da, scale)
+            self.plot_key = key
+            ctx = cairoContext(self.plot)
+            first = last - self.printer.get_tempstore_size() + 1
+            clip = gsize[0][0]
+        elif last == self.plot_last:
+            return self.plot
+        else:
+            # Scroll the previous frame and redraw only the columns that changed
+            plot = self.new_surface(da, scale)
+            ctx = cairoContext(plot)
+            ctx.set_source_surface(self.plot, -shift, 0)
+            ctx.paint()
+            self.plot = plot
+            # The last drawn column may have been incomplete, redraw it and the segment leading to it
+            changed = self.group_start(self.group_start(self.plot_last, points_per_pixel) - 1, points_per_pixel)
+            first = self.group_start(changed - 1, points_per_pixel)
+            clip = self.column_x(self.column(changed, points_per_pixel), column, gsize)
+            ctx.set_operator(cairo.OPERATOR_CLEAR)
+            ctx.rectangle(clip, 0, gsize[1][0] - clip + 15, gsize[1][1] + 1)
+            ctx.fill()
+            ctx.set_operator(cairo.OPERATOR_OVER)
+        self.plot_last = last
+        self.plot_column = column
 
+        ctx.rectangle(clip, gsize[0][1], gsize[1][0] - clip, gsize[1][1] - gsize[0][1])
+        ctx.clip()
+        ctx.set_line_width(1)
+        ctx.set_tolerance(1)
+        d_height_scale = self.graph_scale(gsize, max_num)[2]
         for name in self.store:
             if not self.store[name]['show']:
                 continue
             for dev_type in self.store[name]:
-                d = self.printer.get_temp_store(name, dev_type, data_points)
-                if d:
+                if dev_type == "show":
+                    continue
+                series = self.printer.get_temp_series(name, dev_type)
+                if series is not None:
                     self.graph_data(
-                        ctx, d, gsize, d_height_scale, d_width, self.store[name][dev_type]["rgb"],
+                        ctx, series, first, last, points_per_pixel, gsize, d_height_scale,
+                        self.store[name][dev_type]["rgb"],
                         self.store[name][dev_type]["dashed"], self.store[name][dev_type]["fill"]
                     )
+        return self.plot
 
     @staticmethod
-    def graph_data(ctx: cairoContext, data, gsize, hscale, swidth, rgb, dashed=False, fill=False):
+    def column(sample, points_per_pixel):
+        return math.floor(sample / points_per_pixel)
+
+    def group_start(self, sample, points_per_pixel):
+        # First sample drawn in the same pixel column
+        column = self.column(sample, points_per_pixel)
+        while self.column(sample - 1, points_per_pixel) == column:
+            sample -= 1
+        return sample
+
+    @staticmethod
+    def column_x(column, last_column, gsize):
+        return gsize[1][0] - 1 - (last_column - column)
+
+    def graph_data(self, ctx: cairoContext, series, first, last, points_per_pixel, gsize, hscale, rgb,
+                   dashed=False, fill=False):
         if fill:
             ctx.set_source_rgba(rgb[0], rgb[1], rgb[2], .25)
             ctx.set_dash([1, 0])
@@ -129,32 +212,57 @@ class HeaterGraph(Gtk.DrawingArea):
         else:
             ctx.set_source_rgba(rgb[0], rgb[1], rgb[2], 1)
             ctx.set_dash([1, 0])
-        d_len = len(data) - 1
 
-        for i, d in enumerate(data):
-            p_x = i * swidth + gsize[0][0] if i != d_len else gsize[1][0] - 1
+        # Decimate to the first, min and max samples of each pixel column
+        last_column = self.column(last, points_per_pixel)
+        points = []
+        column = None
+        for sample in range(first, last + 1):
+            d = series.get(last - sample)
             if dashed:  # d between 0 and 1
                 p_y = gsize[1][1] - (d * (gsize[1][1] - gsize[0][1]))
             else:
                 p_y = max(gsize[0][1], min(gsize[1][1], gsize[1][1] - 1 - (d * hscale)))
-            if i == 0:
-                ctx.move_to(gsize[0][0], p_y)
-            ctx.line_to(p_x, p_y)
+            sample_column = self.column(sample, points_per_pixel)
+            if sample_column != column:
+                column = sample_column
+                p_x = self.column_x(column, last_column, gsize)
+                points.append([p_x, p_y, p_y, p_y])
+            else:
+                col = points[-1]
+                if p_y < col[2]:
+                    col[2] = p_y
+                elif p_y > col[3]:
+                    col[3] = p_y
+                col[1] = p_y
+        if not points:
+            return
+        ctx.move_to(points[0][0], points[0][1])
+        for p_x, p_last, p_min, p_max in points:
+            if p_min != p_max:
+                ctx.line_to(p_x, p_min)
+                ctx.line_to(p_x, p_max)
+            ctx.line_to(p_x, p_last)
         if fill:
             ctx.stroke_preserve()
-            ctx.line_to(gsize[1][0] - 1, gsize[1][1] - 1)
-            ctx.line_to(gsize[0][0] + 1, gsize[1][1] - 1)
+            ctx.line_to(points[-1][0], gsize[1][1] - 1)
+            ctx.line_to(points[0][0], gsize[1][1] - 1)
             ctx.fill()
         else:
             ctx.stroke()
 
-    def graph_lines(self, ctx: cairoContext, gsize, max_num):
+    @staticmethod
+    def graph_scale(gsize, max_num):
         nscale = 10
         max_num = min(max_num, 999)
         while (max_num / nscale) > 5:
             nscale += 10
         r = int(max_num / nscale) + 1
         hscale = (gsize[1][1] - gsize[0][1]) / (r * nscale)
+        return nscale, r, hscale
+
+    def graph_lines(self, ctx: cairoContext, gsize, max_num):
+        nscale, r, hscale = self.graph_scale(gsize, max_num)
         ctx.set_font_size(self.font_size)
 
         for i in range(r):
@@ -11,7 +11,7 @@ from ks_includes import NetworkManager
 import dbus
 from dbus.mainloop.glib import DBusGMainLoop
 import gi
-from subprocess import Popen, check_output
+from subprocess import Popen
 from threading import Thread
 gi.require_version('Gdk', '3.0')
 from gi.repository import GLib
@@ -116,6 +116,9 @@ class WifiManager:
             self.ssid_by_path = {}
             self.path_by_ssid = {}
             self.hidden_ssid_index = 0
+            # Name and 802-11-wireless mode of the active connection
+            self.active_connection = None
+            self.watched_connections = set()
             self.initialized = False
             self.rescan_thread = None
             self.rescan_timer = None
@@ -146,6 +149,7 @@ class WifiManager:
     def _initial_scan(self):
         try:
             self._update_known_connections()
+            self._update_active_connection()
             for ap in self.wireless_device.GetAccessPoints():
                 try:
                     self._add_ap(ap)
@@ -182,7 +186,7 @@ class WifiManager:
     def get_connectivity(self):
         if not self._init_complete:
             return 0  # NM_STATE_UNKNOWN
-        return self.nm_iface.CheckConnectivity()
+        return NetworkManager.NetworkManager.Connectivity
 
     def _update_known_connections(self):
         try:
@@ -192,8 +196,26 @@ class WifiManager:
                 if "802-11-wireless" in settings:
                     ssid = settings["802-11-wireless"]['ssid']
                     self.known_networks[ssid] = con
+                    if con.object_path not in self.watched_connections:
+                        self.watched_connections.add(con.object_path)
+                        con.OnUpdated(self._connection_updated)
         except Exception as e:
             logging.debug(f"Error updating known connections: {e}")
+
+    def _update_active_connection(self):
+        self.active_connection = None
+        with contextlib.suppress(Exception):
+            active = self.wireless_device.ActiveConnection
+            if active:
+                settings = active.Connection.GetSettings()
+                self.active_connection = (
+                    settings['connection']['id'],
+                    settings.get('802-11-wireless', {}).get('mode', '')
+                )
+
+    def _connection_updated(self, con, *args, **kwargs):
+        self._update_known_connections()
+        self._update_active_connection()
                 
     def _ap_added(self, nm, interface, signal, access_point):
         if not self._init_complete:
@@ -226,6 +248,7 @@ class WifiManager:
             logging.exception(f"{e}\n\n{traceback.format_exc()}")
 
     def _ap_state_changed(self, nm, interface, signal, old_state, new_state, reason):
+        self._update_active_connection()
         if not self._init_complete:
             return
         if new_state in NM_STATE:
@@ -253,6 +276,7 @@ class WifiManager:
     def _remove_ap(self, path):
         self.ssid_by_path.pop(path, None)
         self.visible_networks.pop(path, None)
+        NetworkManager.PropertyCache.forget(path)
 
     def add_callback(self, name, callback):
         if name in self._callbacks and callback not in self._callbacks[name]:
@@ -360,7 +384,8 @@ class WifiManager:
         aps = self.visible_networks
         if path in aps:
             ap = aps[path]
-            mode = check_output("nmcli -f %s connection show -s %s | awk '{print $2}'" % ('802-11-wireless.mode', ssid), universal_newlines=True, shell=True)[:-1]
+            # Only the active connection reports a mode, like `nmcli connection show -s` does
+            mode = self.active_connection[1] if self.active_connection and self.active_connection[0] == ssid else ''
             with contextlib.suppress(NetworkManager.ObjectVanished):
                 netinfo.update({
                     "mac": ap.HwAddress,
@@ -80,6 +80,7 @@ class AutoOffPanel(ScreenPanel):
                                               "machine.shutdown")
         else:
             logging.info("OS Shutdown")
+            self._config.flush_user_config()
             os.system("systemctl poweroff")
 
     def cancel_autooff(self, widget):
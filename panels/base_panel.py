@@ -11,19 +11,25 @@ import time
 import gi
 gi.require_version("Gtk", "3.0")
 from gi.repository import GLib, Gtk, Pango, Gdk
-from jinja2 import Environment
 import datetime
 from math import log
 from ks_includes.screen_panel import ScreenPanel
 from ks_includes.widgets.timepicker import Timepicker
 import netifaces
 from ks_includes.KlippyGcodes import KlippyGcodes
+from ks_includes import NetworkManager
 from ks_includes.wifi_nm import WifiManager
 import dbus
 from dbus.mainloop.glib import DBusGMainLoop
 
 class BasePanel(ScreenPanel):
-    NM_STATUS = {0: 'none', 1: 'unknown', 2: 'limited', 3: 'portal', 4: 'full'}
+    LAN_ICONS = {
+        NetworkManager.NM_CONNECTIVITY_PORTAL: "lan_status_limited",
+        NetworkManager.NM_CONNECTIVITY_LIMITED: "lan_status_limited",
+        NetworkManager.NM_CONNECTIVITY_FULL: "lan_status_full",
+    }
+    NETWORK_ICONS = ("lan_status_limited", "lan_status_full", "access_point",
+                     "wifi_excellent", "wifi_good", "wifi_fair", "wifi_weak")
 
     def __init__(self, screen, title):
         super().__init__(screen, title)
@@ -78,6 +84,9 @@ class BasePanel(ScreenPanel):
         self.wireless_interfaces = [iface for iface in self.network_interfaces 
                                   if iface.startswith('w')]
         self.is_connecting_to_network = False
+        self.wifi = None
+        self.network_status = self.hotspot_active = None
+        self.network_update = None
         if len(self.wireless_interfaces) > 0:
             logging.info(f"Found wireless interfaces: {self.wireless_interfaces}")
             self.wifi = WifiManager(self.wireless_interfaces[0])
@@ -226,7 +235,7 @@ class BasePanel(ScreenPanel):
             self.main_grid.attach(self.content, 1, 1, 1, 1)
             self.action_bar.set_orientation(orientation=Gtk.Orientation.VERTICAL)
         self.update_time()
-        GLib.timeout_add_seconds(10, self.update_connected_network_status)
+        self.init_network_status()
 
     def on_unsaved_config_clicked(self, widget, event):
         self.unsaved_config_popover.show_all()
@@ -302,8 +311,10 @@ class BasePanel(ScreenPanel):
 
     def close_power_dialog(self, widget, dialog, response_id):
         if response_id == Gtk.ResponseType.OK:
+            self._config.flush_user_config()
             os.system("systemctl poweroff")
         elif response_id == Gtk.ResponseType.YES:
+            self._config.flush_user_config()
             os.system("systemctl reboot")
         elif response_id == Gtk.ResponseType.APPLY: 
           self._screen.show_popup_message(_("Shutdown on cooling"), level=1, timeout=0)
@@ -318,72 +329,101 @@ class BasePanel(ScreenPanel):
     def connecting_callback(self, msg):
         logging.info("connecting...")
         self.is_connecting_to_network = True
-        GLib.idle_add(self.update_connected_network_status)
+        self.schedule_network_status_update()
 
     def connected_callback(self, ssid, prev_ssid):
         logging.info("connected!")
         self.is_connecting_to_network = False
-        GLib.idle_add(self.update_connected_network_status)
+        self.schedule_network_status_update()
 
     def disconnected_callback(self, msg):
         logging.info("disconnected!")
         self.is_connecting_to_network = False
-        GLib.idle_add(self.update_connected_network_status)
+        self.schedule_network_status_update()
 
     def popup_callback(self, msg):
         logging.exception("exception connect!")
         self.is_connecting_to_network = False
-        GLib.idle_add(self.update_connected_network_status)
+        self.schedule_network_status_update()
+
+    def init_network_status(self):
+        self.network_icons = {
+            name: self._gtk.PixbufFromIcon(name, self.img_titlebar_size, self.img_titlebar_size)
+            for name in self.NETWORK_ICONS
+        }
+        if self.nm_iface is None:
+            return
+        try:
+            dbus.SystemBus().add_signal_receiver(
+                self.on_network_properties_changed, 'PropertiesChanged', 'org.freedesktop.DBus.Properties',
+                'org.freedesktop.NetworkManager', path_keyword='path'
+            )
+            self.nm_iface.connect_to_signal('StateChanged', self.on_network_state_changed)
+        except dbus.exceptions.DBusException as e:
+            logging.error(f"Unable to watch the network state: {e}")
+        self.schedule_network_status_update()
+
+    def on_network_state_changed(self, state):
+        self.schedule_network_status_update()
+
+    def on_network_properties_changed(self, interface, changed, invalidated, path=None):
+        if interface == 'org.freedesktop.NetworkManager':
+            if {'Connectivity', 'State', 'PrimaryConnection'} & set(changed):
+                self.schedule_network_status_update()
+        elif interface == 'org.freedesktop.NetworkManager.AccessPoint' and 'Strength' in changed:
+            if self.wifi is not None and self.network_status not in (None, "access_point"):
+                self.schedule_network_status_update()
+
+    def schedule_network_status_update(self):
+        # Runs after every receiver of the signal, so the property cache is already up to date
+        if self.network_update is None:
+            self.network_update = GLib.idle_add(self.update_connected_network_status)
 
     def update_connected_network_status(self):
-        if not self._screen.initialized:
-            return True
+        self.network_update = None
         try:
-            if not self.is_connecting_to_network:
-                if self.on_connecting_spinner.get_visible():
-                    self.on_connecting_spinner.hide()
-                    self.on_connecting_spinner.stop()
-                if not self.network_status_image.get_visible():
-                    self.network_status_image.show()
-                connected_ssid = self.wifi.get_connected_ssid()
-                if not connected_ssid:
-                    self._screen.process_update("notify_status_update", {'access_point': {'is_active': False}})
-                    # connectivity в объекте нетворк манагера херово работает (он показывает 4, а команда напрямую показывает full)
-
-                    # connectivity_map = {0: 'none', 1: 'unknown', 2: 'limited', 3: 'portal', 4: 'full'}
-                    # self._cached_connectivity = connectivity_map.get(self.connectivity, 'unknown')
-                    try:
-                        status = self.NM_STATUS.get(self.nm_iface.CheckConnectivity(), 'none')
-                    except:
-                        status = 'none'
-                    # data: bytes = subprocess.check_output(["nmcli", "networking", "connectivity"])
-                    # data = data.decode("utf-8").strip()
-                    if status != 'none':
-                      self._screen.gtk.update_image(self.network_status_image, f"lan_status_{status}", self.img_titlebar_size, self.img_titlebar_size)
-                    else:
-                      self.network_status_image.set_from_pixbuf(None)
-                else:
-                    netinfo: dict = self.wifi.get_network_info(connected_ssid)
-                    if not "is_hotspot" in netinfo:
-                        netinfo["is_hotspot"] = False
-                        logging.warning("Cannot get hotspot info")
-                    if not "signal_level_dBm" in netinfo:
-                        netinfo["signal_level_dBm"] = 0
-                        logging.warning("Cannot get signal strehgth info")
-                    self._screen.process_update("notify_status_update", {'access_point': {'is_active': netinfo['is_hotspot']}})
-                    if netinfo['is_hotspot']:
-                        self._screen.gtk.update_image(self.network_status_image, "access_point", self.img_titlebar_size, self.img_titlebar_size)
-                    else:
-                        self._screen.gtk.update_image(self.network_status_image, self.signal_strength(netinfo["signal_level_dBm"]), self.img_titlebar_size, self.img_titlebar_size)     
-            else:
-                if self.network_status_image.get_visible():
-                    self.network_status_image.hide()
-                if not self.on_connecting_spinner.get_visible():
-                    self.on_connecting_spinner.show()
-                    self.on_connecting_spinner.start()
+            status = "connecting" if self.is_connecting_to_network else self.get_network_status()
         except Exception as e:
             logging.exception(f"Error on update network status:\n{e}")
-        return True
+            return False
+        if status == self.network_status:
+            return False
+        self.network_status = status
+        connecting = status == "connecting"
+        self.on_connecting_spinner.set_visible(connecting)
+        if connecting:
+            self.on_connecting_spinner.start()
+        else:
+            self.on_connecting_spinner.stop()
+            self.network_status_image.set_from_pixbuf(self.network_icons.get(status))
+        self.network_status_image.set_visible(not connecting)
+        return False
+
+    def get_network_status(self):
+        connected_ssid = self.wifi.get_connected_ssid() if self.wifi is not None else None
+        if not connected_ssid:
+            self.set_hotspot_active(False)
+            try:
+                return self.LAN_ICONS.get(NetworkManager.NetworkManager.Connectivity)
+            except dbus.exceptions.DBusException:
+                return None
+        netinfo: dict = self.wifi.get_network_info(connected_ssid)
+        if "is_hotspot" not in netinfo:
+            netinfo["is_hotspot"] = False
+            logging.warning("Cannot get hotspot info")
+        if "signal_level_dBm" not in netinfo:
+            netinfo["signal_level_dBm"] = 0
+            logging.warning("Cannot get signal strehgth info")
+        self.set_hotspot_active(netinfo['is_hotspot'])
+        if netinfo['is_hotspot']:
+            return "access_point"
+        return self.signal_strength(netinfo["signal_level_dBm"])
+
+    def set_hotspot_active(self, active):
+        if not self._screen.initialized or active == self.hotspot_active:
+            return
+        self.hotspot_active = active
+        self._screen.process_update("notify_status_update", {'access_point': {'is_active': active}})
 
     def signal_strength(self, signal_level):
         # networkmanager uses percentage not dbm
@@ -584,6 +624,7 @@ class BasePanel(ScreenPanel):
                 self.labels[device].set_label(f"{name}{int(temp)}°")
                 if self.check_temp:
                   if device.startswith("extruder") and temp < 90:
+                    self._config.flush_user_config()
                     os.system("systemctl poweroff")
 
         if (self.current_extruder and 'toolhead' in data and 'extruder' in data['toolhead']
@@ -1086,10 +1127,7 @@ class BasePanel(ScreenPanel):
             self.titlelbl.set_label(f"{self._screen.connecting_to_printer}")
             return
         try:
-            env = Environment(extensions=["jinja2.ext.i18n"], autoescape=True)
-            env.install_gettext_translations(self._config.get_lang())
-            j2_temp = env.from_string(title)
-            title = j2_temp.render()
+            title = self._screen.env.from_string(title).render()
         except Exception as e:
             logging.debug(f"Error parsing jinja for title: {title}\n{e}")
 
@@ -14,6 +14,8 @@ from ks_includes.widgets.settings.entry_setting import EntrySetting
 
 
 class Panel(ScreenPanel):
+    subscriptions = {}
+
     streams = {
       _("mjpegstreamer-adaptive"): "mjpegstreamer-adaptive",
       _("mjpegstreamer"): "mjpegstreamer",
@@ -2,7 +2,8 @@ import time
 import re
 import gi
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk
+from gi.repository import Gtk, GLib
+from collections import deque
 from datetime import datetime
 from ks_includes.screen_panel import ScreenPanel
 from ks_includes.widgets.typed_entry import TypedEntry
@@ -13,13 +14,23 @@ COLORS = {
     "time": "grey",
     "warning": "#c9c9c9"
 }
+TEMPERATURE = re.compile(r'^(?:ok\s+)?(B|C|T\d*):')
+MAX_LINES = 1000
+# Old lines are removed this many at a time
+TRIM_LINES = 100
+# Lines inserted per frame, so a long history does not block the panel
+BATCH_LINES = 200
 
 
 class Panel(ScreenPanel):
+    subscriptions = {}
+
     def __init__(self, screen, title):
         super().__init__(screen, title)
         self.autoscroll = True
         self.hidetemps = True
+        self.pending = deque(maxlen=MAX_LINES)
+        self.flush_id = None
 
         o1_button = self._gtk.Button("arrow-down", _("Auto-scroll") + " ", None, self.bts, Gtk.PositionType.RIGHT, 1)
         o1_button.get_style_context().add_class("button_active")
@@ -87,9 +98,10 @@ class Panel(ScreenPanel):
         self._screen.keyboard.change_entry(entry=entry)
 
     def clear(self, widget=None):
+        self.pending.clear()
         self.labels['tb'].set_text("")
 
-    def add_gcode(self, msgtype, msgtime, message):
+    def format_gcode(self, msgtype, msgtime, message):
         if msgtype == "command":
             color = COLORS['command']
         elif message.startswith("!!"):
@@ -98,30 +110,49 @@ class Panel(ScreenPanel):
         elif message.startswith("//"):
             color = COLORS['warning']
             message = message.replace("// ", "")
-        elif self.hidetemps and re.match('^(?:ok\\s+)?(B|C|T\\d*):', message):
-            return
+        elif self.hidetemps and TEMPERATURE.match(message):
+            return None
         else:
             color = COLORS['response']
+        message = GLib.markup_escape_text(message).replace('\n', '\n         ')
+        return (f'\n<span color="{COLORS["time"]}">{datetime.fromtimestamp(msgtime).strftime("%H:%M:%S")}</span> '
+                f'<span color="{color}"><b>{message}</b></span>')
 
-        message = f'<span color="{color}"><b>{message}</b></span>'
-
-        message = message.replace('\n', '\n         ')
-
-        self.labels['tb'].insert_markup(
-            self.labels['tb'].get_end_iter(),
-            f'\n<span color="{COLORS["time"]}">{datetime.fromtimestamp(msgtime).strftime("%H:%M:%S")}</span> {message}',
-            -1
-        )
-        # Limit the length
-        if self.labels['tb'].get_line_count() > 999:
-            self.labels['tb'].delete(self.labels['tb'].get_iter_at_line(0), self.labels['tb'].get_iter_at_line(1))
+    def add_gcode(self, msgtype, msgtime, message):
+        line = self.format_gcode(msgtype, msgtime, message)
+        if line is not None:
+            self.pending.append(line)
+            self.schedule_flush()
+
+    def schedule_flush(self):
+        if self.flush_id is None:
+            self.flush_id = self.labels['tv'].add_tick_callback(self.flush)
+
+    def flush(self, widget, frame_clock):
+        tb = self.labels['tb']
+        count = min(len(self.pending), BATCH_LINES)
+        if count:
+            tb.insert_markup(tb.get_end_iter(), "".join(self.pending.popleft() for _ in range(count)), -1)
+        lines = tb.get_line_count()
+        if lines > MAX_LINES + TRIM_LINES:
+            tb.delete(tb.get_start_iter(), tb.get_iter_at_line(lines - MAX_LINES))
+        if self.pending:
+            return GLib.SOURCE_CONTINUE
+        self.flush_id = None
+        return GLib.SOURCE_REMOVE
 
     def gcode_response(self, result, method, params):
         if method != "server.gcode_store":
             return
-
-        for resp in result['result']['gcode_store']:
-            self.add_gcode(resp['type'], resp['time'], resp['message'])
+        history = [
+            self.format_gcode(resp['type'], resp['time'], resp['message'])
+            for resp in result['result']['gcode_store']
+        ]
+        # Responses received while waiting for the history go after it
+        lines = [line for line in history if line is not None] + list(self.pending)
+        self.pending.clear()
+        self.pending.extend(lines[-MAX_LINES:])
+        self.schedule_flush()
 
     def process_update(self, action, data):
         if action == "notify_gcode_response":
@@ -129,6 +160,7 @@ class Panel(ScreenPanel):
 
     def hide_temps(self, widget):
         self.hidetemps ^= True
+        self._screen._ws.drop_temperature_responses = self.hidetemps
         self.toggle_active_class(widget, self.hidetemps)
 
     def set_autoscroll(self, widget):
@@ -157,4 +189,8 @@ class Panel(ScreenPanel):
 
     def activate(self):
         self.clear()
-        self._screen._ws.send_method("server.gcode_store", {"count": 100}, self.gcode_response)
+        self._screen._ws.drop_temperature_responses = self.hidetemps
+        self._screen._ws.send_method("server.gcode_store", {"count": MAX_LINES}, self.gcode_response)
+
+    def deactivate(self):
+        self._screen._ws.drop_temperature_responses = True
@@ -4,6 +4,8 @@ from gi.repository import Gtk
 from ks_includes.screen_panel import ScreenPanel
 
 class Panel(ScreenPanel):
+    subscriptions = {}
+
     def __init__(self, screen, title):
         title = title or _("Services")
         super().__init__(screen, title)
@@ -256,8 +256,11 @@ class Panel(ScreenPanel):
         self.speed = speed
 
     def extrude(self, widget, direction):
-        self._screen._ws.klippy.gcode_script(KlippyGcodes.EXTRUDE_REL)
-        self._screen._ws.klippy.gcode_script(KlippyGcodes.extrude(f"{direction}{self.distance}", f"{self.speed * 60}"))
+        speed = self.speed * 60
+        self._screen._ws.klippy.gcode.adjust(
+            "extrude", float(f"{direction}{self.distance}"),
+            lambda total: f"{KlippyGcodes.EXTRUDE_REL}\n{KlippyGcodes.extrude(f'{total:g}', speed)}"
+        )
 
     def load_unload(self, widget, direction):
         if direction == "-":
@@ -143,14 +143,17 @@ class Panel(ScreenPanel):
     def change_babystepping(self, widget, direction):
         if direction == "reset":
             self.labels['zoffset'].set_label('  0.00mm')
-            self._screen._ws.klippy.gcode_script("SET_GCODE_OFFSET Z=0 MOVE=1")
+            self._screen._ws.klippy.gcode.set("babystep", "SET_GCODE_OFFSET Z=0 MOVE=1")
             return
         elif direction == "+":
             self.z_offset += float(self.z_delta)
         elif direction == "-":
             self.z_offset -= float(self.z_delta)
         self.labels['zoffset'].set_label(f'  {self.z_offset:.3f}mm')
-        self._screen._ws.klippy.gcode_script(f"SET_GCODE_OFFSET Z_ADJUST={direction}{self.z_delta} MOVE=1")
+        self._screen._ws.klippy.gcode.adjust(
+            "babystep", float(f"{direction}{self.z_delta}"),
+            lambda total: f"SET_GCODE_OFFSET Z_ADJUST={total:.3f} MOVE=1"
+        )
 
     def change_extrusion(self, widget, direction):
         if direction == "+":
@@ -162,7 +165,7 @@ class Panel(ScreenPanel):
 
         self.extrusion = max(self.extrusion, 1)
         self.labels['extrudefactor'].set_label(f"  {self.extrusion:3}%")
-        self._screen._ws.klippy.gcode_script(KlippyGcodes.set_extrusion_rate(self.extrusion))
+        self._screen._ws.klippy.gcode.set("extrusion", KlippyGcodes.set_extrusion_rate(self.extrusion))
 
     def change_speed(self, widget, direction):
         if direction == "+":
@@ -174,7 +177,7 @@ class Panel(ScreenPanel):
 
         self.speed = max(self.speed, 1)
         self.labels['speedfactor'].set_label(f"  {self.speed:3}%")
-        self._screen._ws.klippy.gcode_script(KlippyGcodes.set_speed_rate(self.speed))
+        self._screen._ws.klippy.gcode.set("speed", KlippyGcodes.set_speed_rate(self.speed))
 
     def change_percent_delta(self, widget, array, delta):
         logging.info(f"### Delta {delta}")
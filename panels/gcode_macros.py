@@ -14,6 +14,8 @@ HIDDEN_MACROS = [
 ]
 
 class Panel(ScreenPanel):
+    subscriptions = {}
+
     def __init__(self, screen, title):
         super().__init__(screen, title)
         self.sort_reverse = False
@@ -7,8 +7,8 @@ gi.require_version("Gtk", "3.0")
 from gi.repository import GLib, Gtk, Pango
 from ks_includes.screen_panel import ScreenPanel
 from ks_includes.KlippyGtk import find_widget
-from math import pi, sqrt, trunc
-from statistics import median
+from ks_includes.print_stats import WindowMedian, Ewma, EtaModel, update_label
+from math import pi, trunc
 from time import time
 
 class Panel(ScreenPanel):
@@ -33,7 +33,9 @@ class Panel(ScreenPanel):
         self.state = "standby"
         self.timeleft_type = "auto"
         self.progress = self.zoffset = self.flowrate = self.vel = .0
-        self.flowstore = []
+        self.flowstore = WindowMedian()
+        self.velocity = Ewma(.3)
+        self.eta = EtaModel()
         self.mm = _("mm")
         self.mms = _("mm/s")
         self.mms2 = _("mm/s²")
@@ -492,6 +494,7 @@ class Panel(ScreenPanel):
         if "virtual_sdcard" in self._printer.data:
             logging.info("reseting progress")
             self._printer.data["virtual_sdcard"]["progress"] = 0
+        self.eta.reset()
         self.update_progress(0.0)
     
     def process_update(self, action, data):
@@ -529,7 +532,8 @@ class Panel(ScreenPanel):
               self._screen.close_popup_message()
 
         if "display_status" in data and "message" in data["display_status"]:
-            self.labels['lcdmessage'].set_label(
+            update_label(
+                self.labels['lcdmessage'],
                 f"{data['display_status']['message'] if data['display_status']['message'] is not None else ''}"
             )
 
@@ -541,60 +545,52 @@ class Panel(ScreenPanel):
                 self.labels['temp_grid'].attach(self.buttons['extruder'][self.current_extruder], 0, 0, 1, 1)
                 self._screen.show_all()
             if "max_accel" in data["toolhead"]:
-                self.labels['max_accel'].set_label(f"{data['toolhead']['max_accel']:.0f} {self.mms2}")
+                update_label(self.labels['max_accel'], f"{data['toolhead']['max_accel']:.0f} {self.mms2}")
         if 'extruder' in data and 'pressure_advance' in data['extruder']:
-            self.labels['advance'].set_label(f"{data['extruder']['pressure_advance']:.2f}")
+            update_label(self.labels['advance'], f"{data['extruder']['pressure_advance']:.2f}")
 
         if 'gcode_move' in data:
             if 'gcode_position' in data['gcode_move']:
                 self.pos_z = round(float(data['gcode_move']['gcode_position'][2]), 2)
-                self.buttons['z'].set_label(f"Z: {self.pos_z:6.2f}{f'/{self.oheight}' if self.oheight > 0 else ''}")
+                update_label(self.buttons['z'], f"Z: {self.pos_z:6.2f}{f'/{self.oheight}' if self.oheight > 0 else ''}")
             if 'extrude_factor' in data['gcode_move']:
                 self.extrusion = round(float(data['gcode_move']['extrude_factor']) * 100)
-                self.labels['extrude_factor'].set_label(f"{self.extrusion:3}%")
+                update_label(self.labels['extrude_factor'], f"{self.extrusion:3}%")
             if 'speed_factor' in data['gcode_move']:
                 self.speed = round(float(data['gcode_move']['speed_factor']) * 100)
                 self.speed_factor = float(data['gcode_move']['speed_factor'])
-                self.labels['speed_factor'].set_label(f"{self.speed:3}%")
+                update_label(self.labels['speed_factor'], f"{self.speed:3}%")
             if 'speed' in data['gcode_move']:
                 self.req_speed = round(float(data["gcode_move"]["speed"]) / 60 * self.speed_factor)
-                self.labels['req_speed'].set_label(
-                    f"{self.speed}% {self.vel:3.0f}/{self.req_speed:3.0f} "
-                    f"{f'{self.mms}' if self.vel < 1000 and self.req_speed < 1000 and self._screen.width > 500 else ''}"
-                )
-                self.buttons['speed'].set_label(self.labels['req_speed'].get_label())
+                self.update_speed()
             if 'homing_origin' in data['gcode_move']:
                 self.zoffset = float(data['gcode_move']['homing_origin'][2])
-                self.labels['zoffset'].set_label(f"{self.zoffset:.3f} {self.mm}")
+                update_label(self.labels['zoffset'], f"{self.zoffset:.3f} {self.mm}")
                 # self.show_buttons_for_state()
         if 'motion_report' in data:
             if 'live_position' in data['motion_report']:
-                self.labels['pos_x'].set_label(f"X: {data['motion_report']['live_position'][0]:6.2f}")
-                self.labels['pos_y'].set_label(f"Y: {data['motion_report']['live_position'][1]:6.2f}")
-                self.labels['pos_z'].set_label(f"Z: {data['motion_report']['live_position'][2]:6.2f}")
+                update_label(self.labels['pos_x'], f"X: {data['motion_report']['live_position'][0]:6.2f}")
+                update_label(self.labels['pos_y'], f"Y: {data['motion_report']['live_position'][1]:6.2f}")
+                update_label(self.labels['pos_z'], f"Z: {data['motion_report']['live_position'][2]:6.2f}")
                 pos = data["motion_report"]["live_position"]
                 now = time()
                 if self.prev_pos is not None:
                     interval = (now - self.prev_pos[1])
                     # Calculate Flowrate
                     evelocity = (pos[3] - self.prev_pos[0][3]) / interval
-                    self.flowstore.append(self.fila_section * evelocity)
+                    self.flowstore.push(self.fila_section * evelocity)
                 self.prev_pos = [pos, now]
             if 'live_velocity' in data['motion_report']:
-                self.vel = float(data["motion_report"]["live_velocity"])
-                self.labels['req_speed'].set_label(
-                    f"{self.speed}% {self.vel:3.0f}/{self.req_speed:3.0f} "
-                    f"{f'{self.mms}' if self.vel < 1000 and self.req_speed < 1000 and self._screen.width > 500 else ''}"
-                )
-                self.buttons['speed'].set_label(self.labels['req_speed'].get_label())
+                self.vel = self.velocity.push(float(data["motion_report"]["live_velocity"]))
+                self.update_speed()
             if 'live_extruder_velocity' in data['motion_report']:
-                self.flowstore.append(self.fila_section * float(data["motion_report"]["live_extruder_velocity"]))
+                self.flowstore.push(self.fila_section * float(data["motion_report"]["live_extruder_velocity"]))
         fan_label = ""
         for fan in self.fans:
             self.fans[fan]['speed'] = f"{self._printer.get_fan_speed(fan) * 100:3.0f}%"
             fan_label += f" {self.fans[fan]['name']}{self.fans[fan]['speed']}"
         if fan_label:
-            self.buttons['fan'].set_label(fan_label[:12])
+            update_label(self.buttons['fan'], fan_label[:12])
 
         if "print_stats" in data:
             if 'state' in data['print_stats']:
@@ -605,21 +601,24 @@ class Panel(ScreenPanel):
             if 'filename' in data['print_stats']:
                 self.update_filename(data['print_stats']["filename"])
             if 'filament_used' in data['print_stats']:
-                self.labels['filament_used'].set_label(
+                update_label(
+                    self.labels['filament_used'],
                     f"{float(data['print_stats']['filament_used']) / 1000:.1f} m"
                 )
             if 'info' in data["print_stats"]:
                 if ('total_layer' in data['print_stats']['info']
                         and data["print_stats"]['info']['total_layer'] is not None):
-                    self.labels['total_layers'].set_label(f"{data['print_stats']['info']['total_layer']}")
+                    update_label(self.labels['total_layers'], f"{data['print_stats']['info']['total_layer']}")
                 if ('current_layer' in data['print_stats']['info']
                         and data['print_stats']['info']['current_layer'] is not None):
-                    self.labels['layer'].set_label(
+                    update_label(
+                        self.labels['layer'],
                         f"{data['print_stats']['info']['current_layer']} / "
                         f"{self.labels['total_layers'].get_text()}"
                     )
             elif "layer_height" in self.file_metadata and "object_height" in self.file_metadata:
-                self.labels['layer'].set_label(
+                update_label(
+                    self.labels['layer'],
                     f"{1 + round((self.pos_z - self.f_layer_h) / self.layer_h)} / "
                     f"{self.labels['total_layers'].get_text()}"
                 )
@@ -627,14 +626,20 @@ class Panel(ScreenPanel):
                 self.update_time_left()
 
     def update_flow(self):
-        if not self.flowstore:
-            self.flowstore.append(0)
-        self.flowrate = median(self.flowstore)
-        self.flowstore = []
-        self.labels['flowrate'].set_label(f"{self.flowrate:.1f} {self.mms3}")
-        self.buttons['extrusion'].set_label(f"{self.extrusion:3}% {self.flowrate:5.1f} {self.mms3}")
+        self.flowrate = self.flowstore.value()
+        self.flowstore.reset()
+        update_label(self.labels['flowrate'], f"{self.flowrate:.1f} {self.mms3}")
+        update_label(self.buttons['extrusion'], f"{self.extrusion:3}% {self.flowrate:5.1f} {self.mms3}")
         return True
 
+    def update_speed(self):
+        update_label(
+            self.labels['req_speed'],
+            f"{self.speed}% {self.vel:3.0f}/{self.req_speed:3.0f} "
+            f"{f'{self.mms}' if self.vel < 1000 and self.req_speed < 1000 and self._screen.width > 500 else ''}"
+        )
+        update_label(self.buttons['speed'], self.labels['req_speed'].get_label())
+
     def update_time_left(self):
         total_duration = float(self._printer.get_stat('print_stats', 'total_duration'))
         print_duration = float(self._printer.get_stat('print_stats', 'print_duration'))
@@ -645,58 +650,32 @@ class Panel(ScreenPanel):
                         self.file_metadata['gcode_start_byte']))
         else:
             progress = self._printer.get_stat('virtual_sdcard', 'progress')
-        self.labels["duration"].set_label(self.format_time(total_duration))
+        update_label(self.labels["duration"], self.format_time(total_duration))
         elapsed_label = f"{self.labels['elapsed'].get_text()}  {self.labels['duration'].get_text()}"
-        self.buttons['elapsed'].set_label(elapsed_label)
-        find_widget(self.buttons['elapsed'], Gtk.Label).set_ellipsize(Pango.EllipsizeMode.END)
-        estimated = slicer_time = filament_time = file_time = 0
+        if update_label(self.buttons['elapsed'], elapsed_label):
+            find_widget(self.buttons['elapsed'], Gtk.Label).set_ellipsize(Pango.EllipsizeMode.END)
         timeleft_type = self._config.get_config()['main'].get('print_estimate_method', 'auto')
 
-        if 'estimated_time' in self.file_metadata and self.file_metadata['estimated_time'] > 1:
-            spdcomp = sqrt(self.speed_factor)
-            slicer_time = ((self.file_metadata['estimated_time']) / spdcomp)
-            self.labels["slicer_time"].set_label(self.format_time(slicer_time))
-            if print_duration < 1:
-                print_duration = slicer_time * progress
-        elif print_duration < 1:  # No-extrusion
-            print_duration = total_duration
-
-        if 'filament_total' in self.file_metadata and self.file_metadata['filament_total'] >= fila_used > 0:
-            filament_time = (print_duration / (fila_used / self.file_metadata['filament_total']))
-            self.labels["filament_time"].set_label(self.format_time(filament_time))
-        if progress > 0:
-            file_time = (print_duration / progress)
-            self.labels["file_time"].set_label(self.format_time(file_time))
-
-        if timeleft_type == "file":
-            estimated = file_time
-        elif timeleft_type == "filament":
-            estimated = filament_time
-        elif timeleft_type == "slicer":
-            estimated = slicer_time
-        elif estimated < 1:  # Auto
-            if print_duration < slicer_time > 1:
-                if progress < 0.15:
-                    # At the begining file and filament are innacurate
-                    estimated = slicer_time
-                elif filament_time > 1 and file_time > 1:
-                    # Weighted arithmetic mean (Slicer is the most accurate)
-                    estimated = (slicer_time * 3 + filament_time + file_time) / 5
-                elif file_time > 1:
-                    # Weighted arithmetic mean (Slicer is the most accurate)
-                    estimated = (slicer_time * 2 + file_time) / 3
-            elif print_duration < filament_time > 1 and file_time > 1:
-                estimated = (filament_time + file_time) / 2
-            elif file_time > 1:
-                estimated = file_time
+        eta = self.eta
+        estimated = eta.update(
+            timeleft_type, total_duration, print_duration, fila_used, progress, self.file_metadata, self.speed_factor
+        )
+        if eta.slicer_time:
+            update_label(self.labels["slicer_time"], self.format_time(eta.slicer_time))
+        if eta.filament_time:
+            update_label(self.labels["filament_time"], self.format_time(eta.filament_time))
+        if eta.file_time:
+            update_label(self.labels["file_time"], self.format_time(eta.file_time))
         if estimated > 1:
-            progress = min(max(print_duration / estimated, 0), 1)
-            self.labels["est_time"].set_label(self.format_time(estimated))
-            self.labels["time_left"].set_label(self.format_eta(estimated, print_duration))
+            update_label(self.labels["est_time"], self.format_time(estimated))
+            update_label(self.labels["time_left"], self.format_eta(estimated, eta.print_duration))
             remaining_label = f"{self.labels['left'].get_text()}  {self.labels['time_left'].get_text()}"
-            self.buttons['left'].set_label(remaining_label)
-            find_widget(self.buttons['left'], Gtk.Label).set_ellipsize(Pango.EllipsizeMode.END)
-        self.update_progress(progress)
+            if update_label(self.buttons['left'], remaining_label):
+                find_widget(self.buttons['left'], Gtk.Label).set_ellipsize(Pango.EllipsizeMode.END)
+        if trunc(eta.progress * 100) != trunc(self.progress * 100):
+            self.update_progress(eta.progress)
+        else:
+            self.progress = eta.progress
 
     def update_progress(self, progress: float):
         self.progress = progress
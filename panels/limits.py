@@ -240,14 +240,17 @@ class Panel(ScreenPanel):
         self.values[opt] = real_value
 
         if opt == "max_accel":
-            self._screen._ws.klippy.gcode_script(f"SET_VELOCITY_LIMIT ACCEL={int(real_value)}")
+            script = f"SET_VELOCITY_LIMIT ACCEL={int(real_value)}"
         elif opt == "minimum_cruise_ratio":
-            self._screen._ws.klippy.gcode_script(f"SET_VELOCITY_LIMIT MINIMUM_CRUISE_RATIO={real_value:.3f}")
+            script = f"SET_VELOCITY_LIMIT MINIMUM_CRUISE_RATIO={real_value:.3f}"
         elif opt == "max_velocity":
-            self._screen._ws.klippy.gcode_script(f"SET_VELOCITY_LIMIT VELOCITY={int(real_value)}")
+            script = f"SET_VELOCITY_LIMIT VELOCITY={int(real_value)}"
         elif opt == "square_corner_velocity":
-            self._screen._ws.klippy.gcode_script(f"SET_VELOCITY_LIMIT SQUARE_CORNER_VELOCITY={int(real_value)}")
+            script = f"SET_VELOCITY_LIMIT SQUARE_CORNER_VELOCITY={int(real_value)}"
         elif opt == "pressure_advance":
-            self._screen._ws.klippy.gcode_script(f"SET_PRESSURE_ADVANCE ADVANCE={real_value:.4f}")
+            script = f"SET_PRESSURE_ADVANCE ADVANCE={real_value:.4f}"
         elif opt == "pressure_smooth_time":
-            self._screen._ws.klippy.gcode_script(f"SET_PRESSURE_ADVANCE SMOOTH_TIME={real_value:.5f}")
\ No newline at end of file
+            script = f"SET_PRESSURE_ADVANCE SMOOTH_TIME={real_value:.5f}"
+        else:
+            return
+        self._screen._ws.klippy.gcode.set(opt, script)
\ No newline at end of file
@@ -9,6 +9,8 @@ from ks_includes.widgets.heatergraph import HeaterGraph
 from ks_includes.widgets.keypad import Keypad
 
 class Panel(MenuPanel):
+    subscriptions = {"virtual_sdcard": ["has_interrupted_file"]}
+
     def __init__(self, screen, title, items=None):
         super().__init__(screen, title, items)
         self.left_panel = None
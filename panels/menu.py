@@ -1,20 +1,20 @@
-from concurrent.futures import ThreadPoolExecutor
 import logging
-import threading
 import gi
 import json
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, GLib
-from jinja2 import Template
 from ks_includes.screen_panel import ScreenPanel
 from ks_includes.widgets.autogrid import AutoGrid
 
 class Panel(ScreenPanel):
+    subscriptions = {}
+
     
     def __init__(self, screen, title, items=None):
         super().__init__(screen, title)
         self.items = items
         self.j2_data = self._printer.get_printer_status_data()
+        self.has_homing_origin = False
         self.create_menu_items()
         self.scroll = self._gtk.ScrolledWindow()
         self.scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
@@ -23,6 +23,21 @@ class Panel(ScreenPanel):
     def activate(self):
         self.j2_data = self._printer.get_printer_status_data()
         self.add_content()
+        if any("{{ has_homing_origin }}" in (item[key]['enable'], item[key]['sensitive'])
+               for item in self.items for key in item):
+            self.request_async("printer/objects/query?gcode_move", self.homing_origin_loaded, ttl=2)
+
+    def homing_origin_loaded(self, result):
+        try:
+            has_homing_origin = result['result']['status']['gcode_move']['homing_origin'][2] != .0
+        except (TypeError, KeyError, IndexError) as e:
+            logging.debug(f"Error getting homing origin: {e}")
+            return
+        logging.info(f"has_homing_origin: {has_homing_origin}")
+        if has_homing_origin != self.has_homing_origin:
+            self.has_homing_origin = has_homing_origin
+            self.add_content()
+            self.content.show_all()
     
     def add_content(self):
         for child in self.scroll.get_children():
@@ -49,33 +64,26 @@ class Panel(ScreenPanel):
         return self.autogrid
 
     def create_menu_items(self):
-        enable_items = [item for item in self.items] #if bool(self.evaluate_enable(item[next(iter(item))]['enable']))]
-        count = len(enable_items)
+        count = len(self.items)
         divider = 3 if count <= 8 else 4
         scale = 1.1 if 12 < count <= 16 else None  # hack to fit a 4th row
-        futures = []
-        with ThreadPoolExecutor(max_workers=4) as executor:
-          for i in range(len(enable_items)):
-            key = list(enable_items[i])[0]
-            item = enable_items[i][key]
-            future = executor.submit(self.create_menu_item, i, key, item)
-            futures.append(future)
-        for future in futures:
-            i, key, item, name, icon, style, params = future.result()
-            self._create_widget(i, key, item, name, icon, style, params, divider, scale)
+        for i, item in enumerate(self.items):
+            key = list(item)[0]
+            self._create_widget(i, key, item[key], *self.create_menu_item(item[key]), divider, scale)
 
-    def create_menu_item(self, i, key, item):
-      name = self._screen.env.from_string(item['name']).render(self.j2_data)
-      icon = self._screen.env.from_string(item['icon']).render(self.j2_data) if item['icon'] else None
-      style = self._screen.env.from_string(item['style']).render(self.j2_data) if item['style'] else None
+    def create_menu_item(self, item):
+      templates = self._config.templates
+      name = templates.render(item['name'], self.j2_data)
+      icon = templates.render(item['icon'], self.j2_data) if item['icon'] else None
+      style = templates.render(item['style'], self.j2_data) if item['style'] else None
       params = {}
       if item['params'] is not False:
         try:
-          p = self._screen.env.from_string(item['params']).render(self.j2_data)
+          p = templates.render(item['params'], self.j2_data)
           params = json.loads(p)
         except Exception as e:
           logging.exception(f"Unable to parse parameters for [{name}]:\n{e}")
-      return i, key, item, name, icon, style, params
+      return name, icon, style, params
     
     def _create_widget(self, i, key, item, name, icon, style, params, divider, scale):
       b = self._gtk.Button(icon, name, style or f"color{i % divider + 1}", scale=scale)
@@ -92,16 +100,9 @@ class Panel(ScreenPanel):
 
     def evaluate_sensitive(self, sensitive):
         if sensitive == "{{ has_homing_origin }}":
-            try:
-              has_homing_origin = self._screen.apiclient.send_request("printer/objects/query?gcode_move")['result']['status']['gcode_move']['homing_origin'][2] != .0
-              logging.info(f"has_homing_origin: {has_homing_origin}")
-              return has_homing_origin
-            except Exception as e:
-                logging.debug(f"Error evaluating sensitive statement: {sensitive}\n{e}")
-                return False
+            return self.has_homing_origin
         try:
-            j2_temp = Template(sensitive, autoescape=True)
-            return j2_temp.render(self.j2_data) == 'True'
+            return self._config.templates.render(sensitive, self.j2_data) == 'True'
         except Exception as e:
             logging.debug(f"Error evaluating sensitive statement: {sensitive}\n{e}")
             return False
@@ -111,16 +112,9 @@ class Panel(ScreenPanel):
             logging.info(f"moonraker connected {self._screen._ws.connected}")
             return self._screen._ws.connected
         elif enable == "{{ has_homing_origin }}":
-            try:
-                has_homing_origin = self._screen.apiclient.send_request("printer/objects/query?gcode_move")['result']['status']['gcode_move']['homing_origin'][2] != .0
-                logging.info(f"has_homing_origin: {has_homing_origin}")
-                return has_homing_origin
-            except Exception as e:
-                logging.debug(f"Error evaluating enable statement: {enable}\n{e}")
-                return False
+            return self.has_homing_origin
         try:
-            j2_temp = Template(enable, autoescape=True)
-            return j2_temp.render(self.j2_data) == 'True'
+            return self._config.templates.render(enable, self.j2_data) == 'True'
         except Exception as e:
             logging.debug(f"Error evaluating enable statement: {enable}\n{e}")
             return False
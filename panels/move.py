@@ -72,6 +72,8 @@ class Panel(ScreenPanel):
         positions_grid.attach(self.labels['X'], 0, 0, 1, 1)
         positions_grid.attach(self.labels['Y'], 1, 0, 1, 1)
         positions_grid.attach(self.labels['Z'], 2, 0, 1, 1)
+        self.labels['queue'] = Gtk.Label()
+        positions_grid.attach(self.labels['queue'], 3, 0, 1, 1)
         positions_grid.set_resize_mode(False)
         
         self.labels['move_menu'].set_row_spacing(15)
@@ -82,6 +84,14 @@ class Panel(ScreenPanel):
         self.labels['move_menu'].attach(positions_grid, 0, 0, 2, 1)
         self.content.add(self.labels['move_menu'])
 
+    def activate(self):
+        self.gcode = self._screen._ws.klippy.gcode
+        self.gcode.connect(self.update_queue)
+        self.update_queue(self.gcode.depth)
+
+    def deactivate(self):
+        self.gcode.disconnect(self.update_queue)
+
     def switch_strategy(self, widget):
         if isinstance(self.movement_area.strategy, ZStrategy):
             self.movement_area.change_strategy(XYStrategy)
@@ -195,39 +205,42 @@ class Panel(ScreenPanel):
         # if speed is None:
         speed = float(self._config.get_config()['main'].getint(config_key, 20))
         speed = 60 * max(1, speed)
+        # Taps on the same axis within the debounce window become one move
+        self._screen._ws.klippy.gcode.adjust(f"move {axis}", dist, lambda total: self.move_script(axis, total, speed))
+
+    def move_script(self, axis, dist, speed):
         min_axis = self.movement_area.strategy.coordinates.get_min(axis)
         max_axis = self.movement_area.strategy.coordinates.get_max(axis)
         # if not self.movement_area.move_controller.get_axis_gcode_position(axis):
         #     self._screen.show_popup_message(_("Error on get gcode position"), just_popup = True)
         #     return
-        if dist < 0:
-            if min_axis > self.positions[axis] + dist:#self.movement_area.move_controller.get_axis_gcode_position(axis) + dist:
-                self._screen._ws.klippy.gcode_script(f"{KlippyGcodes.MOVE_ABSOLUTE}\n{KlippyGcodes.MOVE} {axis}{min_axis} F{speed}")
-            else:
-               self._screen._ws.klippy.gcode_script(f"{KlippyGcodes.MOVE_RELATIVE}\n{KlippyGcodes.MOVE} {axis}{dist} F{speed}") 
+        if dist < 0 and min_axis > self.positions[axis] + dist:
+            script = f"{KlippyGcodes.MOVE_ABSOLUTE}\n{KlippyGcodes.MOVE} {axis}{min_axis} F{speed}"
+        elif dist > 0 and max_axis < self.positions[axis] + dist:
+            script = f"{KlippyGcodes.MOVE_ABSOLUTE}\n{KlippyGcodes.MOVE} {axis}{max_axis} F{speed}"
         else:
-            if max_axis < self.positions[axis] + dist:
-                self._screen._ws.klippy.gcode_script(f"{KlippyGcodes.MOVE_ABSOLUTE}\n{KlippyGcodes.MOVE} {axis}{max_axis} F{speed}")
-            else:
-               self._screen._ws.klippy.gcode_script(f"{KlippyGcodes.MOVE_RELATIVE}\n{KlippyGcodes.MOVE} {axis}{dist} F{speed}") 
-
+            script = f"{KlippyGcodes.MOVE_RELATIVE}\n{KlippyGcodes.MOVE} {axis}{dist:g} F{speed}"
         if self._printer.get_stat("gcode_move", "absolute_coordinates"):
-            self._screen._ws.klippy.gcode_script("G90")
+            script += "\nG90"
+        return script
+
+    def update_queue(self, depth):
+        self.labels['queue'].set_text(_("Queued") + f": {depth}" if depth else "")
 
     def home(self, widget):
-        self._screen._ws.klippy.gcode_script(KlippyGcodes.HOME)
+        self._screen._ws.klippy.gcode.send(KlippyGcodes.HOME)
     
     def homex(self, widget):
-        self._screen._ws.klippy.gcode_script(KlippyGcodes.HOME_X)
+        self._screen._ws.klippy.gcode.send(KlippyGcodes.HOME_X)
     
     def homey(self, widget):
-        self._screen._ws.klippy.gcode_script(KlippyGcodes.HOME_Y)
+        self._screen._ws.klippy.gcode.send(KlippyGcodes.HOME_Y)
     
     def homez(self, widget):
-        self._screen._ws.klippy.gcode_script(KlippyGcodes.HOME_Z)
+        self._screen._ws.klippy.gcode.send(KlippyGcodes.HOME_Z)
 
     def z_tilt(self, widget):
-        self._screen._ws.klippy.gcode_script(KlippyGcodes.Z_TILT)
+        self._screen._ws.klippy.gcode.send(KlippyGcodes.Z_TILT)
 
     def quad_gantry_level(self, widget):
-        self._screen._ws.klippy.gcode_script(KlippyGcodes.QUAD_GANTRY_LEVEL)
\ No newline at end of file
+        self._screen._ws.klippy.gcode.send(KlippyGcodes.QUAD_GANTRY_LEVEL)
\ No newline at end of file
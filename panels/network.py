@@ -8,6 +8,8 @@ from ks_includes.widgets.AP_configuration import APConfiguration
 from ks_includes.screen_panel import ScreenPanel
 
 class Panel(ScreenPanel):
+    subscriptions = {}
+
     initialized = False
 
     def __init__(self, screen, title):
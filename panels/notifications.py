@@ -14,6 +14,8 @@ def remove_newlines(msg: str) -> str:
     return msg.replace('\n', ' ')
 
 class Panel(ScreenPanel):
+    subscriptions = {}
+
     def __init__(self, screen, title):
         super().__init__(screen, title)
         self.empty = _("Notification log empty")
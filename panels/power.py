@@ -5,6 +5,8 @@ from gi.repository import Gtk, Pango
 from ks_includes.screen_panel import ScreenPanel
 
 class Panel(ScreenPanel):
+    subscriptions = {}
+
     def __init__(self, screen, title):
         super().__init__(screen, title)
         self.devices = {}
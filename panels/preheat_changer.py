@@ -8,6 +8,8 @@ from ks_includes.screen_panel import ScreenPanel
 from ks_includes.widgets.typed_entry import TypedEntry, NumberRule, SpaceRule
 
 class Panel(ScreenPanel):
+  subscriptions = {}
+
   def __init__(self, screen, title):
     super().__init__(screen, title)
     scroll = self._screen.gtk.ScrolledWindow()
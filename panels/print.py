@@ -5,7 +5,7 @@ import gi
 from ks_includes.KlippyGcodes import KlippyGcodes
 from ks_includes.widgets.settings.combo_box_setting import ComboBoxSetting
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, Pango
+from gi.repository import GLib, Gtk, Pango
 from datetime import datetime
 from ks_includes.screen_panel import ScreenPanel
 from ks_includes.KlippyGtk import find_widget
@@ -20,7 +20,14 @@ def format_label(widget):
         label.set_ellipsize(Pango.EllipsizeMode.END)
         label.set_lines(2)
 
+# Items are built this many pages around the visible area and released beyond KEEP_PAGES
+OVERSCAN_PAGES = .5
+KEEP_PAGES = 3
+
+
 class Panel(ScreenPanel): 
+    subscriptions = {"bed_mesh": ["profile_name", "profiles"]}
+
     def_re = re.compile('^profile_(?P<i>\d+)$')
     def __init__(self, screen, title):
         super().__init__(screen, title)
@@ -45,6 +52,12 @@ class Panel(ScreenPanel):
         self.loading = False
         self.cur_directory = ''
         self.list_button_size = self._gtk.img_scale * self.bts
+        self.visible_update = None
+        self.first_paint = None
+        self.load_start = None
+        # Info labels of the listed files, updated when the print history arrives
+        self.info_labels = {}
+        self.confirm_info = None
 
         self.headerbox = Gtk.Box(hexpand=True, vexpand=False)
         n = 0
@@ -81,6 +94,7 @@ class Panel(ScreenPanel):
         list_mode = self._config.get_main_config().get("print_view", 'thumbs')
         logging.info(list_mode)
         self.list_mode = list_mode == 'list'
+        self.row_height = self.estimate_row_height()
         if self.list_mode:
             self.flowbox.set_min_children_per_line(1)
             self.flowbox.set_max_children_per_line(1)
@@ -91,6 +105,8 @@ class Panel(ScreenPanel):
 
         self.scroll = self._gtk.ScrolledWindow()
         self.scroll.add(self.flowbox)
+        self.scroll.get_vadjustment().connect("value-changed", self.schedule_visible_update)
+        self.flowbox.connect("size-allocate", self.schedule_visible_update)
 
         self.main = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, vexpand=True, spacing=0)
         self.main.add(self.headerbox)
@@ -102,6 +118,11 @@ class Panel(ScreenPanel):
         self._screen._ws.klippy.get_dir_info(self.load_files, 'gcodes')
         self._screen._ws.klippy.get_dir_info(self.load_files, 'media')
 
+    def estimate_row_height(self):
+        if self.list_mode:
+            return int(self.thumbsize / 2 + self._gtk.font_size * 2)
+        return int(self.thumbsize + self._gtk.font_size * 3)
+
     def watch_cur_directory(self):
         if self.cur_directory != '':
             self._screen._ws.klippy.get_dir_info(self.watch_result, self.cur_directory)
@@ -131,6 +152,7 @@ class Panel(ScreenPanel):
         if self.cur_directory != '':
             self.change_dir()
         self._screen.files.add_callback(self._callback)
+        self.update_history_info()
 
     def deactivate(self):
         self._screen.files.remove_callback(self._callback)
@@ -169,12 +191,27 @@ class Panel(ScreenPanel):
         basename = os.path.splitext(name)[0]
         fbchild.set_path(path)
         fbchild.set_name(basename.casefold())
+        fbchild.item = item
+        fbchild.parent_path = parent_path
+        fbchild.fullpath = fullpath
+        # Placeholder until the item scrolls into view
+        fbchild.set_size_request(-1, self.row_height)
+        return fbchild
+
+    def populate_item(self, fbchild: PrintListItem):
+        item = fbchild.item
+        parent_path = fbchild.parent_path
+        fullpath = fbchild.fullpath
+        path = fbchild.get_path()
+        basename = os.path.splitext(item['dirname'] if 'dirname' in item else item['filename'])[0]
         if self.list_mode:
             label = Gtk.Label(label=basename, hexpand=True, vexpand=False)
             format_label(label)
             info = Gtk.Label(hexpand=True, halign=Gtk.Align.START, wrap=True, wrap_mode=Pango.WrapMode.WORD_CHAR)
             info.get_style_context().add_class("print-info")
             info.set_markup(self.get_info_str(item, path))
+            if 'filename' in item:
+                self.info_labels[path] = (info, item)
             
             if parent_path.startswith('gcodes'):
                 delete = Gtk.Button(hexpand=False, vexpand=False, can_focus=False, always_show_image=True)
@@ -210,7 +247,7 @@ class Panel(ScreenPanel):
                 action.set_vexpand(False)
                 action.set_halign(Gtk.Align.END)
                 row.attach(action, 4, 0, 1, 2)
-            elif 'dirname' in item:
+            else:
                 icon.connect("clicked", self.change_dir, fullpath)
                 if fullpath.startswith('media'):
                     image_args = (path, icon, self.thumbsize / 2, True, "folder_media")
@@ -225,8 +262,6 @@ class Panel(ScreenPanel):
                 action.set_vexpand(False)
                 action.set_halign(Gtk.Align.END)
                 row.attach(action, 4, 0, 1, 2)
-            else:
-                return
             fbchild.add(row)
         else:  # Thumbnail view
             icon = self._gtk.Button(label=basename)
@@ -236,25 +271,65 @@ class Panel(ScreenPanel):
                     image_args = (path, icon, self.thumbsize, False, "file_media")
                 else:
                     image_args = (path, icon, self.thumbsize, False, "file")
-            elif 'dirname' in item:
+            else:
                 icon.connect("clicked", self.change_dir, fullpath)
                 if fullpath.startswith('media'):
                     image_args = (path, icon, self.thumbsize, False, "folder_media")
                 else:
                     image_args = (None, icon, self.thumbsize, False, "folder")
-            else:
-                return
             fbchild.add(icon)
+        fbchild.populated = True
+        fbchild.set_size_request(-1, -1)
         self.image_load(*image_args)
-        return fbchild
+        fbchild.show_all()
+
+    def unpopulate_item(self, fbchild: PrintListItem):
+        height = fbchild.get_allocated_height()
+        child = fbchild.get_child()
+        if child is not None:
+            fbchild.remove(child)
+        self.info_labels.pop(fbchild.get_path(), None)
+        fbchild.populated = False
+        fbchild.set_size_request(-1, height)
+
+    def schedule_visible_update(self, *args):
+        if self.visible_update is None:
+            self.visible_update = GLib.idle_add(self.update_visible_items)
+
+    def update_visible_items(self):
+        self.visible_update = None
+        adj = self.scroll.get_vadjustment()
+        page = adj.get_page_size()
+        if not self.flowbox.get_realized() or page <= 0:
+            return False
+        top = adj.get_value() - page * OVERSCAN_PAGES
+        bottom = adj.get_value() + page * (1 + OVERSCAN_PAGES)
+        keep_top = adj.get_value() - page * KEEP_PAGES
+        keep_bottom = adj.get_value() + page * (1 + KEEP_PAGES)
+        for fbchild in self.flowbox.get_children():
+            alloc = fbchild.get_allocation()
+            if alloc.y + alloc.height >= top and alloc.y <= bottom:
+                if not fbchild.populated:
+                    self.populate_item(fbchild)
+            elif fbchild.populated and (alloc.y + alloc.height < keep_top or alloc.y > keep_bottom):
+                self.unpopulate_item(fbchild)
+            elif fbchild.populated:
+                self.row_height = max(self.row_height, alloc.height)
+        return False
 
     def image_load(self, filepath, widget, size=-1, small=True, iconname=None):
-        pixbuf = self.get_file_image(filepath, size, size, small)
-        if pixbuf is not None:
-            widget.set_image(Gtk.Image.new_from_pixbuf(pixbuf))
-        elif iconname is not None:
+        if iconname is not None:
             widget.set_image(self._gtk.Image(iconname, size, size))
         format_label(widget)
+        if filepath is not None:
+            self.get_file_image_async(filepath, size, size, small, self.image_loaded, widget)
+
+    @staticmethod
+    def image_loaded(pixbuf, widget):
+        if pixbuf is None:
+            return
+        widget.set_image(Gtk.Image.new_from_pixbuf(pixbuf))
+        format_label(widget)
 
     def confirm_delete_file(self, widget, filepath):
         logging.debug(f"Sending delete_file {filepath}")
@@ -406,6 +481,7 @@ class Panel(ScreenPanel):
             label=self.get_file_info_extended(filename), use_markup=True, ellipsize=Pango.EllipsizeMode.END
         )
         info_box.pack_start(fileinfo, True, True, 0)
+        self.confirm_info = (fileinfo, filename)
 
         inside_box.pack_start(info_box, True, True, 0)
         main_box.pack_start(inside_box, True, True, 0)
@@ -420,6 +496,13 @@ class Panel(ScreenPanel):
         image.set_vexpand(True)
         self._gtk.Dialog(None, image, filename, self.close_fullscreen_thumbnail)
 
+    def update_history_info(self):
+        for path, (label, item) in self.info_labels.items():
+            label.set_markup(self.get_info_str(item, path))
+        if self.confirm_info is not None:
+            label, filename = self.confirm_info
+            label.set_markup(self.get_file_info_extended(filename))
+
     def close_fullscreen_thumbnail(self, dialog, *args):
         self._gtk.remove_dialog(dialog)
 
@@ -428,6 +511,7 @@ class Panel(ScreenPanel):
             self.open_settings_dialog()
             return
         elif response_id == Gtk.ResponseType.CANCEL:
+            self.confirm_info = None
             self._gtk.remove_dialog(dialog)
             return
         elif response_id == Gtk.ResponseType.OK:
@@ -435,6 +519,7 @@ class Panel(ScreenPanel):
             self._screen._ws.klippy.print_start(filename)
         elif response_id == Gtk.ResponseType.REJECT:
             self.confirm_delete_file(None, f"gcodes/{filename}")
+        self.confirm_info = None
         self._gtk.remove_dialog(dialog)
 
     def open_settings_dialog(self):
@@ -528,8 +613,18 @@ class Panel(ScreenPanel):
         if "print_start_time" in item:
             if item['print_start_time']:
                 info += _("Last Print Time") + f': <b>{datetime.fromtimestamp(fileinfo["print_start_time"]):%Y/%m/%d %I:%M %p}</b>\n'
+        if 'filename' in item:
+            last_duration = self.get_last_duration(path)
+            if last_duration:
+                info += ("" if info.endswith("\n") else "\n") + last_duration
         return info
 
+    def get_last_duration(self, path):
+        job = self._screen.files.get_last_job(path)
+        if job and job.get('status') == "completed":
+            return _("Last Duration") + f": <b>{self.format_time(job['print_duration'])}</b>"
+        return ""
+
     def get_file_info_extended(self, filename):
         fileinfo = self._screen.files.get_file_info(filename)
         info = ""
@@ -561,10 +656,7 @@ class Panel(ScreenPanel):
             info += _("Size") + f': <b>{self.format_size(fileinfo["size"])}</b>\n'
         if "estimated_time" in fileinfo:
             info += _("Estimated Time") + f': <b>{self.format_time(fileinfo["estimated_time"])}</b>\n'
-        if "job_id" in fileinfo:
-            history = self._screen.apiclient.send_request(f"server/history/job?uid={fileinfo['job_id']}")
-            if history and 'job' in history and 'status' in history['job'] and history['job']['status'] == "completed":
-                info += _("Last Duration") + f": <b>{self.format_time(history['job']['print_duration'])}</b>"
+        info += self.get_last_duration(filename)
         return info
 
     def load_files(self, result, method, params):
@@ -575,17 +667,27 @@ class Panel(ScreenPanel):
         path = params['path']
         start = datetime.now()
         items = [self.create_item(item, path) for item in [*result["result"]["dirs"], *result["result"]["files"]]]
-        for item in filter(None, items):
+        items = [item for item in items if item is not None]
+        for item in items:
             self.flowbox.add(item)
         self.set_sort()
         self.set_loading(False)
-        logging.info(f"Loaded in {(datetime.now() - start).total_seconds():.3f} seconds")        
+        logging.info(f"Loaded {len(items)} items in {(datetime.now() - start).total_seconds():.3f} seconds")
+        self.load_start = start
+        if self.first_paint is None:
+            self.first_paint = self.flowbox.connect_after("draw", self.log_first_paint)
+
+    def log_first_paint(self, widget, context):
+        widget.disconnect(self.first_paint)
+        self.first_paint = None
+        logging.info(f"First paint after {(datetime.now() - self.load_start).total_seconds():.3f} seconds")
 
     def delete_from_list(self, path):
         logging.info(f"deleting {path}")
         for item in self.flowbox.get_children():
             if item.get_path() in {path, f"gcodes/{path}"}:
                 logging.info("found removing")
+                self.info_labels.pop(item.get_path(), None)
                 self.flowbox.remove(item)
                 return True
 
@@ -608,7 +710,29 @@ class Panel(ScreenPanel):
             self.flowbox.invalidate_sort()
             self.flowbox.show_all()
 
+    def update_items(self, items):
+        # Metadata arrived for files already listed, rebuild only the rows that are on screen
+        paths = {item['path'] for item in items}
+        for fbchild in self.flowbox.get_children():
+            path = fbchild.get_path()
+            if fbchild.get_is_dir() or path not in paths:
+                continue
+            pst = self.get_print_start_time(path)
+            if pst != .0:
+                fbchild.set_print_start_time(pst)
+                fbchild.item['print_start_time'] = pst
+            if fbchild.populated:
+                self.unpopulate_item(fbchild)
+                self.populate_item(fbchild)
+        self.flowbox.invalidate_sort()
+
     def _callback(self, action, data):
+        if action in {"history_loaded", "history_changed"}:
+            self.update_history_info()
+            return
+        if action == "modify_files":
+            self.update_items(data['items'])
+            return
         logging.info(f"{action}: {data}")
         if action in {"create_dir", "create_file"}:
             self.add_item_from_callback(action, data)
@@ -626,6 +750,8 @@ class Panel(ScreenPanel):
         self.set_loading(True)
         for child in self.flowbox.get_children():
             self.flowbox.remove(child)
+        self.info_labels.clear()
+        self.row_height = self.estimate_row_height()
         if self.cur_directory == '':
             self._screen._ws.klippy.get_dir_info(self.load_files, 'gcodes')
             self._screen._ws.klippy.get_dir_info(self.load_files, 'media')
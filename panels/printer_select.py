@@ -5,6 +5,8 @@ from ks_includes.screen_panel import ScreenPanel
 from ks_includes.widgets.autogrid import AutoGrid
 
 class Panel(ScreenPanel):
+    subscriptions = {}
+
     def __init__(self, screen, title):
         super().__init__(screen, title)
         printers = self._config.get_printers()
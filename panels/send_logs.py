@@ -7,6 +7,8 @@ gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, Pango, GLib, Gdk
 
 class Panel(ScreenPanel):
+    subscriptions = {}
+
     def __init__(self, screen, title):
         super().__init__(screen, title)
         try:
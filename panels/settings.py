@@ -7,6 +7,12 @@ from ks_includes.widgets.keyboard import Keyboard
 from ks_includes.screen_panel import ScreenPanel
 
 class Panel(ScreenPanel):
+    subscriptions = {
+        "safety_printing": ["safety_enabled"],
+        "tmc2209 stepper_x": ["quite_mode"],
+        "virtual_sdcard": ["watch_bed_mesh", "autoload_bed_mesh"],
+    }
+
     def __init__(self, screen, title):
         super().__init__(screen, title)
         self.printers = self.settings = self.langs = self.entries = {}
@@ -6,6 +6,8 @@ from gi.repository import Gtk
 from ks_includes.screen_panel import ScreenPanel
 
 class Panel(ScreenPanel):
+    subscriptions = {}
+
     def __init__(self, screen, title):
         super().__init__(screen, title)
 
@@ -51,15 +53,19 @@ class Panel(ScreenPanel):
         self._gtk.remove_dialog(dialog)
         if response_id == Gtk.ResponseType.ACCEPT:
             if method == "reboot":
+                self._config.flush_user_config()
                 self._screen._ws.send_method("machine.reboot")
                 os.system("systemctl reboot -i")
             else:
+                self._config.flush_user_config()
                 self._screen._ws.send_method("machine.shutdown")
                 os.system("systemctl poweroff -i")
         elif response_id == Gtk.ResponseType.OK:
             if method == "reboot":
+                self._config.flush_user_config()
                 os.system("systemctl reboot -i")
             else:
+                self._config.flush_user_config()
                 os.system("systemctl poweroff -i")
         elif response_id == Gtk.ResponseType.APPLY:
             if method == "reboot":
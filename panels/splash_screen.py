@@ -6,6 +6,8 @@ from gi.repository import Gtk, Pango, GLib
 from ks_includes.screen_panel import ScreenPanel
 
 class Panel(ScreenPanel):
+    subscriptions = {}
+
     def __init__(self, screen, title):
         super().__init__(screen, title)
         image = self._gtk.Image("klipper", self._gtk.content_width * .2, self._gtk.content_height * .5)
@@ -136,8 +138,10 @@ class Panel(ScreenPanel):
         self._gtk.remove_dialog(dialog)
         if response_id == Gtk.ResponseType.OK:
             if method == "reboot":
+                self._config.flush_user_config()
                 os.system("systemctl reboot -i")
             else:
+                self._config.flush_user_config()
                 os.system("systemctl poweroff -i")
         elif response_id == Gtk.ResponseType.APPLY:
             if method == "reboot":
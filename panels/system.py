@@ -5,6 +5,8 @@ from gi.repository import Gtk
 from ks_includes.screen_panel import ScreenPanel
 
 class Panel(ScreenPanel):
+    subscriptions = {}
+
     def __init__(self, screen, title):
         title = title or _("System")
         super().__init__(screen, title)
@@ -13,20 +15,26 @@ class Panel(ScreenPanel):
         self.scales = {}
         self.labels = {}
         self.grid = Gtk.Grid(column_spacing=10, row_spacing=5)
+        self.usage = {}
 
         self.sysinfo = screen.printer.system_info
-        self.config_usage = screen.apiclient.send_request("server/files/get_root_usage?root=config")
-        self.gcodes_usage = screen.apiclient.send_request("server/files/get_root_usage?root=gcodes")
-        if not self.sysinfo:
-            logging.debug("Asking for info")
-            self.sysinfo = screen.apiclient.send_request("machine/system_info")
-            if 'result' in self.sysinfo and 'system_info' in self.sysinfo['result']:
-                self.sysinfo = self.sysinfo['result']['system_info']
-        logging.debug(f"sysinfo is {self.sysinfo}")
         if self.sysinfo:
             self.content.add(self.create_layout())
         else:
+            logging.debug("Asking for info")
             self.content.add(Gtk.Label(label=_("No info available"), vexpand=True))
+            self.request_async("machine/system_info", self.set_sysinfo)
+
+    def set_sysinfo(self, result):
+        if not result or 'system_info' not in result.get('result', {}):
+            return
+        self.sysinfo = result['result']['system_info']
+        logging.debug(f"sysinfo is {self.sysinfo}")
+        for child in self.content.get_children():
+            self.content.remove(child)
+        self.content.add(self.create_layout())
+        self.content.show_all()
+        self.update_usage()
 
     def back(self):
         if not self.sysinfo:
@@ -60,39 +68,17 @@ class Panel(ScreenPanel):
         self.grid.attach(self.scales["memory_usage"], 1, self.current_row, 1, 1)
         self.current_row += 1
         
-        self.labels['internal_memory'] = Gtk.Label(xalign=0)
-        self.labels["internal_memory"].set_label(
-                _("Internal memory")
-                + f': {(self.config_usage["result"]["disk_usage"]["used"] / self.config_usage["result"]["disk_usage"]["total"]) * 100:.0f}%'
-            )
-        
-        self.grid.attach(self.labels['internal_memory'], 0, self.current_row, 1, 1)
-        self.scales["internal_usage"] = Gtk.ProgressBar(
-            hexpand=True, show_text=False, fraction=0
-        )
-        self.scales["internal_usage"].set_fraction(
-                float(self.config_usage["result"]["disk_usage"]["used"])
-                / float(self.config_usage["result"]["disk_usage"]["total"])
-            )
-        self.grid.attach(self.scales["internal_usage"], 1, self.current_row, 1, 1)
-        self.current_row += 1
-        if self.config_usage != self.gcodes_usage:
-          self.labels['sd_memory'] = Gtk.Label(xalign=0)
-          self.labels["sd_memory"].set_label(
-                  _("SD memory")
-                  + f': {(self.gcodes_usage["result"]["disk_usage"]["used"] / self.gcodes_usage["result"]["disk_usage"]["total"]) * 100:.0f}%'
-              )
-        
-          self.grid.attach(self.labels["sd_memory"], 0, self.current_row, 1, 1)
-          self.scales["sd_usage"] = Gtk.ProgressBar(
-              hexpand=True, show_text=False, fraction=0
-          )
-          self.scales["sd_usage"].set_fraction(
-                float(self.gcodes_usage["result"]["disk_usage"]["used"])
-                / float(self.gcodes_usage["result"]["disk_usage"]["total"])
+        for label in ("internal", "sd"):
+            self.labels[f"{label}_memory"] = Gtk.Label(xalign=0)
+            self.grid.attach(self.labels[f"{label}_memory"], 0, self.current_row, 1, 1)
+            self.scales[f"{label}_usage"] = Gtk.ProgressBar(
+                hexpand=True, show_text=False, fraction=0
             )
-          self.grid.attach(self.scales["sd_usage"], 1, self.current_row, 1, 1)
-          self.current_row += 1
+            self.grid.attach(self.scales[f"{label}_usage"], 1, self.current_row, 1, 1)
+            self.current_row += 1
+        # Shown once it is known to be a different disk
+        self.labels["sd_memory"].set_no_show_all(True)
+        self.scales["sd_usage"].set_no_show_all(True)
         self.grid.attach(Gtk.Separator(), 0, self.current_row, 2, 1)
         self.current_row += 1
         self.populate_info()
@@ -102,30 +88,27 @@ class Panel(ScreenPanel):
         return scroll
 
     def activate(self):
-      if "internal_usage" in self.scales:
-        self.config_usage = self._apiclient.send_request("server/files/get_root_usage?root=config")
-        self.scales["internal_usage"].set_fraction(
-                float(self.config_usage["result"]["disk_usage"]["used"])
-                / float(self.config_usage["result"]["disk_usage"]["total"])
-            )
-        
-        if "internal_memory" in self.labels:
-          self.labels["internal_memory"].set_label(
-                  _("Internal memory")
-                  + f': {(self.config_usage["result"]["disk_usage"]["used"] / self.config_usage["result"]["disk_usage"]["total"]) * 100:.0f}%'
-              )
-        
-      if "sd_usage" in self.scales:
-        self.gcodes_usage = self._apiclient.send_request("server/files/get_root_usage?root=gcodes")
-        self.scales["sd_usage"].set_fraction(
-                float(self.gcodes_usage["result"]["disk_usage"]["used"])
-                / float(self.gcodes_usage["result"]["disk_usage"]["total"])
-            )
-        if "sd_memory" in self.labels:
-          self.labels["sd_memory"].set_label(
-                    _("SD memory")
-                    + f': {(self.gcodes_usage["result"]["disk_usage"]["used"] / self.gcodes_usage["result"]["disk_usage"]["total"]) * 100:.0f}%'
-                )
+        self.update_usage()
+
+    def update_usage(self):
+        if "internal_usage" not in self.scales:
+            return
+        for root in ("config", "gcodes"):
+            self.request_async(f"server/files/get_root_usage?root={root}", self.set_usage, root, ttl=5)
+
+    def set_usage(self, result, root):
+        if not result or "result" not in result:
+            return
+        self.usage[root] = result["result"]["disk_usage"]
+        if len(self.usage) < 2:
+            return
+        for disk, label, name in (("config", "internal", _("Internal memory")), ("gcodes", "sd", _("SD memory"))):
+            usage = self.usage[disk]
+            self.labels[f"{label}_memory"].set_label(f'{name}: {(usage["used"] / usage["total"]) * 100:.0f}%')
+            self.scales[f"{label}_usage"].set_fraction(float(usage["used"]) / float(usage["total"]))
+        separate = self.usage["config"] != self.usage["gcodes"]
+        self.labels["sd_memory"].set_visible(separate)
+        self.scales["sd_usage"].set_visible(separate)
 
     def set_mem_multiplier(self, data):
         memory_units = data.get("memory_units", "kB").lower()
@@ -8,6 +8,8 @@ from ks_includes.screen_panel import ScreenPanel
 from ks_includes.widgets.vte_terminal import Terminal
 
 class Panel(ScreenPanel):
+    subscriptions = {}
+
     def __init__(self, screen, title):
         super().__init__(screen, title)
         self.dnd_list = [Gtk.TargetEntry.new("text/uri-list", 0, 80), Gtk.TargetEntry.new("text/plain", 0, 4294967293)]
@@ -194,7 +194,12 @@ class Panel(ScreenPanel):
 
     def StreamBox(self):
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, vexpand=True)
-        cameras = self._screen.apiclient.send_request("server/webcams/list")
+        self.request_async("server/webcams/list", self.add_stream, box, ttl=30)
+        return box
+
+    def add_stream(self, cameras, box):
+        if box is not self.frame_box:
+            return
         if cameras is not False:
             self._printer.configure_cameras(cameras['result']['webcams'])
         if len(self._printer.cameras) == 1:
@@ -217,7 +222,7 @@ class Panel(ScreenPanel):
                     self.stream_video_player = None
                     error_label = Gtk.Label(label=_("Stream not available"))
                     box.add(error_label)
-        return box
+                box.show_all()
 
     def FrameBox(self):
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, vexpand=True)
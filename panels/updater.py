@@ -7,6 +7,8 @@ from gi.repository import Gtk, Pango
 from ks_includes.screen_panel import ScreenPanel
 import ks_includes.widgets.DetailsBoxes as DetailsBoxes
 class Panel(ScreenPanel):
+    subscriptions = {}
+
     def __init__(self, screen, title):
         title = title or _("Update")
         super().__init__(screen, title)
@@ -12,22 +12,21 @@ import locale
 import sys
 import gi
 import shutil
+import threading
 from ks_includes.widgets import popup_message
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, Gdk, GLib, Pango
 from importlib import import_module
-from jinja2 import Environment
 from signal import SIGTERM
 from datetime import datetime
+from time import monotonic
+from concurrent.futures import ThreadPoolExecutor
 from ks_includes import functions
 from ks_includes.KlippyWebsocket import KlippyWebsocket
 from ks_includes.KlippyRest import KlippyRest
 from ks_includes.files import KlippyFiles
 from ks_includes.KlippyGtk import KlippyGtk
 from ks_includes.printer import Printer
-from ks_includes.widgets.keyboard import Keyboard
-from ks_includes.widgets.numpad import Numpad
-from ks_includes.widgets.prompts import Prompt
 from ks_includes.config import KlipperScreenConfig
 from panels.base_panel import BasePanel
 
@@ -64,6 +63,32 @@ PRINTER_BASE_STATUS_OBJECTS = [
     'fixing'
 ]
 
+# Always subscribed, used by the Printer state machine and by BasePanel
+BASE_SUBSCRIPTION_OBJECTS = {
+    "webhooks": ["state", "state_message"],
+    "print_stats": ["state", "filename"],
+    "idle_timeout": ["state"],
+    "heaters": ["is_waiting"],
+    "toolhead": ["extruder"],
+    "configfile": ["save_config_pending", "save_config_pending_items"],
+    "virtual_sdcard": ["is_active", "show_interrupt"],
+    "autooff": ["autoOff_enable", "autoOff"],
+    "power_button": ["state"],
+    "probe": ["is_using_magnet_probe"],
+    "pid_calibrate": ["is_calibrating"],
+    "resonance_tester": ["shaping"],
+    "messages": ["last_message_eventtime", "message", "message_type", "is_open"],
+    "fixing": ['all_updated', 'dialog_message', 'require_internet', 'require_reboot', 'updating'],
+}
+
+# Imported in the background once the printer is ready, see prewarm_panels
+PREWARM_MODULES = (
+    "ks_includes.widgets.keyboard",
+    "ks_includes.widgets.numpad",
+    "ks_includes.widgets.prompts",
+)
+DEFAULT_PREWARM_PANELS = "print, job_status, temperature, bed_mesh, console"
+
 klipperscreendir = pathlib.Path(__file__).parent.resolve()
 
 
@@ -120,6 +145,11 @@ class KlipperScreen(Gtk.Window):
     notification_log = []
     prompt = None
     can_close_message = True
+    subscription = None
+    server_config = None
+    prewarm_thread = None
+    init_started = init_stage_started = None
+    tempstore_loading = False
 
     def __init__(self, args):
         try:
@@ -134,13 +164,13 @@ class KlipperScreen(Gtk.Window):
         self.dialogs = []
         self.confirm = None
         self.last_window_class = ""
+        self.init_executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="init")
         # Для просмотра дерева виджетов
         # self.set_interactive_debugging(True)
         configfile = os.path.normpath(os.path.expanduser(args.configfile))
         self._config = KlipperScreenConfig(configfile, self)
         self.lang_ltr = set_text_direction(self._config.get_main_config().get("language", None))
-        self.env = Environment(extensions=["jinja2.ext.i18n"], autoescape=True)
-        self.env.install_gettext_translations(self._config.get_lang())
+        self.env = self._config.templates.env
 
         # self.connect("key-press-event", self._key_press_event)
         self.connect("configure_event", self.update_size)
@@ -256,6 +286,7 @@ class KlipperScreen(Gtk.Window):
     def connect_printer(self, name):
         self.connecting_to_printer = name
         if self.files:
+            self.files.close()
             self.files.__init__(self)
         gc.collect()
         if self._ws is not None and self._ws.connected:
@@ -264,6 +295,11 @@ class KlipperScreen(Gtk.Window):
             self.printer.state = "disconnected"
         self.connecting = True
         self.initialized = False
+        self.subscription = None
+        self.server_config = None
+        self.init_started = None
+        # Responses to an init still running for the previous printer are dropped
+        self.initializing = self.tempstore_loading = False
 
         logging.info(f"Connecting to printer: {name}")
         ind = next(
@@ -275,10 +311,14 @@ class KlipperScreen(Gtk.Window):
             0,
         )
         self.printer = self.printers[ind]["data"]
+        if self.apiclient is not None:
+            self.apiclient.close()
         self.apiclient = KlippyRest(
             self.printers[ind][name]["moonraker_host"],
             self.printers[ind][name]["moonraker_port"],
             self.printers[ind][name]["moonraker_api_key"],
+            self._config.get_main_config().getint("rest_pool_size", 4),
+            self._config.get_main_config().getint("rest_retries", 2),
         )
 
         self.printer_initializing(_("Connecting to %s") % name, remove=True)
@@ -296,62 +336,110 @@ class KlipperScreen(Gtk.Window):
             self.files = KlippyFiles(self)
         self._ws.initial_connect()
 
-    def ws_subscribe(self):
-        requested_updates = {
-            "objects": {
-                "autooff": ["autoOff_enable", "autoOff"],
-                "safety_printing": ["safety_enabled", "is_doors_open", "is_hood_open", "luft_timeout", "luft_overload"],
-                "power_button": ["state"],
-                "tmc2209 stepper_x": ["quite_mode"],
-                "resonance_tester": ["shaping"],
-                "bed_mesh": ["profile_name", "mesh_max", "mesh_min", "probed_matrix", "mesh_matrix", "profiles", "unsaved_profiles", "is_calibrating", "group_bed_mesh_len", "group_current_mesh", "is_preheating"],
-                "configfile": ["config", "save_config_pending", "save_config_pending_items"],
-                "display_status": ["progress", "message"],
-                "fan": ["speed"],
-                "gcode_move": ["extrude_factor", "gcode_position", "homing_origin", "speed_factor", "speed"],
-                "idle_timeout": ["state"],
-                "pause_resume": ["is_paused"],
-                "print_stats": ["print_duration", "total_duration", "filament_used", "filename", "state", "message",
-                                "info"],
-                "toolhead": ["homed_axes", "estimated_print_time", "print_time", "position", "extruder",
-                             "max_accel", "minimum_cruise_ratio", "max_velocity", "square_corner_velocity", "is_homing"],
-                "virtual_sdcard": ["file_position", "is_active", "progress", "interrupted_file", "has_interrupted_file", "show_interrupt", "watch_bed_mesh", "autoload_bed_mesh"],
-                "webhooks": ["state", "state_message"],
-                "firmware_retraction": ["retract_length", "retract_speed", "unretract_extra_length", "unretract_speed"],
-                "motion_report": ["live_position", "live_velocity", "live_extruder_velocity"],
-                "messages": ["last_message_eventtime", "message", "message_type", "is_open"],
-                "exclude_object": ["current_object", "objects", "excluded_objects"],
-                "neopixel my_neopixel": ["color_data"],
-                "led_control": ["led_status", "enabled"],
-                "heaters": ["is_waiting"],
-                "probe": ["is_using_magnet_probe", "last_z_result", "is_adjusting"],
-                "screws_tilt_adjust": ["results", "base_screw", "calibrating_screw", "is_calibrating", "search_highest"],
-                "manual_probe": ["is_active", "command", "z_position_endstop"],
-                "pid_calibrate": ["is_calibrating"],
-                "filament_watcher": ['filament_type', 'show_message'],
-                "fixing": ['all_updated', 'dialog_message', 'require_internet', 'require_reboot', 'updating']
-            }
+    def _full_subscription(self):
+        objects = {
+            "autooff": ["autoOff_enable", "autoOff"],
+            "safety_printing": ["safety_enabled", "is_doors_open", "is_hood_open", "luft_timeout", "luft_overload"],
+            "power_button": ["state"],
+            "tmc2209 stepper_x": ["quite_mode"],
+            "resonance_tester": ["shaping"],
+            "bed_mesh": ["profile_name", "mesh_max", "mesh_min", "probed_matrix", "mesh_matrix", "profiles", "unsaved_profiles", "is_calibrating", "group_bed_mesh_len", "group_current_mesh", "is_preheating"],
+            "configfile": ["config", "save_config_pending", "save_config_pending_items"],
+            "display_status": ["progress", "message"],
+            "fan": ["speed"],
+            "gcode_move": ["extrude_factor", "gcode_position", "homing_origin", "speed_factor", "speed"],
+            "idle_timeout": ["state"],
+            "pause_resume": ["is_paused"],
+            "print_stats": ["print_duration", "total_duration", "filament_used", "filename", "state", "message",
+                            "info"],
+            "toolhead": ["homed_axes", "estimated_print_time", "print_time", "position", "extruder",
+                         "max_accel", "minimum_cruise_ratio", "max_velocity", "square_corner_velocity", "is_homing"],
+            "virtual_sdcard": ["file_position", "is_active", "progress", "interrupted_file", "has_interrupted_file", "show_interrupt", "watch_bed_mesh", "autoload_bed_mesh"],
+            "webhooks": ["state", "state_message"],
+            "firmware_retraction": ["retract_length", "retract_speed", "unretract_extra_length", "unretract_speed"],
+            "motion_report": ["live_position", "live_velocity", "live_extruder_velocity"],
+            "messages": ["last_message_eventtime", "message", "message_type", "is_open"],
+            "exclude_object": ["current_object", "objects", "excluded_objects"],
+            "neopixel my_neopixel": ["color_data"],
+            "led_control": ["led_status", "enabled"],
+            "heaters": ["is_waiting"],
+            "probe": ["is_using_magnet_probe", "last_z_result", "is_adjusting"],
+            "screws_tilt_adjust": ["results", "base_screw", "calibrating_screw", "is_calibrating", "search_highest"],
+            "manual_probe": ["is_active", "command", "z_position_endstop"],
+            "pid_calibrate": ["is_calibrating"],
+            "filament_watcher": ['filament_type', 'show_message'],
+            "fixing": ['all_updated', 'dialog_message', 'require_internet', 'require_reboot', 'updating']
         }
+        for f in self.printer.get_fans():
+            objects[f] = ["speed"]
+        for f in self.printer.get_filament_sensors():
+            objects[f] = ["enabled", "filament_detected"]
+        for p in self.printer.get_output_pins():
+            objects[p] = ["value"]
+        for led in self.printer.get_leds():
+            objects[led] = ["color_data"]
+        return objects
+
+    def _base_subscription(self):
+        objects = {obj: list(fields) for obj, fields in BASE_SUBSCRIPTION_OBJECTS.items()}
         for extruder in self.printer.get_tools():
-            requested_updates['objects'][extruder] = [
+            objects[extruder] = [
                 "target", "temperature", "pressure_advance", "smooth_time", "power", "nozzle_diameter"]
         for h in self.printer.get_heaters():
-            requested_updates['objects'][h] = ["target", "temperature", "power"]
+            objects[h] = ["target", "temperature", "power"]
         for t in self.printer.get_temp_sensors():
-            requested_updates['objects'][t] = ["temperature"]
+            objects[t] = ["temperature"]
         for f in self.printer.get_temp_fans():
-            requested_updates['objects'][f] = ["target", "temperature"]
-        for f in self.printer.get_fans():
-            requested_updates['objects'][f] = ["speed"]
-        for f in self.printer.get_filament_sensors():
-            requested_updates['objects'][f] = ["enabled", "filament_detected"]
-        for p in self.printer.get_output_pins():
-            requested_updates['objects'][p] = ["value"]
-        for led in self.printer.get_leds():
-            requested_updates['objects'][led] = ["color_data"]
+            objects[f] = ["target", "temperature"]
+        return objects
+
+    def _add_subscription(self, objects, subscriptions):
+        groups = {
+            "tools": self.printer.get_tools,
+            "heaters": self.printer.get_heaters,
+            "temp_sensors": self.printer.get_temp_sensors,
+            "temp_fans": self.printer.get_temp_fans,
+            "fans": self.printer.get_fans,
+            "filament_sensors": self.printer.get_filament_sensors,
+            "output_pins": self.printer.get_output_pins,
+            "leds": self.printer.get_leds,
+        }
+        for name, fields in subscriptions.items():
+            for obj in groups[name]() if name in groups else [name]:
+                if obj not in objects:
+                    objects[obj] = []
+                objects[obj].extend(field for field in fields if field not in objects[obj])
+
+    def get_requested_objects(self):
+        objects = self._base_subscription()
+        for panel in self._cur_panels:
+            if panel not in self.panels:
+                continue
+            subscriptions = self.panels[panel].subscriptions
+            if subscriptions is None:
+                self._add_subscription(objects, self._full_subscription())
+                break
+            self._add_subscription(objects, subscriptions)
+        return objects
+
+    def ws_subscribe(self, force=False):
+        if self._ws is None or not self._ws.connected or self.printer is None or not self.printer.config:
+            return
+        requested_updates = {"objects": self.get_requested_objects()}
+        if not force and requested_updates == self.subscription:
+            return
+        self.subscription = requested_updates
+        logging.debug(f"Subscribing to {len(requested_updates['objects'])} printer objects")
+        self._ws.klippy.object_subscription(requested_updates, self._subscription_callback)
+
+    def _subscription_callback(self, result, method, params):
+        if "result" not in result or "status" not in result["result"]:
+            logging.debug(f"Subscription error: {result}")
+            return
+        # Objects that were not subscribed may be stale, the response carries their current state
+        self.printer.process_update(result["result"]["status"])
+        self.process_update("notify_status_update", result["result"]["status"])
 
-        self._ws.klippy.object_subscription(requested_updates)
-    
     @staticmethod
     def _load_panel(panel):
         logging.debug(f"Loading panel: {panel}")
@@ -361,6 +449,31 @@ class KlipperScreen(Gtk.Window):
             raise FileNotFoundError(os.strerror(2), "\n" + panel_path)
         return import_module(f"panels.{panel}")
 
+    def prewarm_panels(self):
+        # Imports panel modules in the background once the printer is ready, the first tap only builds the panel
+        if self.prewarm_thread is not None:
+            return
+        panels = self._config.get_main_config().get("prewarm_panels", DEFAULT_PREWARM_PANELS)
+        modules = list(PREWARM_MODULES)
+        for panel in (p.strip() for p in panels.split(",")):
+            if panel and f"panels.{panel}" not in sys.modules:
+                modules.append(f"panels.{panel}")
+        self.prewarm_thread = threading.Thread(target=self._prewarm, args=(modules,), name="prewarm", daemon=True)
+        self.prewarm_thread.start()
+
+    @staticmethod
+    def _prewarm(modules):
+        for module in modules:
+            if module in sys.modules:
+                continue
+            start = monotonic()
+            try:
+                import_module(module)
+            except Exception as e:
+                logging.error(f"Unable to pre-load {module}: {e}")
+                continue
+            logging.info(f"Pre-loaded {module} in {(monotonic() - start) * 1000:.0f} ms")
+
     def show_panel(self, panel, title, remove_all=False, panel_name=None, **kwargs):
         if panel_name is None:
             panel_name = panel
@@ -372,7 +485,14 @@ class KlipperScreen(Gtk.Window):
                 self._remove_current_panel()
             if panel_name not in self.panels:
                 try:
-                    self.panels[panel_name] = self._load_panel(panel).Panel(self, title, **kwargs)
+                    start = monotonic()
+                    imported = f"panels.{panel}" in sys.modules
+                    module = self._load_panel(panel)
+                    loaded = monotonic()
+                    self.panels[panel_name] = module.Panel(self, title, **kwargs)
+                    logging.info(f"Panel {panel_name}: import {(loaded - start) * 1000:.0f} ms"
+                                 f"{' (pre-loaded)' if imported else ''}, "
+                                 f"construct {(monotonic() - loaded) * 1000:.0f} ms")
                 except Exception as e:
                     self.show_error_modal(f"Unable to load panel {panel}", f"{e}\n\n{traceback.format_exc()}")
                     return
@@ -381,6 +501,7 @@ class KlipperScreen(Gtk.Window):
                 self.panels[panel_name].__init__(self, title, **kwargs)
                 self.panels_reinit.remove(panel_name)
             self._cur_panels.append(panel_name)
+            self.ws_subscribe()
             self.attach_panel(panel_name)
         except Exception as e:
             logging.exception(f"Error attaching panel:\n{e}\n\n{traceback.format_exc()}")
@@ -481,6 +602,7 @@ class KlipperScreen(Gtk.Window):
 
     def restart_ks(self, *args):
         logging.debug(f"Restarting {sys.executable} {' '.join(sys.argv)}")
+        self._config.flush_user_config()
         os.execv(sys.executable, ['python'] + sys.argv)
         self._ws.send_method("machine.services.restart", {"service": "KlipperScreen"})  # Fallback
 
@@ -612,6 +734,7 @@ class KlipperScreen(Gtk.Window):
         if len(self._cur_panels) < 1:
             self.reload_panels()
             return
+        self.ws_subscribe()
         self.attach_panel(self._cur_panels[-1])
         if self._cur_panels[-1] == 'main_menu':
           self.base_panel.check_system_fix_dialog()
@@ -831,12 +954,16 @@ class KlipperScreen(Gtk.Window):
             self.printer.state = "not ready"
             return
         self.files.refresh_files()
+        if not self.files.history_loaded:
+            self.files.refresh_history()
         self.last_window_class = "window-ready"
         self.remove_window_classes(self.base_panel.main_grid.get_style_context())
         self.base_panel.main_grid.get_style_context().add_class("window-ready")
         self.show_panel("main_menu", None, remove_all=True, items=self._config.get_menu_items("__main"))
         self.base_panel.check_system_fix_dialog()
         self.base_panel.check_missing_packages()
+        self.base_panel.schedule_network_status_update()
+        self.prewarm_panels()
 
     def state_startup(self):
         self.last_window_class = "window-ready"
@@ -872,7 +999,6 @@ class KlipperScreen(Gtk.Window):
     def change_language(self, widget, lang):
         self._config.install_language(lang)
         self.lang_ltr = set_text_direction(lang)
-        self.env.install_gettext_translations(self._config.get_lang())
         self._config._create_configurable_options(self)
         self._config.set('main', 'language', lang)
         self._config.save_user_config_options()
@@ -911,6 +1037,10 @@ class KlipperScreen(Gtk.Window):
         elif action == "notify_metadata_update":
             self.files.request_metadata(data['filename'])
             return
+        elif action == "notify_history_changed":
+            if self.files is not None:
+                self.files.process_history_update(data)
+            return
         elif action == "notify_update_response":
             if 'message' in data and 'error' in data['message'].lower():
                 logging.error(f"{action}:{data['message']}")
@@ -928,6 +1058,7 @@ class KlipperScreen(Gtk.Window):
                     if action.startswith('prompt_begin'):
                         if self.prompt is not None:
                             self.prompt.end()
+                        from ks_includes.widgets.prompts import Prompt
                         self.prompt = Prompt(self)
                     if self.prompt is None:
                         return
@@ -963,8 +1094,7 @@ class KlipperScreen(Gtk.Window):
         ]
 
         try:
-            j2_temp = self.env.from_string(text)
-            text = j2_temp.render()
+            text = self.env.from_string(text).render()
         except Exception as e:
             logging.debug(f"Error parsing jinja for confirm_send_action\n{e}\n\n{traceback.format_exc()}")
 
@@ -1025,6 +1155,44 @@ class KlipperScreen(Gtk.Window):
             else:
                 self._ws.klippy.power_device_off(dev)
     
+    def run_async(self, fetch, callback, *args):
+        # fetch runs on the init pool, callback(result, *args) on the main loop
+        apiclient = self.apiclient
+
+        def done(future):
+            GLib.idle_add(self._async_done, apiclient, future, callback, *args)
+        self.init_executor.submit(fetch).add_done_callback(done)
+
+    def _async_done(self, apiclient, future, callback, *args):
+        if apiclient is not self.apiclient:
+            logging.debug("Dropping a response from the previous printer")
+            return False
+        try:
+            result = future.result()
+        except Exception as e:
+            logging.error(f"Request failed: {e}")
+            result = False
+        callback(result, *args)
+        return False
+
+    def run_parallel(self, requests, callback):
+        results = {}
+
+        def collect(result, name):
+            results[name] = result
+            if len(results) == len(requests):
+                callback(results)
+        for name, fetch in requests.items():
+            self.run_async(fetch, collect, name)
+
+    def init_stage(self, name=None):
+        now = monotonic()
+        if self.init_started is None:
+            self.init_started = now
+        elif name:
+            logging.info(f"Init {name}: {(now - self.init_stage_started) * 1000:.0f} ms")
+        self.init_stage_started = now
+
     def init_printer(self):
         if self.initializing:
             logging.info("Already Initializing")
@@ -1034,19 +1202,24 @@ class KlipperScreen(Gtk.Window):
             logging.info("Stopping Retries")
             self.initializing = False
             return False
-        state = self.apiclient.get_server_info()
+        self.init_stage()
+        self.run_async(self.apiclient.get_server_info, self._init_printer_server_info)
+        return False
+
+    def _init_printer_server_info(self, state):
+        self.init_stage("server info")
         if state is False:
             logging.info("Moonraker not connected")
             self.initializing = False
-            return False
+            return
         self.connecting = not self._ws.connected
         self.connected_printer = self.connecting_to_printer
         self.base_panel.set_ks_printer_cfg(self.connected_printer)
 
         self.init_server(state["result"])
         # Moonraker is ready, set a loop to init the printer
-        return self.init_klipper(state["result"])
-        
+        self.init_klipper(state["result"])
+
     def init_server(self, server_info):
         popup = ''
         level = 2
@@ -1067,18 +1240,22 @@ class KlipperScreen(Gtk.Window):
         if popup:
             self.show_popup_message(popup, level)
         if "webcam" in server_info["components"]:
-            cameras = self.apiclient.send_request("server/webcams/list")
-            if cameras is not False:
-                self.printer.configure_cameras(cameras['result']['webcams'])
+            self.run_async(lambda: self.apiclient.send_request("server/webcams/list"), self._init_cameras)
         if "spoolman" in server_info["components"]:
             self.printer.enable_spoolman()
-                
+
+    def _init_cameras(self, cameras):
+        if cameras is not False:
+            self.printer.configure_cameras(cameras['result']['webcams'])
+
     def init_klipper(self, server_info=None):
         if self.reinit_count > self.max_retries or 'printer_select' in self._cur_panels:
             logging.info("Stopping Retries")
             return False
         if not server_info:
-            server_info = self.apiclient.get_server_info()["result"]
+            self.init_stage()
+            self.run_async(self.apiclient.get_server_info, self._init_klipper_server_info)
+            return False
         self.reinit_count += 1
 
         if server_info['klippy_connected'] is False:
@@ -1087,58 +1264,41 @@ class KlipperScreen(Gtk.Window):
             msg += f"Klipper: {server_info['klippy_state']}" + "\n\n"
             if self.reinit_count <= self.max_retries:
                 msg += _("Retrying") + f' #{self.reinit_count}'
-            return self._init_printer(msg, klipper=True)
+            self._init_printer(msg, klipper=True)
+            return False
 
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        results = {}
-        errors = []
+        self.server_config = None
+        self.run_parallel({
+            'printer_info': self.apiclient.get_printer_info,
+            'config': lambda: self.apiclient.send_request("printer/objects/query?configfile"),
+            'info': lambda: self.apiclient.send_request("machine/system_info"),
+            'gcode_help': self.apiclient.get_gcode_help,
+            'server_config': lambda: self.apiclient.send_request("server/config"),
+        }, self._init_klipper_printer)
+        return False
 
-        def fetch_printer_info():
-            try:
-                return ('printer_info', self.apiclient.get_printer_info())
-            except Exception as e:
-                return ('error', f"printer_info: {e}")
-        
-        def fetch_config():
-            try:
-                return ('config', self.apiclient.send_request("printer/objects/query?configfile"))
-            except Exception as e:
-                return ('error', f"config: {e}")
-        
-        def fetch_system_info():
-            try:
-                return ('info', self.apiclient.send_request("machine/system_info"))
-            except Exception as e:
-                return ('error', f"system_info: {e}")
-
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            futures = [
-                executor.submit(fetch_printer_info),
-                executor.submit(fetch_config),
-                executor.submit(fetch_system_info),
-            ]
-            
-            for future in as_completed(futures):
-                try:
-                    key, value = future.result(timeout=10)
-                    if key == 'error':
-                        errors.append(value)
-                    else:
-                        results[key] = value
-                except Exception as e:
-                    errors.append(str(e))
-        if 'printer_info' not in results or results['printer_info'] is False:
+    def _init_klipper_server_info(self, state):
+        self.init_stage("server info")
+        if state is False:
+            self._init_printer(_("Unable to get printer info from moonraker"), klipper=True)
+            return
+        self.init_klipper(state["result"])
+
+    def _init_klipper_printer(self, results):
+        self.init_stage("printer info, config, system info, gcode help, server config")
+        if results['printer_info'] is False:
             return self._init_printer(_("Unable to get printer info from moonraker"))
-        if 'config' not in results or results['config'] is False:
+        if results['config'] is False:
             return self._init_printer(_("Error getting printer configuration"))
-        printer_info = results['printer_info']
-        config = results['config']
-        info = results.get('info')
-        self.printer.reinit(printer_info['result'], config['result']['status'])
-        self.printer.available_commands = self.apiclient.get_gcode_help()['result']
+        self.printer.reinit(results['printer_info']['result'], results['config']['result']['status'])
+        if results['gcode_help']:
+            self.printer.available_commands = results['gcode_help']['result']
+        info = results['info']
         if info and 'result' in info and 'system_info' in info['result']:
             self.printer.system_info = info['result']['system_info']
-        self.ws_subscribe()
+        if results['server_config']:
+            self.server_config = results['server_config']['result']['config']
+        self.ws_subscribe(force=True)
         extra_items = (self.printer.get_tools()
                       + self.printer.get_heaters()
                       + self.printer.get_temp_sensors()
@@ -1148,27 +1308,32 @@ class KlipperScreen(Gtk.Window):
                       + self.printer.get_output_pins()
                       + self.printer.get_leds()
                       )
-        data = self.apiclient.send_request(
-            "printer/objects/query?" + "&".join(PRINTER_BASE_STATUS_OBJECTS + extra_items)
-        )
+        query = "printer/objects/query?" + "&".join(PRINTER_BASE_STATUS_OBJECTS + extra_items)
+        self.run_async(lambda: self.apiclient.send_request(query), self._init_klipper_status)
+
+    def _init_klipper_status(self, data):
+        self.init_stage("printer objects")
         if data is False:
             return self._init_printer(_("Error getting printer object data with extra items"))
         self.files.set_gcodes_path()
         self.init_spoolman()
-        logging.info("Printer initialized")
+        logging.info(f"Printer initialized in {monotonic() - self.init_started:.2f} s")
+        self.init_started = None
         self.initialized = True
         self.reinit_count = 0
         self.initializing = False
         self.printer.process_update(data['result']['status'])
-        if errors:
-            logging.warning(f"Some parallel requests failed: {errors}")
         self.log_notification("Printer Initialized", 1)
-        return False
 
     def init_tempstore(self):
-        if len(self.printer.get_temp_devices()) == 0:
-            return
-        tempstore = self.apiclient.send_request("server/temperature_store")
+        if len(self.printer.get_temp_devices()) == 0 or self.tempstore_loading:
+            return False
+        self.tempstore_loading = True
+        self.run_async(lambda: self.apiclient.send_request("server/temperature_store"), self._init_tempstore)
+        return False
+
+    def _init_tempstore(self, tempstore):
+        self.tempstore_loading = False
         if tempstore and 'result' in tempstore and tempstore['result']:
             self.printer.init_temp_store(tempstore['result'])
             if hasattr(self.panels[self._cur_panels[-1]], "update_graph_visibility"):
@@ -1180,26 +1345,29 @@ class KlipperScreen(Gtk.Window):
         if set(self.printer.tempstore) != set(self.printer.get_temp_devices()):
             GLib.timeout_add_seconds(5, self.init_tempstore)
             return
-        server_config = self.apiclient.send_request("server/config")
-        if server_config:
+        if self.server_config:
             try:
-                self.printer.tempstore_size = server_config["result"]["config"]["data_store"]["temperature_store_size"]
+                self.printer.tempstore_size = self.server_config["data_store"]["temperature_store_size"]
                 logging.info(f"Temperature store size: {self.printer.tempstore_size}")
             except KeyError:
                 logging.error("Couldn't get the temperature store size")
-                return False
 
     def init_spoolman(self):
-        server_config = self.apiclient.send_request("server/config")
-        if server_config:
-            try:
-                server_config["result"]["config"]["spoolman"]
-                self.printer.enable_spoolman()
-            except KeyError:
-                logging.warning("Not using Spoolman")
-
+        if self.server_config is None:
+            # The init fetch failed, try again without blocking
+            self.run_async(lambda: self.apiclient.send_request("server/config"), self._init_server_config)
+            return False
+        if "spoolman" in self.server_config:
+            self.printer.enable_spoolman()
+        else:
+            logging.warning("Not using Spoolman")
         return False
 
+    def _init_server_config(self, result):
+        if result and 'result' in result:
+            self.server_config = result['result']['config']
+            self.init_spoolman()
+
     def show_keyboard(self, entry=None, event=None, accept_function=None, backspace_function=None, reject_function=None):
         if self.keyboard is not None:
             return
@@ -1208,6 +1376,7 @@ class KlipperScreen(Gtk.Window):
             return
         if not reject_function:
           reject_function = self.remove_keyboard
+        from ks_includes.widgets.keyboard import Keyboard
         self.keyboard = Keyboard(self, reject_function, accept_function, entry=entry, backspace_cb=backspace_function)
         self.base_panel.content.pack_end(self.keyboard, True, True, 5)
         self.base_panel.content.show_all()
@@ -1226,6 +1395,7 @@ class KlipperScreen(Gtk.Window):
         if entry is None:
             logging.debug("Error: no entry provided for keyboard")
             return
+        from ks_includes.widgets.numpad import Numpad
         self.numpad = Numpad(self, accept_function, entry=entry)
         self.base_panel.content.pack_end(self.numpad, True, True, 5)
         self.base_panel.content.show_all()
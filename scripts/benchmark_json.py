@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# Micro-benchmark of the Moonraker message decoding done in KlippyWebsocket.on_message
+#
+# Record traffic from a running printer (one frame per line):
+#   python3 scripts/benchmark_json.py --record 127.0.0.1:7125 --seconds 60 traffic.jsonl
+# Then measure:
+#   python3 scripts/benchmark_json.py traffic.jsonl
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ks_includes.json_codec import is_temperature_response  # noqa: E402
+
+SUBSCRIPTION = {
+    "objects": {
+        "extruder": None, "heater_bed": None, "toolhead": None, "gcode_move": None,
+        "motion_report": None, "print_stats": None, "virtual_sdcard": None, "fan": None,
+        "display_status": None, "webhooks": None,
+    }
+}
+
+
+def record(url, seconds, output):
+    import websocket
+    ws = websocket.create_connection(f"ws://{url}/websocket", timeout=1)
+    ws.send(json.dumps({"jsonrpc": "2.0", "method": "printer.gcode.script", "params": {"script": "M105"}, "id": 1}))
+    ws.send(json.dumps({"jsonrpc": "2.0", "method": "printer.objects.subscribe", "params": SUBSCRIPTION, "id": 2}))
+    frames = 0
+    end = time.monotonic() + seconds
+    with open(output, "w") as f:
+        while time.monotonic() < end:
+            try:
+                message = ws.recv()
+            except websocket.WebSocketTimeoutException:
+                continue
+            f.write(message.replace("\n", "") + "\n")
+            frames += 1
+    ws.close()
+    print(f"Recorded {frames} frames in {seconds}s to {output}")
+
+
+def decoders():
+    for name in ("json", "ujson", "orjson"):
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            print(f"{name:>8}: not installed")
+            continue
+        yield name, module.loads
+
+
+def benchmark(path, number):
+    with open(path) as f:
+        frames = [line.rstrip("\n") for line in f if line.strip()]
+    if not frames:
+        print(f"No frames in {path}")
+        return
+    dropped = [frame for frame in frames if is_temperature_response(frame)]
+    print(f"{len(frames)} frames, {sum(len(frame) for frame in frames) / 1024:.1f} KiB, "
+          f"{len(dropped)} temperature reports dropped by the pre-filter")
+
+    for name, loads in decoders():
+        def decode_all():
+            for frame in frames:
+                loads(frame)
+
+        def filter_and_decode():
+            for frame in frames:
+                if not is_temperature_response(frame):
+                    loads(frame)
+
+        full = min(timeit.repeat(decode_all, number=number, repeat=3)) / number
+        filtered = min(timeit.repeat(filter_and_decode, number=number, repeat=3)) / number
+        print(f"{name:>8}: {full * 1e6 / len(frames):7.2f} us/frame, "
+              f"with pre-filter {filtered * 1e6 / len(frames):7.2f} us/frame")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark decoding of recorded Moonraker traffic")
+    parser.add_argument("traffic", help="File with one websocket frame per line")
+    parser.add_argument("--record", metavar="HOST:PORT", help="Record traffic from moonraker instead")
+    parser.add_argument("--seconds", type=int, default=30, help="Recording duration")
+    parser.add_argument("--number", type=int, default=20, help="Passes over the traffic per measurement")
+    args = parser.parse_args()
+    if args.record:
+        record(args.record, args.seconds, args.traffic)
+    else:
+        benchmark(args.traffic, args.number)
+
+
+if __name__ == "__main__":
+    main()